@@ -26,7 +26,7 @@ echo.
 
 :: Abhaengigkeiten installieren
 echo [2/4] Installiere Abhaengigkeiten...
-pip install pyserial requests pillow pyinstaller --quiet
+pip install pyserial requests pillow numpy pyinstaller --quiet
 if errorlevel 1 (
     echo FEHLER beim Installieren der Abhaengigkeiten!
     pause
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Bus Display Benchmarks
+======================
+
+Misst die Laufzeit der performance-kritischen Teile und prueft dabei,
+dass die schnellen Pfade exakt die gleiche Ausgabe liefern wie die
+Referenz-Implementierung.
+
+Verwendung:
+    python benchmark.py rgb565
+    python benchmark.py rgb565 --images test_images --repeat 5
+    python benchmark.py decode --megapixels 12 24
+    python benchmark.py codec --baudrate 921600
+    python benchmark.py parse --frames frames.jsonl
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+ROOT_DIR = Path(__file__).parent
+
+
+def time_call(func: Callable, repeat: int) -> float:
+    """Bester Lauf in Millisekunden"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def find_images(directory: Path) -> List[Path]:
+    """Sucht Testbilder"""
+    patterns = ("*.png", "*.jpg", "*.jpeg", "*.bmp")
+    images = []
+    for pattern in patterns:
+        images.extend(sorted(directory.glob(pattern)))
+    return images
+
+
+def bench_rgb565(args) -> int:
+    """RGB565-Packen: Pixel-Schleife (vorher) gegen NumPy (nachher)"""
+    from PIL import Image
+    import rgb565
+
+    if not rgb565.NUMPY_AVAILABLE:
+        print("✗ NumPy nicht installiert - pip install numpy")
+        return 1
+
+    images = find_images(Path(args.images))
+    if not images:
+        print(f"✗ Keine Bilder in {args.images}")
+        return 1
+
+    print(f"\nRGB565-Konvertierung ({rgb565.SCREEN_WIDTH}x{rgb565.SCREEN_HEIGHT}, bester von {args.repeat})")
+    print("-" * 60)
+    print(f"  {'Bild':<20} {'vorher':>10} {'nachher':>10} {'Faktor':>8}")
+
+    failures = 0
+    for path in images:
+        with Image.open(path) as img:
+            frame = rgb565.prepare_image(img)
+
+        before = rgb565.pack_rgb565_python(frame)
+        after = rgb565.pack_rgb565_numpy(frame)
+        if before != after:
+            print(f"  ✗ {path.name}: Ausgabe unterscheidet sich!")
+            failures += 1
+            continue
+
+        t_before = time_call(lambda: rgb565.pack_rgb565_python(frame), args.repeat)
+        t_after = time_call(lambda: rgb565.pack_rgb565_numpy(frame), args.repeat)
+        print(f"  {path.name:<20} {t_before:>8.1f}ms {t_after:>8.2f}ms {t_before / t_after:>7.0f}x")
+
+    # Gegen die vom alten Server erzeugten .rgb565-Dateien pruefen
+    checked = 0
+    for path in sorted(Path(args.uploads).glob("*_*")):
+        artifact = Path(args.artifacts) / f"{path.name[:36]}.rgb565"
+        if not artifact.exists():
+            continue
+        checked += 1
+        if rgb565.convert_file(str(path)) != artifact.read_bytes():
+            print(f"  ✗ {path.name}: weicht von {artifact.name} ab!")
+            failures += 1
+
+    if failures:
+        print(f"\n✗ {failures} Bild(er) nicht byte-identisch")
+        return 1
+
+    print(f"\n✓ Alle Ausgaben byte-identisch ({checked} gespeicherte Artefakte geprueft)")
+    return 0
+
+
+def bench_decode(args) -> int:
+    """Grosse Eingaben: volle Dekodierung (vorher) gegen draft/reduce (nachher)"""
+    import tempfile
+    from PIL import Image, ImageChops, ImageStat
+    import rgb565
+
+    images = find_images(Path(args.images))
+    if not images:
+        print(f"✗ Keine Bilder in {args.images}")
+        return 1
+
+    with Image.open(images[0]) as source:
+        source = source.convert('RGB')
+
+    print(f"\nDekodierung + Skalierung auf {rgb565.SCREEN_WIDTH}x{rgb565.SCREEN_HEIGHT} (bester von {args.repeat})")
+    print("-" * 70)
+    print(f"  {'Eingabe':<22} {'vorher':>10} {'nachher':>10} {'Faktor':>8} {'Abweichung':>11}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for mp in args.megapixels:
+            width = int((mp * 1_000_000 * 4 / 3) ** 0.5)
+            height = width * 3 // 4
+            for fmt in ("JPEG", "PNG"):
+                path = Path(tmp) / f"large_{mp}mp.{fmt.lower()}"
+                source.resize((width, height), Image.Resampling.BICUBIC).save(path, fmt)
+
+                def before():
+                    with Image.open(path) as img:
+                        return rgb565.prepare_image_full(img)
+
+                def after():
+                    with Image.open(path) as img:
+                        return rgb565.prepare_image(img)
+
+                # Mittlere Abweichung pro Kanal (0-255) als Qualitaetskontrolle
+                diff = ImageStat.Stat(ImageChops.difference(before(), after())).mean
+                t_before = time_call(before, args.repeat)
+                t_after = time_call(after, args.repeat)
+                label = f"{width}x{height} {fmt}"
+                print(f"  {label:<22} {t_before:>8.0f}ms {t_after:>8.0f}ms "
+                      f"{t_before / t_after:>7.1f}x {sum(diff) / len(diff):>10.2f}")
+
+    return 0
+
+
+def load_frames(directory: Path) -> List[tuple]:
+    """RGB565-Frames: eingebettete Bilder plus konvertierte Testbilder"""
+    import base64
+    import zlib
+    import rgb565
+
+    frames = []
+    try:
+        from embedded_images import EMBEDDED_IMAGES
+        for slot, data in sorted(EMBEDDED_IMAGES.items()):
+            frames.append((f"eingebettet {slot}", zlib.decompress(base64.b64decode(data))))
+    except ImportError:
+        pass
+
+    for path in find_images(directory):
+        frames.append((path.name, rgb565.convert_file(str(path))))
+    return frames
+
+
+def bench_codec(args) -> int:
+    """RLE-Codec: Kompression, Encoder/Decoder-Durchsatz und Uebertragungszeit"""
+    import rgb565_codec
+
+    frames = load_frames(Path(args.images))
+    if not frames:
+        print(f"✗ Keine Bilder in {args.images}")
+        return 1
+
+    # 8N1: 10 Bit pro Byte auf der Leitung
+    link_bytes_per_s = args.baudrate / 10
+
+    print(f"\nRLE-Codec (bester von {args.repeat}, Leitung {args.baudrate} baud)")
+    print("-" * 78)
+    print(f"  {'Frame':<20} {'Groesse':>8} {'Quote':>6} {'Encode':>9} {'Decode':>9} "
+          f"{'Link roh':>9} {'Link RLE':>9}")
+
+    failures = 0
+    total_raw = total_rle = 0
+    for name, frame in frames:
+        encoded = rgb565_codec.encode_rle(frame)
+        if rgb565_codec.encode_rle_python(frame) != encoded:
+            print(f"  ✗ {name}: NumPy- und Referenz-Encoder unterschiedlich!")
+            failures += 1
+            continue
+        if rgb565_codec.decode_rle(encoded, len(frame)) != frame:
+            print(f"  ✗ {name}: Decoder liefert nicht den Originalframe!")
+            failures += 1
+            continue
+
+        t_encode = time_call(lambda: rgb565_codec.encode_rle(frame), args.repeat)
+        t_decode = time_call(lambda: rgb565_codec.decode_rle(encoded, len(frame)), args.repeat)
+        sent = min(len(encoded), len(frame))
+        total_raw += len(frame)
+        total_rle += sent
+        print(f"  {name:<20} {len(encoded):>8} {len(encoded) * 100 / len(frame):>5.0f}% "
+              f"{t_encode:>7.1f}ms {t_decode:>7.1f}ms "
+              f"{len(frame) / link_bytes_per_s:>8.2f}s {sent / link_bytes_per_s:>8.2f}s")
+
+    if failures:
+        print(f"\n✗ {failures} Frame(s) fehlerhaft")
+        return 1
+
+    print(f"\n✓ Roundtrip fehlerfrei. Gesamt: {total_raw / link_bytes_per_s:.1f}s roh, "
+          f"{total_rle / link_bytes_per_s:.1f}s mit RLE")
+    return 0
+
+
+def synthetic_frames(count: int) -> List[dict]:
+    """Frames im Umfang eines echten Busses (ca. 300 Lampen, 80 Buttons, 3 Tueren)"""
+    import random
+
+    rng = random.Random(1)
+    signals = ["LED Ignition", "LED Engine", "LED FogLight", "LED RearFogLight", "LED Kneeling",
+               "ButtonLight Door 1", "ButtonLight Door 2", "ButtonLight Door 3"]
+    names = [f"Lamp {i:03d}" for i in range(300 - len(signals))] + signals
+    rng.shuffle(names)
+    buttons = [f"Button {i:02d}" for i in range(79)] + ["GearSwitch"]
+
+    frames = []
+    for _ in range(count):
+        frames.append({
+            "AllLamps": {name: rng.choice(("0", "0", "1", "0.5")) for name in names},
+            "Buttons": [{"Name": name, "State": rng.choice(("Neutral", "Drive", "Reverse"))}
+                        for name in buttons],
+            "Doors": [{"Name": f"Door {i}", "Open": rng.choice(("true", "false"))} for i in (1, 2, 3)],
+            "IsPlayerControlled": "true",
+        })
+    return frames
+
+
+def bench_parse(args) -> int:
+    """parse_telemetry: Namenssuche je Signal (vorher) gegen kompilierten Index (nachher)"""
+    import json
+    from bus_display_app import TelemetryController
+    from esp32_controller import ESP32Controller
+    from telemetry_index import TelemetryIndex, check_lamp_scan
+
+    if args.frames:
+        with open(args.frames, encoding="utf-8") as f:
+            frames = [json.loads(line) for line in f if line.strip()]
+        source = args.frames
+    else:
+        frames = synthetic_frames(args.count)
+        source = "synthetisch"
+    if not frames:
+        print(f"✗ Keine Frames in {args.frames}")
+        return 1
+
+    def quiet(message):
+        pass
+
+    controller = TelemetryController(ESP32Controller(log_callback=quiet), log_callback=quiet)
+    config = controller.lamp_config
+    index = TelemetryIndex(config)
+
+    def before(frame):
+        lamps = frame.get("AllLamps", {})
+        gear = None
+        for button in frame.get("Buttons", []):
+            if button.get("Name") == "GearSwitch":
+                gear = button.get("State")
+        return {signal: check_lamp_scan(lamps, names) for signal, names in config.items()}, gear
+
+    def after(frame):
+        index.prepare(frame, "benchmark")
+        return {signal: index.lamp(signal) for signal in config}, index.button("GearSwitch")
+
+    for n, frame in enumerate(frames):
+        if before(frame) != after(frame):
+            print(f"✗ Frame {n}: Index liefert andere Signale als die Namenssuche!")
+            return 1
+
+    def run(func):
+        return lambda: [func(frame) for frame in frames]
+
+    per_frame = 1000 / len(frames)
+    t_before = time_call(run(before), args.repeat) * per_frame
+    t_after = time_call(run(after), args.repeat) * per_frame
+    t_parse = time_call(run(controller.parse_telemetry), args.repeat) * per_frame
+    frame = frames[0]
+
+    print(f"\nparse_telemetry ({len(frames)} Frames, {source}, bester von {args.repeat})")
+    print("-" * 60)
+    print(f"  {len(frame.get('AllLamps', {}))} Lampen, {len(frame.get('Buttons', []))} Buttons, "
+          f"{len(frame.get('Doors', []))} Tueren je Frame")
+    print(f"  Signale lesen:     {t_before:>8.1f}us vorher {t_after:>8.1f}us nachher "
+          f"{t_before / t_after:>6.1f}x")
+    print(f"  parse_telemetry:   {t_parse:>8.1f}us je Frame ({controller.index.compiles} Mal aufgeloest)")
+    print(f"\n✓ Signale identisch, Index {index.compiles} Mal aufgeloest")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bus Display Benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    p_rgb565 = subparsers.add_parser("rgb565", help="RGB565-Konvertierung")
+    p_rgb565.add_argument("--images", default=str(ROOT_DIR / "test_images"), help="Ordner mit Testbildern")
+    p_rgb565.add_argument("--uploads", default=str(ROOT_DIR / "uploads"), help="Ordner mit Original-Uploads")
+    p_rgb565.add_argument("--artifacts", default=str(ROOT_DIR / "rgb565"), help="Ordner mit .rgb565-Referenzdateien")
+    p_rgb565.add_argument("--repeat", type=int, default=3, help="Wiederholungen pro Messung")
+    p_rgb565.set_defaults(func=bench_rgb565)
+
+    p_decode = subparsers.add_parser("decode", help="Dekodierung grosser Bilder")
+    p_decode.add_argument("--images", default=str(ROOT_DIR / "test_images"), help="Ordner mit Testbildern")
+    p_decode.add_argument("--megapixels", type=int, nargs="+", default=[12, 24], help="Eingabegroessen in MP")
+    p_decode.add_argument("--repeat", type=int, default=3, help="Wiederholungen pro Messung")
+    p_decode.set_defaults(func=bench_decode)
+
+    p_codec = subparsers.add_parser("codec", help="RLE-Transfer-Codec")
+    p_codec.add_argument("--images", default=str(ROOT_DIR / "test_images"), help="Ordner mit Testbildern")
+    p_codec.add_argument("--baudrate", type=int, default=921600, help="Baudrate fuer die Zeitschaetzung")
+    p_codec.add_argument("--repeat", type=int, default=3, help="Wiederholungen pro Messung")
+    p_codec.set_defaults(func=bench_codec)
+
+    p_parse = subparsers.add_parser("parse", help="Telemetrie-Auswertung (parse_telemetry)")
+    p_parse.add_argument("--frames", help="Aufgezeichnete Frames (telemetry_diagnose.py --monitor --record)")
+    p_parse.add_argument("--count", type=int, default=500, help="Anzahl synthetischer Frames ohne --frames")
+    p_parse.add_argument("--repeat", type=int, default=5, help="Wiederholungen pro Messung")
+    p_parse.set_defaults(func=bench_parse)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -27,7 +27,7 @@ import base64
 import zlib
 from dataclasses import dataclass
 from enum import Enum
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any
 
 # Eingebettete Bilder (komprimiert, Base64-kodiert)
 # Diese werden beim Start dekomprimiert
@@ -38,6 +38,11 @@ except ImportError:
     EMBEDDED_IMAGES = {}
     HAS_EMBEDDED_IMAGES = False
 
+from esp32_controller import ESP32Controller, DEFAULT_BAUDRATE, MAX_SLOTS
+from slot_manager import BASE_PRIORITY, Prefetcher, SlotManager, scan_variant_folder
+from telemetry_client import REQUESTS_AVAILABLE, PollScheduler, TelemetryClient
+from telemetry_index import TelemetryIndex
+
 # Imports mit Fehlerbehandlung
 try:
     import serial
@@ -47,13 +52,7 @@ except ImportError:
     SERIAL_AVAILABLE = False
 
 try:
-    import requests
-    REQUESTS_AVAILABLE = True
-except ImportError:
-    REQUESTS_AVAILABLE = False
-
-try:
-    from PIL import Image
+    import rgb565
     PIL_AVAILABLE = True
 except ImportError:
     PIL_AVAILABLE = False
@@ -66,11 +65,8 @@ except ImportError:
 APP_NAME = "Bus Simulator Display"
 APP_VERSION = "3.0"
 DEFAULT_TELEMETRY = "192.168.2.216:37337"
-DEFAULT_BAUDRATE = 921600
 SCREEN_WIDTH = 480
 SCREEN_HEIGHT = 320
-IMAGE_SIZE = SCREEN_WIDTH * SCREEN_HEIGHT * 2  # RGB565 = 2 bytes per pixel
-MAX_SLOTS = 8
 
 
 def decompress_embedded_image(slot: int) -> Optional[bytes]:
@@ -122,184 +118,12 @@ def convert_to_rgb565(image_path: str) -> Optional[bytes]:
         return None
     
     try:
-        img = Image.open(image_path)
-        img = img.convert('RGB')
-        img = img.resize((SCREEN_WIDTH, SCREEN_HEIGHT), Image.Resampling.LANCZOS)
-        
-        pixels = list(img.getdata())
-        rgb565_data = bytearray()
-        
-        for r, g, b in pixels:
-            # RGB888 zu RGB565
-            r5 = (r >> 3) & 0x1F
-            g6 = (g >> 2) & 0x3F
-            b5 = (b >> 3) & 0x1F
-            rgb565 = (r5 << 11) | (g6 << 5) | b5
-            # Little-endian
-            rgb565_data.append(rgb565 & 0xFF)
-            rgb565_data.append((rgb565 >> 8) & 0xFF)
-        
-        return bytes(rgb565_data)
+        return rgb565.convert_file(image_path, SCREEN_WIDTH, SCREEN_HEIGHT)
     except Exception as e:
         print(f"Konvertierungsfehler: {e}")
         return None
 
 
-# ============================================================================
-# ESP32 Controller
-# ============================================================================
-
-class ESP32Controller:
-    """Controller für ESP32-Kommunikation"""
-    
-    def __init__(self, log_callback=None):
-        self.serial: Optional[serial.Serial] = None
-        self.log = log_callback or print
-        self.connected = False
-        self.cached_slots = [False] * MAX_SLOTS
-    
-    def connect(self, port: str, baudrate: int = DEFAULT_BAUDRATE) -> bool:
-        """Verbindung herstellen"""
-        if not SERIAL_AVAILABLE:
-            self.log("FEHLER: PySerial nicht installiert!")
-            return False
-        
-        try:
-            self.serial = serial.Serial(port=port, baudrate=baudrate, timeout=1)
-            time.sleep(2)
-            self.log(f"Verbunden: {port} @ {baudrate} baud")
-            
-            # Auf ESP32 warten
-            start = time.time()
-            while time.time() - start < 5:
-                if self.serial.in_waiting:
-                    line = self.serial.readline().decode('utf-8', errors='ignore').strip()
-                    self.log(f"  ESP32: {line}")
-                    if "ACK" in line or "Ready" in line:
-                        self.connected = True
-                        self.log("ESP32 bereit!")
-                        return True
-            
-            self.connected = True
-            return True
-            
-        except Exception as e:
-            self.log(f"Verbindungsfehler: {e}")
-            return False
-    
-    def disconnect(self):
-        """Verbindung trennen"""
-        if self.serial and self.serial.is_open:
-            self.serial.close()
-        self.connected = False
-        self.log("Verbindung getrennt")
-    
-    def read_response(self, timeout: float = 1.0) -> List[str]:
-        """Liest Antworten vom ESP32"""
-        responses = []
-        if not self.serial:
-            return responses
-        
-        start = time.time()
-        while time.time() - start < timeout:
-            if self.serial.in_waiting:
-                line = self.serial.readline().decode('utf-8', errors='ignore').strip()
-                if line:
-                    responses.append(line)
-            time.sleep(0.01)
-        
-        return responses
-    
-    def cache_image(self, slot: int, image_data: bytes, progress_callback=None) -> bool:
-        """Cached ein Bild auf dem ESP32"""
-        if not self.serial or not self.connected:
-            return False
-        
-        if slot < 0 or slot >= MAX_SLOTS:
-            self.log(f"Ungueltiger Slot: {slot}")
-            return False
-        
-        if len(image_data) != IMAGE_SIZE:
-            self.log(f"Falsche Bildgroesse: {len(image_data)} (erwartet: {IMAGE_SIZE})")
-            return False
-        
-        try:
-            # Cache-Befehl senden
-            command = f"CACHE:{slot}:{IMAGE_SIZE}\n"
-            self.serial.write(command.encode())
-            self.log(f"Sende CACHE:{slot}:{IMAGE_SIZE}")
-            
-            # Auf ACK warten
-            time.sleep(0.1)
-            responses = self.read_response(2.0)
-            for r in responses:
-                self.log(f"  ESP32: {r}")
-            
-            ack_received = any("ACK" in r for r in responses)
-            if not ack_received:
-                self.log("Kein ACK erhalten, sende trotzdem...")
-            
-            # Bilddaten in Chunks senden
-            chunk_size = 4096
-            total_sent = 0
-            
-            while total_sent < len(image_data):
-                chunk = image_data[total_sent:total_sent + chunk_size]
-                self.serial.write(chunk)
-                total_sent += len(chunk)
-                
-                progress = int((total_sent / len(image_data)) * 100)
-                if progress_callback:
-                    progress_callback(progress)
-                
-                # Kurze Pause fuer Stabilitaet
-                time.sleep(0.005)
-            
-            self.log(f"Gesendet: {total_sent} bytes")
-            
-            # Auf Bestaetigung warten
-            time.sleep(0.5)
-            responses = self.read_response(5.0)
-            for r in responses:
-                self.log(f"  ESP32: {r}")
-            
-            if any("CACHED_OK" in r for r in responses):
-                self.cached_slots[slot] = True
-                self.log(f"Bild {slot + 1} erfolgreich gecached!")
-                return True
-            else:
-                self.log("Keine CACHED_OK Bestaetigung")
-                return False
-            
-        except Exception as e:
-            self.log(f"Cache-Fehler: {e}")
-            return False
-    
-    def show_image(self, slot: int, gear: int = 0, speed: int = 0) -> bool:
-        """Zeigt ein gecachtes Bild an"""
-        if not self.serial or not self.connected:
-            return False
-        
-        try:
-            command = f"SHOW:{slot}:{gear}:{speed}\n"
-            self.serial.write(command.encode())
-            return True
-        except:
-            return False
-    
-    def get_status(self) -> List[str]:
-        """Holt den Status vom ESP32"""
-        if not self.serial or not self.connected:
-            return []
-        
-        try:
-            self.serial.write(b"STATUS\n")
-            time.sleep(0.2)
-            return self.read_response(2.0)
-        except:
-            return []
-
-
 # ============================================================================
 # Telemetrie Controller
 # ============================================================================
@@ -311,8 +135,12 @@ class TelemetryController:
         self.esp32 = esp32
         self.log = log_callback or print
         self.telemetry_url = ""
+        self.client = None
+        self.scheduler = PollScheduler()
         self.bus_state = BusState()
         self.current_image = -1
+        self.slots = SlotManager(esp32, log_callback=self.log)
+        self.prefetcher = Prefetcher(self.slots)
         self.current_vehicle = None
         self.running = False
         
@@ -343,6 +171,16 @@ class TelemetryController:
             "door2": ["ButtonLight Door 2", "LED Door2", "Door2Open", "LED DoorRear"],
             "door3": ["ButtonLight Door 3", "LED Door3", "Door3Open"]
         }
+        self.index = TelemetryIndex(self.lamp_config)
+    
+    def set_telemetry_url(self, url: str):
+        """Setzt die Telemetrie-Adresse (neuer Verbindungspool nur bei Aenderung)"""
+        if self.client is None or self.client.base_url != url.rstrip("/"):
+            if self.client:
+                self.client.close()
+            self.client = TelemetryClient(url)
+            self.current_vehicle = None
+        self.telemetry_url = url
     
     def get_current_vehicle(self):
         """Holt aktuelles Fahrzeug"""
@@ -350,17 +188,7 @@ class TelemetryController:
             return None
         
         try:
-            response = requests.get(f"{self.telemetry_url}/vehicles", timeout=1)
-            vehicles = response.json()
-            if not vehicles:
-                return None
-            
-            response = requests.get(f"{self.telemetry_url}/player", timeout=1)
-            player = response.json()
-            
-            if player.get("Mode") == "Vehicle":
-                return player.get("CurrentVehicle")
-            return None
+            return self.client.get_current_vehicle()
         except:
             return None
     
@@ -375,35 +203,25 @@ class TelemetryController:
                 return None
         
         try:
-            url = f"{self.telemetry_url}/vehicles/{self.current_vehicle}"
-            params = {"vars": "Buttons,AllLamps,IsPlayerControlled,BusLogic,Velocity,Gear,Speed"}
-            response = requests.get(url, params=params, timeout=1)
-            data = response.json()
+            data = self.client.get_vehicle(self.current_vehicle)
             
             if data.get("IsPlayerControlled") == "false":
                 self.current_vehicle = None
                 return None
             
             return data
-        except:
+        except ValueError:
+            # Spiel antwortet, kennt das Fahrzeug aber nicht (mehr)
             self.current_vehicle = None
             return None
-    
-    def check_lamp(self, lamps: dict, names: list) -> bool:
-        """Prueft ob eine Lampe aktiv ist"""
-        for name in names:
-            if name in lamps:
-                try:
-                    if float(lamps[name]) > 0:
-                        return True
-                except:
-                    pass
-        return False
+        except:
+            # Verbindungsfehler: Fahrzeug merken, nach dem Wiederverbinden ist keine Suche noetig
+            return None
     
     def parse_telemetry(self, data: dict):
-        """Parst Telemetrie-Daten"""
-        lamps = data.get("AllLamps", {})
-        buttons = data.get("Buttons", [])
+        """Parst Telemetrie-Daten (Lampen/Buttons ueber den Index des Fahrzeugs)"""
+        index = self.index
+        index.prepare(data, self.current_vehicle)
         
         # Vorherige Zustaende speichern
         self.prev_ignition = self.bus_state.ignition_on
@@ -412,22 +230,18 @@ class TelemetryController:
         self.prev_both_doors = self.bus_state.front_door_open and self.bus_state.rear_door_open
         
         # Lampen auswerten
-        self.bus_state.ignition_on = self.check_lamp(lamps, self.lamp_config["ignition"])
-        self.bus_state.engine_running = self.check_lamp(lamps, self.lamp_config["engine"])
-        self.bus_state.fog_lights_on = self.check_lamp(lamps, self.lamp_config["fog_front"])
-        self.bus_state.rear_fog_on = self.check_lamp(lamps, self.lamp_config["fog_rear"])
-        self.bus_state.kneeling = self.check_lamp(lamps, self.lamp_config["kneeling"])
-        self.bus_state.front_door_open = self.check_lamp(lamps, self.lamp_config["door1"])
-        self.bus_state.rear_door_open = (
-            self.check_lamp(lamps, self.lamp_config["door2"]) or
-            self.check_lamp(lamps, self.lamp_config["door3"])
-        )
+        self.bus_state.ignition_on = index.lamp("ignition")
+        self.bus_state.engine_running = index.lamp("engine")
+        self.bus_state.fog_lights_on = index.lamp("fog_front")
+        self.bus_state.rear_fog_on = index.lamp("fog_rear")
+        self.bus_state.kneeling = index.lamp("kneeling")
+        self.bus_state.front_door_open = index.lamp("door1")
+        self.bus_state.rear_door_open = index.lamp("door2") or index.lamp("door3")
         
         # Gang
-        for button in buttons:
-            if button.get("Name") == "GearSwitch":
-                state = button.get("State", "Neutral")
-                self.bus_state.gear = 1 if state == "Drive" else (-1 if state == "Reverse" else 0)
+        state = index.button("GearSwitch")
+        if state is not None:
+            self.bus_state.gear = 1 if state == "Drive" else (-1 if state == "Reverse" else 0)
         
         # Geschwindigkeit
         if "Speed" in data:
@@ -507,39 +321,26 @@ class TelemetryController:
         # Normal
         return 1
     
-    def run_loop(self):
-        """Hauptschleife"""
-        last_time = 0
-        connection_msg = False
-        
-        while self.running:
-            now = time.time()
-            
-            if now - last_time >= 0.1:
-                last_time = now
-                
-                data = self.get_telemetry()
-                
-                if data:
-                    if not self.bus_state.connected:
-                        self.log("Verbunden mit Spiel!")
-                        connection_msg = False
-                    
-                    self.parse_telemetry(data)
-                    target = self.determine_image()
-                    
-                    if target != self.current_image:
-                        self.log(f"Wechsel zu Bild {target}")
-                        slot = target - 1
-                        if self.esp32.show_image(slot, self.bus_state.gear, self.bus_state.speed):
-                            self.current_image = target
-                else:
-                    if self.bus_state.connected and not connection_msg:
-                        self.log("Warte auf Spielverbindung...")
-                        connection_msg = True
-                    self.bus_state.connected = False
-            
-            time.sleep(0.01)
+    def sequence_active(self) -> bool:
+        """Laeuft gerade eine zeitgesteuerte Anzeige-Sequenz?"""
+        return self.showing_ignition_animation or self.showing_door_animation or self.in_kneeling_sequence
+    
+    def state_changed(self) -> bool:
+        """Hat sich seit der letzten Abfrage ein fuer die Bildwahl relevanter Zustand geaendert?"""
+        both_doors = self.bus_state.front_door_open and self.bus_state.rear_door_open
+        return (self.bus_state.ignition_on != self.prev_ignition
+                or self.bus_state.front_door_open != self.prev_front_door
+                or self.bus_state.kneeling != self.prev_kneeling
+                or both_doors != self.prev_both_doors)
+    
+    def show_target(self, target: int) -> bool:
+        """Zeigt Bild target (fahrzeugspezifisch, falls registriert), laedt es bei Bedarf hoch"""
+        return self.slots.show(target, self.bus_state.gear, self.bus_state.speed,
+                               variant=self.current_vehicle)
+    
+    def prefetch_next(self) -> bool:
+        """Laedt in Ruhephasen das voraussichtlich naechste Bild vorab"""
+        return self.prefetcher.step(self.current_image, self.bus_state, self.current_vehicle)
 
 
 # ============================================================================
@@ -686,6 +487,9 @@ class BusDisplayApp:
         
         # Alle cachen Button
         ttk.Button(btn_frame, text="Alle ausgewaehlten cachen", command=self.cache_all_images).pack(side=tk.LEFT, padx=5)
+        
+        # Fahrzeugspezifische Bilder (werden bei Bedarf hochgeladen)
+        ttk.Button(btn_frame, text="Fahrzeugbilder laden...", command=self.load_vehicle_images).pack(side=tk.LEFT, padx=5)
     
     def create_telemetry_tab(self):
         """Tab fuer Telemetrie"""
@@ -746,6 +550,9 @@ ANLEITUNG:
    - Fuer jedes Bild (1-8): "Waehlen" klicken und Bild auswaehlen
    - "Cachen" klicken um das Bild auf den ESP32 zu laden
    - Oder "Alle Bilder cachen" fuer alle auf einmal
+   - Optional "Fahrzeugbilder laden...": Ordner mit je einem Unterordner
+     pro Fahrzeug (z.B. "Lions_City") mit Bildern 1.png - 8.png. Sie werden
+     waehrend der Fahrt bei Bedarf statt der Grundbilder hochgeladen
 
 2. TELEMETRIE STARTEN (Tab "Telemetrie")
    - Telemetrie-Adresse eingeben (Standard: {DEFAULT_TELEMETRY})
@@ -804,6 +611,7 @@ BILD-LOGIK:
             if self.esp32.connect(port, DEFAULT_BAUDRATE):
                 self.connect_btn.config(text="Trennen")
                 self.conn_status.config(text="Verbunden", foreground="green")
+                self.telemetry.slots.sync_with_device()
             else:
                 messagebox.showerror("Fehler", "Verbindung fehlgeschlagen!")
     
@@ -856,13 +664,14 @@ BILD-LOGIK:
         # Cachen
         if self.esp32.cache_image(idx, rgb565_data, progress_callback=progress):
             self.status_labels[idx].config(text="Gecached!", foreground="green")
+            self.telemetry.slots.register(idx + 1, rgb565_data, priority=BASE_PRIORITY, slot=idx)
         else:
             self.status_labels[idx].config(text="Fehler!", foreground="red")
         
         self.progress_var.set(0)
     
     def cache_all_images(self):
-        """Alle Bilder cachen"""
+        """Alle Bilder cachen (eine Sitzung fuer alle Slots)"""
         if not self.esp32.connected:
             messagebox.showerror("Fehler", "ESP32 nicht verbunden!")
             return
@@ -874,14 +683,28 @@ BILD-LOGIK:
             messagebox.showerror("Fehler", "Keine Bilder ausgewaehlt!")
             return
         
+        if not PIL_AVAILABLE:
+            messagebox.showerror("Fehler", "Pillow nicht installiert!\npip install pillow")
+            return
+        
         self.log(f"Cache {len(selected)} Bilder...")
         
+        images = []
         for idx, path in selected:
-            self.cache_image(idx)
-            time.sleep(0.5)
+            self.status_labels[idx].config(text="Konvertiere...", foreground="orange")
+            self.root.update()
+            
+            rgb565_data = convert_to_rgb565(path)
+            if rgb565_data:
+                images.append((idx, rgb565_data))
+            else:
+                self.status_labels[idx].config(text="Fehler!", foreground="red")
+                self.log(f"Bild {idx + 1}: Konvertierung fehlgeschlagen!")
+        
+        success_count = self.send_cache_set(images)
         
         self.log("Alle Bilder gecached!")
-        messagebox.showinfo("Fertig", f"{len(selected)} Bilder erfolgreich gecached!")
+        messagebox.showinfo("Fertig", f"{success_count} von {len(selected)} Bildern erfolgreich gecached!")
     
     def cache_embedded_images(self):
         """Cached alle eingebetteten Bilder (test1-test8)"""
@@ -895,7 +718,7 @@ BILD-LOGIK:
         
         self.log("Cache alle eingebetteten Bilder (test1-test8)...")
         
-        success_count = 0
+        images = []
         for slot in range(1, MAX_SLOTS + 1):
             idx = slot - 1
             
@@ -910,26 +733,69 @@ BILD-LOGIK:
                 self.log(f"Bild {slot} nicht gefunden!")
                 continue
             
+            images.append((idx, rgb565_data))
+        
+        success_count = self.send_cache_set(images)
+        
+        self.log(f"Fertig! {success_count}/{MAX_SLOTS} Bilder gecached.")
+        messagebox.showinfo("Fertig", f"{success_count} von {MAX_SLOTS} Bildern erfolgreich gecached!")
+    
+    def send_cache_set(self, images: list) -> int:
+        """Sendet (Slot, RGB565-Daten) als Cache-Set, liefert die Anzahl erfolgreicher Slots"""
+        for idx, _ in images:
             self.status_labels[idx].config(text="Sende...", foreground="orange")
+        self.root.update()
+        
+        # Progress Callback
+        def progress(p):
+            self.progress_var.set(p)
             self.root.update()
-            
-            # Progress Callback
-            def progress(p):
-                self.progress_var.set(p)
-                self.root.update()
-            
-            # Cachen (idx ist 0-basiert)
-            if self.esp32.cache_image(idx, rgb565_data, progress_callback=progress):
+        
+        def slot_done(idx, ok):
+            if ok:
                 self.status_labels[idx].config(text="Gecached!", foreground="green")
-                success_count += 1
             else:
                 self.status_labels[idx].config(text="Fehler!", foreground="red")
-            
-            self.progress_var.set(0)
-            time.sleep(0.3)
+            self.root.update()
         
-        self.log(f"Fertig! {success_count}/{MAX_SLOTS} Bilder gecached.")
-        messagebox.showinfo("Fertig", f"{success_count} von {MAX_SLOTS} Bildern erfolgreich gecached!")
+        results = self.esp32.cache_set(images, progress_callback=progress, slot_callback=slot_done)
+        self.progress_var.set(0)
+        
+        # Grundbilder 1-8 in der virtuellen Bildtabelle vermerken
+        for idx, rgb565_data in images:
+            if results.get(idx):
+                self.telemetry.slots.register(idx + 1, rgb565_data, priority=BASE_PRIORITY, slot=idx)
+        return sum(1 for ok in results.values() if ok)
+    
+    def load_vehicle_images(self):
+        """Registriert fahrzeugspezifische Bilder aus einem Ordner (Unterordner je Fahrzeug)"""
+        if not PIL_AVAILABLE:
+            messagebox.showerror("Fehler", "Pillow nicht installiert!\npip install pillow")
+            return
+        
+        folder = filedialog.askdirectory()
+        if not folder:
+            return
+        
+        variants = scan_variant_folder(folder)
+        if not variants:
+            messagebox.showerror("Fehler", "Keine Fahrzeug-Unterordner mit Bildern 1-8 gefunden!")
+            return
+        
+        count = 0
+        for vehicle, images in variants.items():
+            for number, path in images.items():
+                self.root.update()
+                rgb565_data = convert_to_rgb565(path)
+                if rgb565_data:
+                    self.telemetry.slots.register((vehicle, number), rgb565_data, priority=BASE_PRIORITY)
+                    count += 1
+                else:
+                    self.log(f"{vehicle} Bild {number}: Konvertierung fehlgeschlagen!")
+            self.log(f"Fahrzeugbilder {vehicle}: {', '.join(str(n) for n in sorted(images))}")
+        
+        self.log(f"{count} Fahrzeugbilder fuer {len(variants)} Fahrzeuge registriert")
+        messagebox.showinfo("Fertig", f"{count} Fahrzeugbilder fuer {len(variants)} Fahrzeuge registriert!")
     
     def start_telemetry(self):
         """Startet Telemetrie"""
@@ -946,7 +812,7 @@ BILD-LOGIK:
             messagebox.showerror("Fehler", "Telemetrie-Adresse eingeben!")
             return
         
-        self.telemetry.telemetry_url = f"http://{telemetry_addr}"
+        self.telemetry.set_telemetry_url(f"http://{telemetry_addr}")
         self.telemetry.running = True
         
         self.telemetry_thread = threading.Thread(target=self.run_telemetry, daemon=True)
@@ -961,29 +827,47 @@ BILD-LOGIK:
     def run_telemetry(self):
         """Telemetrie-Thread"""
         last_image = -1
+        last_health = None
+        
+        scheduler = self.telemetry.scheduler
+        health = self.telemetry.client.health
         
         while self.telemetry.running:
+            scheduler.started()
             try:
                 data = self.telemetry.get_telemetry()
                 
                 if data:
                     self.telemetry.parse_telemetry(data)
                     target = self.telemetry.determine_image()
+                    changed = target != self.telemetry.current_image or self.telemetry.state_changed()
                     
                     if target != self.telemetry.current_image:
                         self.log(f"Wechsel zu Bild {target}")
-                        slot = target - 1
-                        if self.esp32.show_image(slot, self.telemetry.bus_state.gear, self.telemetry.bus_state.speed):
+                        if self.telemetry.show_target(target):
                             self.telemetry.current_image = target
+                            scheduler.decided()
+                    else:
+                        self.telemetry.prefetch_next()
+                    
+                    scheduler.update(True, active=self.telemetry.sequence_active(), changed=changed,
+                                     idle=not self.telemetry.bus_state.ignition_on)
                     
                     if target != last_image:
                         self.root.after(0, lambda t=target: self.image_status.config(text=f"Aktuelles Bild: {t}"))
                         last_image = target
+                else:
+                    scheduler.update(False, health=health)
+                
+                if health.state != last_health:
+                    if last_health is not None:
+                        self.log(f"Telemetrie-Verbindung: {health.state}")
+                    last_health = health.state
                 
             except Exception as e:
                 self.log(f"Fehler: {e}")
             
-            time.sleep(0.1)
+            time.sleep(scheduler.delay())
     
     def stop_telemetry(self):
         """Stoppt Telemetrie"""
@@ -991,12 +875,19 @@ BILD-LOGIK:
         
         if self.telemetry_thread:
             self.telemetry_thread.join(timeout=2)
+        self.telemetry.prefetcher.stop(timeout=2)
         
         self.start_btn.config(state=tk.NORMAL)
         self.stop_btn.config(state=tk.DISABLED)
         self.tele_status.config(text="Telemetrie: Inaktiv", foreground="black")
         
         self.log("Telemetrie gestoppt")
+        self.log(self.telemetry.slots.format_stats())
+        self.log(self.esp32.format_writer_stats())
+        if self.telemetry.client:
+            self.log(self.telemetry.client.stats.format())
+            self.log(self.telemetry.client.health.format())
+        self.log(self.telemetry.scheduler.stats.format())
     
     def show_diagnosis(self):
         """Zeigt Diagnose"""
@@ -1012,34 +903,28 @@ BILD-LOGIK:
         self.log("Lade Telemetrie-Diagnose...")
         
         try:
-            base_url = f"http://{telemetry_addr}"
-            
-            # Fahrzeug finden
-            response = requests.get(f"{base_url}/vehicles", timeout=2)
-            vehicles = response.json()
-            
-            if not vehicles:
-                messagebox.showerror("Fehler", "Keine Fahrzeuge gefunden!")
-                return
-            
-            response = requests.get(f"{base_url}/player", timeout=2)
-            player = response.json()
-            
-            vehicle = None
-            if player.get("Mode") == "Vehicle":
-                vehicle = player.get("CurrentVehicle")
-            elif vehicles:
-                vehicle = vehicles[0] if isinstance(vehicles[0], str) else vehicles[0].get("Id")
-            
-            if not vehicle:
-                messagebox.showerror("Fehler", "Kein aktives Fahrzeug!")
-                return
-            
-            # Daten abrufen
-            url = f"{base_url}/vehicles/{vehicle}"
-            params = {"vars": "Buttons,AllLamps"}
-            response = requests.get(url, params=params, timeout=2)
-            data = response.json()
+            with TelemetryClient(f"http://{telemetry_addr}", timeout=(2, 2)) as client:
+                # Fahrzeug finden
+                vehicles = client.get_vehicles()
+                
+                if not vehicles:
+                    messagebox.showerror("Fehler", "Keine Fahrzeuge gefunden!")
+                    return
+                
+                player = client.get_player()
+                
+                vehicle = None
+                if player.get("Mode") == "Vehicle":
+                    vehicle = player.get("CurrentVehicle")
+                elif vehicles:
+                    vehicle = vehicles[0] if isinstance(vehicles[0], str) else vehicles[0].get("Id")
+                
+                if not vehicle:
+                    messagebox.showerror("Fehler", "Kein aktives Fahrzeug!")
+                    return
+                
+                # Daten abrufen
+                data = client.get_vehicle(vehicle, "Buttons,AllLamps")
             
             lamps = data.get("AllLamps", {})
             buttons = data.get("Buttons", [])
@@ -0,0 +1,467 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ESP32 Controller (asyncio)
+==========================
+
+Gegenstueck zu esp32_controller.py fuer Programme mit eigenem Event-Loop
+(telemetry_display.py). Alle Zugriffe auf die serielle Schnittstelle sind
+awaitable und blockieren den Loop nicht:
+
+- Lesen: der Dateideskriptor von pyserial wird per loop.add_reader
+  ueberwacht (Linux/macOS). Wo es keinen Deskriptor gibt (Windows), liest
+  eine Executor-Aufgabe mit kurzem Timeout.
+- Schreiben: nicht-blockierendes os.write, bei vollem Puffer wird per
+  loop.add_writer gewartet (Windows: Executor).
+
+Protokoll, Faehigkeiten (CAPS), Binaerrahmen (HELLO), RLE und
+Block-Uebertragung entsprechen ESP32Controller. Kodierung, Block-Fenster,
+Antwort-Auswertung und Befehls-Queue kommen aus esp32_controller.py; hier
+liegt nur die Ein-/Ausgabe. SHOW/OVERLAY sind "neuester gewinnt": laeuft
+gerade eine Uebertragung, wartet hoechstens ein Befehl je Art und wird
+(PREEMPT) zwischen zwei Bloecken eingeschoben.
+"""
+
+import asyncio
+import os
+import zlib
+from typing import List, Optional, Sequence, Set, Tuple, Union
+
+import esp32_protocol
+from esp32_controller import (
+    ACK_TIMEOUT, BLOCK_REPLIES, BLOCK_SIZE, BLOCK_TIMEOUT, CACHED_TIMEOUT, DEFAULT_BAUDRATE,
+    END_BLOCK, IMAGE_SIZE, MAX_SLOTS, PREEMPT_POLL, READY_PROBE_INTERVAL, READY_TIMEOUT,
+    REPLY_QUEUE_SIZE, BlockWindow, CommandQueue, WriterStats, cache_command, choose_encoding,
+    negotiated_version, overlay_command, parse_caps, parse_slot_hashes, parse_window,
+    show_command,
+)
+
+try:
+    import serial
+    SERIAL_AVAILABLE = True
+except ImportError:
+    SERIAL_AVAILABLE = False
+
+# Lese-Timeout der Executor-Variante (ohne Dateideskriptor)
+EXECUTOR_READ_TIMEOUT = 0.05
+
+
+class AsyncSerialTransport:
+    """Serielle Schnittstelle im Event-Loop: Empfang als Zeilen/Rahmen in einer asyncio.Queue"""
+
+    def __init__(self):
+        self.serial: Optional["serial.Serial"] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.fd: Optional[int] = None
+        self.items: "asyncio.Queue[Union[str, esp32_protocol.Frame]]" = asyncio.Queue(REPLY_QUEUE_SIZE)
+        self.lost = 0
+        self.decoder = esp32_protocol.StreamDecoder()
+        self.reader_task: Optional[asyncio.Task] = None
+
+    async def open(self, port: str, baudrate: int):
+        """Oeffnet den Port und startet den Empfang"""
+        self.loop = asyncio.get_running_loop()
+        self.items = asyncio.Queue(REPLY_QUEUE_SIZE)
+        self.decoder = esp32_protocol.StreamDecoder()
+        self.serial = await self.loop.run_in_executor(
+            None, lambda: serial.Serial(port=port, baudrate=baudrate, timeout=0))
+
+        try:
+            self.fd = self.serial.fileno()
+            os.set_blocking(self.fd, False)
+            self.loop.add_reader(self.fd, self.on_readable)
+        except (AttributeError, NotImplementedError, OSError, ValueError):
+            # Kein pollbarer Deskriptor (Windows): im Executor lesen
+            self.fd = None
+            self.serial.timeout = EXECUTOR_READ_TIMEOUT
+            self.reader_task = self.loop.create_task(self.executor_read_loop())
+
+    @property
+    def is_open(self) -> bool:
+        return self.serial is not None and self.serial.is_open
+
+    def on_readable(self):
+        """Callback des Loops: Daten liegen an"""
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if not data:
+            # Geraet getrennt: Port schliessen, damit Schreibversuche scheitern
+            self.loop.remove_reader(self.fd)
+            self.fd = None
+            self.serial.close()
+            return
+        self.feed(data)
+
+    async def executor_read_loop(self):
+        while self.is_open:
+            try:
+                data = await self.loop.run_in_executor(
+                    None, lambda: self.serial.read(max(1, self.serial.in_waiting)))
+            except Exception:
+                break
+            self.feed(data)
+
+    def feed(self, data: bytes):
+        for item in self.decoder.feed(data):
+            # Volle Queue: die aelteste Antwort faellt weg
+            if self.items.full():
+                self.items.get_nowait()
+                self.lost += 1
+            self.items.put_nowait(item)
+
+    async def write(self, data: bytes):
+        """Schreibt data vollstaendig, ohne den Loop zu blockieren"""
+        if self.fd is None:
+            await self.loop.run_in_executor(None, self.serial.write, data)
+            return
+
+        view = memoryview(data)
+        while view:
+            try:
+                written = os.write(self.fd, view)
+            except BlockingIOError:
+                written = 0
+            view = view[written:]
+            if view:
+                await self.writable()
+
+    async def writable(self):
+        """Wartet, bis der Sendepuffer wieder Platz hat"""
+        ready = self.loop.create_future()
+        self.loop.add_writer(self.fd, lambda: ready.done() or ready.set_result(None))
+        try:
+            await ready
+        finally:
+            self.loop.remove_writer(self.fd)
+
+    async def close(self):
+        if self.fd is not None:
+            self.loop.remove_reader(self.fd)
+            self.fd = None
+        if self.reader_task:
+            self.reader_task.cancel()
+            self.reader_task = None
+        if self.serial and self.serial.is_open:
+            self.serial.close()
+
+
+class AsyncESP32Controller:
+    """Controller fuer ESP32-Kommunikation im Event-Loop"""
+
+    def __init__(self, log_callback=None, compression: bool = True):
+        self.transport = AsyncSerialTransport()
+        self.log = log_callback or print
+        self.connected = False
+        self.compression = compression
+        self.features: Set[str] = set()
+        self.protocol_version = 0
+        self.overlay: Optional[Tuple[int, int, int]] = None
+        # Vom ESP32 gemeldete CRC32 je Slot (None = leer/unbekannt)
+        self.slot_hashes: List[Optional[int]] = [None] * MAX_SLOTS
+        # Wartende SHOW/OVERLAY-Befehle, solange eine Uebertragung die Leitung haelt
+        self.writer_stats = WriterStats()
+        self.pending = CommandQueue(self.writer_stats)
+        self.link = asyncio.Lock()
+
+    async def connect(self, port: str, baudrate: int = DEFAULT_BAUDRATE) -> bool:
+        """Verbindung herstellen"""
+        if not SERIAL_AVAILABLE:
+            self.log("FEHLER: PySerial nicht installiert!")
+            return False
+
+        # Leitung fuer den ganzen Handshake sperren: read_response() liefert
+        # solange nichts und kann CAPS/HELLO/HASHES nicht wegnehmen
+        async with self.link:
+            try:
+                await self.transport.open(port, baudrate)
+                self.log(f"Verbunden: {port} @ {baudrate} baud")
+                self.connected = True
+
+                # Auf ESP32 warten (Reset beim Oeffnen des Ports), sonst per CAPS wecken
+                loop = asyncio.get_running_loop()
+                deadline = loop.time() + READY_TIMEOUT
+                while loop.time() < deadline:
+                    if await self.read_reply(("ACK", "Ready", "CAPS:", "Unknown command"),
+                                             READY_PROBE_INTERVAL):
+                        self.log("ESP32 bereit!")
+                        break
+                    await self.transport.write(b"CAPS\n")
+
+                self.overlay = None
+                self.pending.clear()
+                self.slot_hashes = [None] * MAX_SLOTS
+                await self.negotiate_features()
+                if "HASH" in self.features:
+                    await self.sync_slot_hashes()
+                return True
+
+            except Exception as e:
+                self.connected = False
+                self.log(f"Verbindungsfehler: {e}")
+                return False
+
+    async def negotiate_features(self):
+        """CAPS und (bei BIN) HELLO"""
+        self.features = set()
+        await self.send_command("CAPS")
+        self.features = parse_caps(await self.read_reply(("CAPS:", "Unknown command"), 1.0))
+        if self.features:
+            self.log(f"ESP32 Faehigkeiten: {', '.join(sorted(self.features))}")
+
+        self.protocol_version = 0
+        if "BIN" in self.features:
+            await self.send_command(esp32_protocol.encode_hello())
+            self.protocol_version = negotiated_version(
+                await self.read_frame(esp32_protocol.OP_HELLO, 1.0))
+        if self.protocol_version:
+            self.log(f"Binaerprotokoll v{self.protocol_version} aktiv")
+
+    async def sync_slot_hashes(self):
+        """Liest die CRC32 aller Slots vom ESP32 (HASHES)"""
+        if self.protocol_version:
+            await self.send_command(esp32_protocol.encode_hashes())
+            reply = await self.read_frame(esp32_protocol.OP_HASHES, 1.0)
+            if reply is None or reply.status != esp32_protocol.STATUS_OK:
+                return
+        else:
+            await self.send_command("HASHES")
+            reply = await self.read_reply(("HASHES:",), 1.0)
+            if reply is None:
+                return
+        self.slot_hashes = parse_slot_hashes(reply)
+
+    @property
+    def is_open(self) -> bool:
+        """Verbunden und Port noch offen?"""
+        return self.connected and self.transport.is_open
+
+    async def disconnect(self):
+        """Verbindung trennen"""
+        self.connected = False
+        self.pending.clear()
+        await self.transport.close()
+        self.log("Verbindung getrennt")
+
+    def discard_replies(self):
+        """Verwirft liegengebliebene Antworten"""
+        while not self.transport.items.empty():
+            self.transport.items.get_nowait()
+
+    async def send_command(self, command: Union[str, bytes]):
+        """Sendet einen Textbefehl oder Binaerrahmen; liegengebliebene Antworten werden verworfen"""
+        self.discard_replies()
+        if isinstance(command, str):
+            command = f"{command}\n".encode()
+        await self.transport.write(command)
+
+    async def read_reply(self, tokens: Sequence[str] = ("",), timeout: float = 1.0,
+                         log_lines: bool = True) -> Optional[str]:
+        """Wartet auf eine Zeile, die mit einem der Tokens beginnt (None nach Ablauf der Frist)"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return None
+            try:
+                item = await asyncio.wait_for(self.transport.items.get(), remaining)
+            except asyncio.TimeoutError:
+                return None
+            if not isinstance(item, str):
+                continue
+            if log_lines:
+                self.log(f"  ESP32: {item}")
+            if item.startswith(tuple(tokens)):
+                return item
+
+    async def read_frame(self, opcode: int, timeout: float) -> Optional[esp32_protocol.Frame]:
+        """Wartet auf die Antwort (Rahmen) zu opcode"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return None
+            try:
+                item = await asyncio.wait_for(self.transport.items.get(), remaining)
+            except asyncio.TimeoutError:
+                return None
+            if isinstance(item, esp32_protocol.Frame):
+                if item.is_response and item.command == opcode:
+                    return item
+            else:
+                self.log(f"  ESP32: {item}")
+
+    def read_response(self) -> List[str]:
+        """Alle bereits empfangenen Textzeilen (waehrend Verbindungsaufbau oder Uebertragung keine)"""
+        lines = []
+        if self.link.locked():
+            return lines
+        while not self.transport.items.empty():
+            item = self.transport.items.get_nowait()
+            if isinstance(item, str):
+                lines.append(item)
+        return lines
+
+    async def enqueue(self, kind: str, data: bytes):
+        """SHOW/OVERLAY senden; laeuft eine Uebertragung, wartet nur der neueste Befehl je Art"""
+        self.pending.put(kind, data)
+        await self.flush()
+
+    async def flush(self):
+        """Schreibt wartende Befehle, sofern gerade keine Uebertragung laeuft"""
+        if self.pending and not self.link.locked():
+            async with self.link:
+                await self.write_pending()
+
+    async def write_pending(self, interleaved: bool = False) -> int:
+        """Schreibt wartende SHOW/OVERLAY-Befehle (interleaved: mitten in einer Uebertragung)"""
+        count = 0
+        while self.pending:
+            await self.transport.write(self.pending.pop())
+            count += 1
+        self.writer_stats.sent += count
+        if interleaved:
+            self.writer_stats.interleaved += count
+        return count
+
+    async def show_image(self, slot: int, gear: int = 0, speed: int = 0) -> bool:
+        """Zeigt ein gecachtes Bild an"""
+        if not self.connected:
+            return False
+        try:
+            await self.enqueue("show", show_command(slot, gear, speed, self.protocol_version))
+            self.overlay = (slot, gear, speed)
+            return True
+        except Exception:
+            return False
+
+    async def update_overlay(self, gear: int = 0, speed: int = 0) -> bool:
+        """Aktualisiert nur Gang/Geschwindigkeit, wenn sich die Anzeige aendert"""
+        if not self.connected or self.overlay is None:
+            return False
+
+        slot, shown_gear, shown_speed = self.overlay
+        if (gear, speed) == (shown_gear, shown_speed):
+            return True
+        if "OVERLAY" not in self.features:
+            return await self.show_image(slot, gear, speed)
+
+        try:
+            await self.enqueue("overlay", overlay_command(gear, speed, self.protocol_version))
+            self.overlay = (slot, gear, speed)
+            return True
+        except Exception:
+            return False
+
+    def choose_encoding(self, payload: bytes) -> Tuple[str, bytes]:
+        """Waehlt die Uebertragungs-Kodierung und liefert (Kodierung, Nutzdaten)"""
+        return choose_encoding(payload, self.features, self.compression)
+
+    @property
+    def use_blocks(self) -> bool:
+        return "BLOCK" in self.features
+
+    @property
+    def preemptible(self) -> bool:
+        return bool(self.protocol_version) and self.use_blocks and "PREEMPT" in self.features
+
+    async def cache_image(self, slot: int, image_data: bytes, progress_callback=None) -> bool:
+        """Cached ein Bild auf dem ESP32 (CACHE, RLE und Bloecke je nach Faehigkeiten)"""
+        if not self.connected:
+            return False
+        if slot < 0 or slot >= MAX_SLOTS or len(image_data) != IMAGE_SIZE:
+            self.log(f"Ungueltiger Slot oder Bildgroesse: {slot}, {len(image_data)}")
+            return False
+        crc = zlib.crc32(image_data)
+        if self.slot_hashes[slot] == crc:
+            self.log(f"Bild {slot + 1} liegt bereits auf dem ESP32 - nichts zu senden")
+            return True
+
+        # Kompression rechnet im Executor, der Loop bleibt frei
+        loop = asyncio.get_running_loop()
+        encoding, payload = await loop.run_in_executor(None, self.choose_encoding, image_data)
+        command = cache_command(slot, encoding, len(payload), self.protocol_version, self.use_blocks)
+
+        try:
+            async with self.link:
+                await self.send_command(command)
+                if self.use_blocks:
+                    ok = await self.send_blocks(payload, progress_callback)
+                else:
+                    ok = await self.send_stream(payload, progress_callback)
+                if ok:
+                    reply = await self.read_reply(("CACHED_OK", "ERROR"), CACHED_TIMEOUT)
+                    ok = bool(reply and reply.startswith("CACHED_OK"))
+        except Exception as e:
+            self.log(f"Cache-Fehler: {e}")
+            return False
+        finally:
+            await self.flush()
+
+        # Nach einem Fehlschlag ist der Slot-Inhalt unbekannt
+        self.slot_hashes[slot] = crc if ok else None
+        if ok:
+            self.log(f"Bild {slot + 1} erfolgreich gecached!")
+        return ok
+
+    async def send_stream(self, payload: bytes, progress_callback=None) -> bool:
+        """Datenphase ohne Blockrahmen"""
+        reply = await self.read_reply(("ACK", "ERROR"), ACK_TIMEOUT)
+        if reply and reply.startswith("ERROR"):
+            return False
+        view = memoryview(payload)
+        for offset in range(0, len(payload), BLOCK_SIZE):
+            await self.transport.write(view[offset:offset + BLOCK_SIZE])
+            if progress_callback:
+                progress_callback(min(offset + BLOCK_SIZE, len(payload)) * 100 // len(payload))
+        return True
+
+    async def send_blocks(self, payload: bytes, progress_callback=None) -> bool:
+        """Datenphase als CRC-gesicherte Bloecke im Fenster des ESP32"""
+        window = parse_window(await self.read_reply(("WINDOW:", "ERROR"), ACK_TIMEOUT))
+        if window is None:
+            self.log("Kein Empfangsfenster vom ESP32")
+            return False
+
+        blocks = BlockWindow(payload, window, progress_callback)
+        while not blocks.finished:
+            while blocks.can_send:
+                if self.preemptible:
+                    await self.write_pending(interleaved=True)
+                await self.transport.write(blocks.next_block())
+
+            reply = await self.wait_block_reply()
+            if not (blocks.timeout() if reply is None else blocks.reply(reply)):
+                self.log(blocks.error)
+                return False
+
+        await self.transport.write(END_BLOCK)
+        return True
+
+    async def wait_block_reply(self) -> Optional[str]:
+        """Wartet auf BOK/BERR; wartende SHOW/OVERLAY-Befehle gehen in der Zwischenzeit raus"""
+        if not self.preemptible:
+            return await self.read_reply(BLOCK_REPLIES, BLOCK_TIMEOUT, log_lines=False)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + BLOCK_TIMEOUT
+        while True:
+            await self.write_pending(interleaved=True)
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return None
+            reply = await self.read_reply(BLOCK_REPLIES, min(PREEMPT_POLL, remaining), log_lines=False)
+            if reply is not None:
+                return reply
+
+    def format_writer_stats(self) -> str:
+        """Writer-Statistik als Logzeile"""
+        s = self.writer_stats
+        return (f"Befehle: {s.sent} gesendet, {s.dropped} veraltet verworfen, "
+                f"max. {s.max_depth} wartend, {s.interleaved} in Uploads eingeschoben, "
+                f"{self.transport.lost} Antworten verloren")
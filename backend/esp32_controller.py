@@ -0,0 +1,1036 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ESP32 Controller
+================
+
+Serielle Kommunikation mit esp32_display_serial.ino, gemeinsam genutzt von
+bus_display_app.py und BusDisplay_Complete.py.
+
+Beim Verbinden fragt der Controller mit "CAPS" die Faehigkeiten des
+Sketches ab. Kennt der Sketch RLE, werden Bilder komprimiert gecached
+(siehe rgb565_codec.py); aeltere Sketches bekommen weiterhin Rohdaten.
+
+Der Controller merkt sich, welches Bild in welchem Slot liegt. Kennt der
+Sketch PATCH, werden beim erneuten Cachen nur die geaenderten Kacheln
+gegenueber dem Slot-Inhalt (oder einem Basis-Slot) uebertragen.
+
+Antworten des ESP32 liest ein Hintergrund-Thread zeilenweise in eine
+Queue. Befehle warten gezielt auf ihr Antwort-Token (ACK, CACHED_OK, ...)
+mit einer Frist statt immer die volle Timeout-Zeit abzusitzen.
+
+Kennt der Sketch BLOCK, laufen die Bilddaten als Bloecke mit Sequenznummer
+und CRC32. Der ESP32 gibt ein Empfangsfenster vor und bestaetigt jeden
+Block einzeln; nur fehlerhafte Bloecke werden wiederholt.
+
+Kennt der Sketch BIN, gehen Befehle als Binaerrahmen raus (siehe
+esp32_protocol.py); die Protokollversion wird beim Verbinden per HELLO
+ausgehandelt. Sonst wird das Textprotokoll verwendet.
+
+Mit cache_set werden mehrere Slots in einer Sitzung gecached (SET): alle
+Slots und Groessen werden einmal angekuendigt, die Daten direkt
+hintereinander gesendet und die Bestaetigungen je Slot nebenbei
+eingesammelt.
+
+Kennt der Sketch HASH, meldet er beim Verbinden eine CRC32 je Slot. Slots,
+deren Inhalt schon zum gewuenschten Bild passt, werden nicht erneut
+uebertragen - auch nach einem Neustart der App ohne Reset des ESP32.
+
+SHOW- und OVERLAY-Befehle schreibt ein eigener Writer-Thread. Je Art wartet
+hoechstens ein Befehl; ein neuerer ersetzt den noch nicht gesendeten
+aelteren (neuester gewinnt), so dass sich bei schnellen Zustandswechseln
+kein Rueckstau veralteter Befehle auf der Leitung bildet. Uebertragungen
+mit Antwortwechsel (CACHE, STATUS, ...) halten waehrenddessen die Leitung.
+
+Kennt der Sketch PREEMPT, werden wartende SHOW/OVERLAY-Rahmen waehrend
+einer Block-Uebertragung zwischen zwei Bloecken eingeschoben, statt bis zum
+Ende des Uploads zu warten.
+
+Die Protokoll-Logik ohne Ein-/Ausgabe (Kodierung, Befehle, Auswertung der
+Antworten, Block-Fenster, Befehls-Queue) liegt in Modulfunktionen,
+BlockWindow und CommandQueue; esp32_async.py benutzt sie mit.
+"""
+
+import queue
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple, Union
+
+import esp32_protocol
+import rgb565_codec
+
+try:
+    import serial
+    SERIAL_AVAILABLE = True
+except ImportError:
+    SERIAL_AVAILABLE = False
+
+
+DEFAULT_BAUDRATE = 921600
+SCREEN_WIDTH = 480
+SCREEN_HEIGHT = 320
+IMAGE_SIZE = SCREEN_WIDTH * SCREEN_HEIGHT * 2  # RGB565 = 2 bytes per pixel
+MAX_SLOTS = 8
+
+# Fristen fuer Antworten in Sekunden
+READY_TIMEOUT = 5.0
+READY_PROBE_INTERVAL = 0.5
+ACK_TIMEOUT = 2.0
+CACHED_TIMEOUT = 5.0
+
+# Block-Uebertragung (siehe esp32_display_serial.ino)
+BLOCK_MAGIC = 0x5A
+BLOCK_SIZE = 4096
+BLOCK_END = 0xFFFF
+BLOCK_TIMEOUT = 1.0
+MAX_BLOCK_RETRIES = 5
+# Takt, in dem eine Block-Uebertragung nach wartenden SHOW/OVERLAY-Befehlen schaut
+PREEMPT_POLL = 0.01
+
+# Antwort-Queue des Lese-Threads; ist sie voll, fallen die aeltesten Eintraege weg
+REPLY_QUEUE_SIZE = 256
+# Bestaetigungen der SHOW/OVERLAY-Befehle aus dem Writer-Thread - darauf wartet niemand
+UNSOLICITED_REPLIES = ("SHOW_OK", "OVERLAY_OK", ">>> Displaying")
+UNSOLICITED_OPCODES = (esp32_protocol.OP_SHOW, esp32_protocol.OP_OVERLAY)
+
+# Coalescing im Writer-Thread: Befehlsart -> wartende Arten, die sie ersetzt
+# (ein neues SHOW enthaelt Gang/Geschwindigkeit, macht also auch OVERLAY hinfaellig)
+SUPERSEDES: Dict[str, Tuple[str, ...]] = {
+    "show": ("show", "overlay"),
+    "overlay": ("overlay",),
+}
+
+
+@dataclass
+class WriterStats:
+    """Zaehler des Writer-Threads"""
+    sent: int = 0
+    dropped: int = 0
+    max_depth: int = 0
+    interleaved: int = 0
+    acks: int = 0
+    lost_replies: int = 0
+
+
+def is_unsolicited(item: Union[str, esp32_protocol.Frame]) -> bool:
+    """Erfolgsmeldung zu SHOW/OVERLAY, die niemand abholt?"""
+    if isinstance(item, str):
+        return item.startswith(UNSOLICITED_REPLIES)
+    return (item.is_response and item.command in UNSOLICITED_OPCODES
+            and item.status == esp32_protocol.STATUS_OK)
+
+
+# Antworten auf einen gesendeten Block
+BLOCK_REPLIES = ("BOK:", "BERR:", "ERROR")
+# Leerer Abschluss-Block beendet die Datenphase
+END_BLOCK = struct.pack('<BHHI', BLOCK_MAGIC, BLOCK_END, 0, 0)
+
+
+# Protokoll-Logik ohne Ein-/Ausgabe, gemeinsam fuer ESP32Controller und
+# AsyncESP32Controller (esp32_async.py)
+
+def parse_caps(line: Optional[str]) -> Set[str]:
+    """Faehigkeiten aus der Antwort auf CAPS (aeltere Sketches: keine)"""
+    if not line or not line.startswith("CAPS:"):
+        return set()
+    return {f for f in line[5:].split(",") if f}
+
+
+def negotiated_version(reply: Optional[esp32_protocol.Frame]) -> int:
+    """Protokollversion aus der Antwort auf HELLO (0 = Textbefehle)"""
+    if reply is None or reply.status != esp32_protocol.STATUS_OK:
+        return 0
+    return min(esp32_protocol.decode_hello(reply), esp32_protocol.PROTOCOL_VERSION)
+
+
+def parse_slot_hashes(reply: Union[str, esp32_protocol.Frame]) -> List[Optional[int]]:
+    """CRC32 je Slot aus der Antwort auf HASHES (Zeile oder Rahmen), None = leer"""
+    if isinstance(reply, str):
+        hashes = [None if h == "-" else int(h, 16) for h in reply[7:].split(",")]
+    else:
+        hashes = esp32_protocol.decode_hashes(reply)
+    return (list(hashes[:MAX_SLOTS]) + [None] * MAX_SLOTS)[:MAX_SLOTS]
+
+
+def parse_window(reply: Optional[str]) -> Optional[int]:
+    """Empfangsfenster aus WINDOW:n (None = abgelehnt oder keine Antwort)"""
+    if reply is None or not reply.startswith("WINDOW:"):
+        return None
+    return max(1, int(reply[7:]))
+
+
+def choose_encoding(payload: bytes, features: Set[str], compression: bool = True) -> Tuple[str, bytes]:
+    """Waehlt die Uebertragungs-Kodierung und liefert (Kodierung, Nutzdaten)"""
+    if compression and rgb565_codec.ENCODING_RLE in features:
+        encoded = rgb565_codec.encode_rle(payload)
+        if len(encoded) < len(payload):
+            return rgb565_codec.ENCODING_RLE, encoded
+    return rgb565_codec.ENCODING_RAW, payload
+
+
+def cache_command(slot: int, encoding: str, length: int, protocol_version: int,
+                  blocks: bool) -> Union[str, bytes]:
+    """CACHE-Befehl (Rahmen oder Textzeile) fuer length bytes Nutzdaten"""
+    rle = encoding == rgb565_codec.ENCODING_RLE
+    if protocol_version:
+        return esp32_protocol.encode_cache(slot, length, rle, blocks)
+    command = f"CACHE:{slot}:{length}" + (f":{encoding}" if rle else "")
+    return command + ":BLK" if blocks else command
+
+
+def patch_command(slot: int, base: int, tiles: int, encoding: str, length: int,
+                  protocol_version: int, blocks: bool) -> Union[str, bytes]:
+    """PATCH-Befehl (Rahmen oder Textzeile) fuer tiles Kacheln gegen Slot base"""
+    if protocol_version:
+        return esp32_protocol.encode_patch(slot, base, tiles, length,
+                                           encoding == rgb565_codec.ENCODING_RLE, blocks)
+    command = f"PATCH:{slot}:{base}:{tiles}:{length}:{encoding}"
+    return command + ":BLK" if blocks else command
+
+
+def show_command(slot: int, gear: int, speed: int, protocol_version: int) -> bytes:
+    """SHOW-Befehl als Rahmen oder Textzeile"""
+    if protocol_version:
+        return esp32_protocol.encode_show(slot, gear, speed)
+    return f"SHOW:{slot}:{gear}:{speed}\n".encode()
+
+
+def overlay_command(gear: int, speed: int, protocol_version: int) -> bytes:
+    """OVERLAY-Befehl als Rahmen oder Textzeile"""
+    if protocol_version:
+        return esp32_protocol.encode_overlay(gear, speed)
+    return f"OVERLAY:{gear}:{speed}\n".encode()
+
+
+def encode_block(view: memoryview, seq: int) -> bytes:
+    """Block seq als Rahmen: Magic, Sequenz, Laenge, Daten, CRC32"""
+    block = view[seq * BLOCK_SIZE:(seq + 1) * BLOCK_SIZE]
+    return struct.pack('<BHH', BLOCK_MAGIC, seq, len(block)) + block + struct.pack('<I', zlib.crc32(block))
+
+
+class BlockWindow:
+    """Buchfuehrung einer Block-Uebertragung im Empfangsfenster des ESP32
+
+    Liefert die als Naechstes zu sendenden Bloecke und wertet BOK/BERR sowie
+    ausbleibende Antworten aus; Senden und Warten uebernimmt der Controller.
+    """
+
+    def __init__(self, payload: bytes, window: int, progress_callback=None):
+        self.view = memoryview(payload)
+        self.count = (len(payload) + BLOCK_SIZE - 1) // BLOCK_SIZE
+        self.window = window
+        self.pending = deque(range(self.count))
+        self.in_flight: Set[int] = set()
+        self.done = [False] * self.count
+        self.retries = [0] * self.count
+        self.acked = 0
+        self.resent = 0
+        self.error: Optional[str] = None
+        self.progress_callback = progress_callback
+
+    @property
+    def finished(self) -> bool:
+        return self.acked >= self.count
+
+    @property
+    def can_send(self) -> bool:
+        """Wartet ein Block und hat das Fenster Platz?"""
+        return bool(self.pending) and len(self.in_flight) < self.window
+
+    def next_block(self) -> bytes:
+        """Naechster zu sendender Block (als gesendet vermerkt)"""
+        seq = self.pending.popleft()
+        self.in_flight.add(seq)
+        return encode_block(self.view, seq)
+
+    def retry(self, seq: int) -> bool:
+        self.retries[seq] += 1
+        self.resent += 1
+        if self.retries[seq] > MAX_BLOCK_RETRIES:
+            self.error = f"Block {seq} nach {MAX_BLOCK_RETRIES} Wiederholungen fehlerhaft"
+            return False
+        if seq not in self.pending:
+            self.pending.appendleft(seq)
+        return True
+
+    def timeout(self) -> bool:
+        """Keine Antwort: alle ausstehenden Bloecke erneut senden (False = aufgeben)"""
+        for seq in sorted(self.in_flight, reverse=True):
+            if not self.retry(seq):
+                return False
+        self.in_flight.clear()
+        return True
+
+    def reply(self, line: str) -> bool:
+        """Wertet BOK:n, BERR:n oder ERROR aus (False = abbrechen, Grund in error)"""
+        if line.startswith("ERROR"):
+            self.error = f"  ESP32: {line}"
+            return False
+        kind, _, value = line.partition(":")
+        seq = int(value)
+        if seq >= self.count:
+            return True
+        self.in_flight.discard(seq)
+        if kind != "BOK":
+            return self.done[seq] or self.retry(seq)
+        if not self.done[seq]:
+            self.done[seq] = True
+            self.acked += 1
+            if seq in self.pending:
+                self.pending.remove(seq)
+            if self.progress_callback:
+                self.progress_callback(self.acked * 100 // self.count)
+        return True
+
+
+class CommandQueue:
+    """Wartende SHOW/OVERLAY-Befehle je Art; ein neuer ersetzt die von ihm ueberholten (SUPERSEDES)"""
+
+    def __init__(self, stats: WriterStats):
+        self.items: "OrderedDict[str, bytes]" = OrderedDict()
+        self.stats = stats
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def put(self, kind: str, data: bytes):
+        for old in SUPERSEDES.get(kind, (kind,)):
+            if self.items.pop(old, None) is not None:
+                self.stats.dropped += 1
+        self.items[kind] = data
+        self.stats.max_depth = max(self.stats.max_depth, len(self.items))
+
+    def pop(self) -> Optional[bytes]:
+        """Aeltester wartender Befehl oder None"""
+        if not self.items:
+            return None
+        return self.items.popitem(last=False)[1]
+
+    def take(self) -> List[bytes]:
+        """Alle wartenden Befehle in Reihenfolge (die Queue ist danach leer)"""
+        items = list(self.items.values())
+        self.items.clear()
+        return items
+
+    def clear(self):
+        self.items.clear()
+
+
+class ESP32Controller:
+    """Controller für ESP32-Kommunikation"""
+
+    def __init__(self, log_callback=None, compression: bool = True):
+        self.serial: Optional["serial.Serial"] = None
+        self.log = log_callback or print
+        self.connected = False
+        self.cached_slots = [False] * MAX_SLOTS
+        # Host-Kopie des Slot-Inhalts (Basis fuer PATCH)
+        self.slot_images: List[Optional[bytes]] = [None] * MAX_SLOTS
+        # Vom ESP32 gemeldete CRC32 je Slot (None = leer/unbekannt)
+        self.slot_hashes: List[Optional[int]] = [None] * MAX_SLOTS
+        self.compression = compression
+        self.features: Set[str] = set()
+        # Ausgehandelte Version des Binaerprotokolls (0 = Textbefehle)
+        self.protocol_version = 0
+        self.lines: "queue.Queue[Union[str, esp32_protocol.Frame]]" = queue.Queue(REPLY_QUEUE_SIZE)
+        # Slot-Bestaetigungen einer laufenden cache_set-Sitzung
+        self.set_replies: Optional[List[str]] = None
+        self.reader: Optional[threading.Thread] = None
+        # Zuletzt gesendete Anzeige (Slot, Gang, Geschwindigkeit)
+        self.overlay: Optional[Tuple[int, int, int]] = None
+        # Writer-Thread: wartende Befehle je Art, Leitungssperre fuer Antwortwechsel
+        self.writer_stats = WriterStats()
+        self.pending = CommandQueue(self.writer_stats)
+        self.pending_cond = threading.Condition()
+        self.writing = False
+        self.link_lock = threading.RLock()
+        self.writer: Optional[threading.Thread] = None
+
+    def connect(self, port: str, baudrate: int = DEFAULT_BAUDRATE) -> bool:
+        """Verbindung herstellen"""
+        if not SERIAL_AVAILABLE:
+            self.log("FEHLER: PySerial nicht installiert!")
+            return False
+
+        try:
+            self.serial = serial.Serial(port=port, baudrate=baudrate, timeout=1)
+            self.log(f"Verbunden: {port} @ {baudrate} baud")
+
+            self.connected = True
+            self.lines = queue.Queue(REPLY_QUEUE_SIZE)
+            self.reader = threading.Thread(target=self.read_loop, args=(self.serial,), daemon=True)
+            self.reader.start()
+
+            # Auf ESP32 warten (Reset beim Oeffnen des Ports). Ohne Reset kommt
+            # kein "Ready" - dann antwortet der laufende Sketch auf CAPS.
+            deadline = time.monotonic() + READY_TIMEOUT
+            while time.monotonic() < deadline:
+                if self.wait_for(("ACK", "Ready", "CAPS:", "Unknown command"), READY_PROBE_INTERVAL):
+                    self.log("ESP32 bereit!")
+                    break
+                self.serial.write(b"CAPS\n")
+
+            self.cached_slots = [False] * MAX_SLOTS
+            self.slot_images = [None] * MAX_SLOTS
+            self.slot_hashes = [None] * MAX_SLOTS
+            self.overlay = None
+            self.negotiate_features()
+            if "HASH" in self.features:
+                self.sync_slot_hashes()
+
+            self.pending.clear()
+            self.writer = threading.Thread(target=self.write_loop, args=(self.serial,), daemon=True)
+            self.writer.start()
+            return True
+
+        except Exception as e:
+            self.connected = False
+            self.log(f"Verbindungsfehler: {e}")
+            return False
+
+    def negotiate_features(self):
+        """Fragt die vom Sketch unterstuetzten Erweiterungen ab (CAPS)"""
+        self.features = set()
+        try:
+            self.send_line("CAPS")
+            # Aeltere Sketches antworten mit "Unknown command: CAPS"
+            self.features = parse_caps(self.wait_for(("CAPS:", "Unknown command"), 1.0))
+        except Exception as e:
+            self.log(f"CAPS-Fehler: {e}")
+
+        if self.features:
+            self.log(f"ESP32 Faehigkeiten: {', '.join(sorted(self.features))}")
+        else:
+            self.log("ESP32 ohne Erweiterungen (aelterer Sketch) - sende Rohdaten")
+
+        self.protocol_version = 0
+        if "BIN" in self.features:
+            self.negotiate_protocol()
+
+    def negotiate_protocol(self):
+        """Handelt die Version des Binaerprotokolls aus (HELLO)"""
+        try:
+            self.send_frame(esp32_protocol.encode_hello())
+            self.protocol_version = negotiated_version(
+                self.wait_for_frame(esp32_protocol.OP_HELLO, 1.0))
+        except Exception as e:
+            self.log(f"HELLO-Fehler: {e}")
+
+        if self.protocol_version:
+            self.log(f"Binaerprotokoll v{self.protocol_version} aktiv")
+        else:
+            self.log("Binaerprotokoll nicht ausgehandelt - verwende Textbefehle")
+
+    def sync_slot_hashes(self):
+        """Liest die CRC32 aller Slots vom ESP32 (HASHES)"""
+        with self.link_lock:
+            try:
+                if self.protocol_version:
+                    self.send_frame(esp32_protocol.encode_hashes())
+                    reply = self.wait_for_frame(esp32_protocol.OP_HASHES, 1.0)
+                    if reply is None or reply.status != esp32_protocol.STATUS_OK:
+                        return
+                else:
+                    self.send_line("HASHES")
+                    reply = self.wait_for(("HASHES:",), 1.0)
+                    if reply is None:
+                        return
+                hashes = parse_slot_hashes(reply)
+            except Exception as e:
+                self.log(f"HASHES-Fehler: {e}")
+                return
+
+        for slot, value in enumerate(hashes):
+            self.slot_hashes[slot] = value
+            self.cached_slots[slot] = value is not None
+        used = sum(1 for h in self.slot_hashes if h is not None)
+        self.log(f"ESP32 haelt {used}/{MAX_SLOTS} Bilder im Cache")
+
+    def slot_matches(self, slot: int, image_data: bytes) -> bool:
+        """Liegt image_data bereits in slot?"""
+        if self.cached_slots[slot] and self.slot_images[slot] == image_data:
+            return True
+        if self.slot_hashes[slot] is not None and self.slot_hashes[slot] == zlib.crc32(image_data):
+            self.mark_cached(slot, image_data)
+            return True
+        return False
+
+    def mark_cached(self, slot: int, image_data: bytes):
+        """Merkt sich den neuen Inhalt von slot"""
+        self.cached_slots[slot] = True
+        self.slot_images[slot] = bytes(image_data)
+        self.slot_hashes[slot] = zlib.crc32(image_data)
+
+    def disconnect(self):
+        """Verbindung trennen"""
+        self.connected = False
+        with self.pending_cond:
+            self.pending.clear()
+            self.pending_cond.notify_all()
+        if self.serial and self.serial.is_open:
+            self.serial.close()
+        self.log("Verbindung getrennt")
+
+    def read_loop(self, port: "serial.Serial"):
+        """Hintergrund-Thread: legt jede empfangene Zeile und jeden Rahmen in die Queue
+
+        SHOW/OVERLAY-Bestaetigungen werden nur gezaehlt, da der Writer-Thread
+        nicht auf sie wartet und sie sonst bis zum naechsten Befehl liegen blieben.
+        """
+        decoder = esp32_protocol.StreamDecoder()
+        while self.connected and port.is_open:
+            try:
+                data = port.read(max(1, port.in_waiting))
+            except Exception:
+                break
+            for item in decoder.feed(data):
+                if is_unsolicited(item):
+                    self.writer_stats.acks += 1
+                else:
+                    self.put_reply(item)
+
+    def put_reply(self, item: Union[str, esp32_protocol.Frame]):
+        """Legt eine Antwort in die Queue; ist sie voll, faellt die aelteste weg"""
+        while True:
+            try:
+                self.lines.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self.lines.get_nowait()
+                    self.writer_stats.lost_replies += 1
+                except queue.Empty:
+                    pass
+
+    def write_loop(self, port: "serial.Serial"):
+        """Hintergrund-Thread: schreibt wartende SHOW/OVERLAY-Befehle in Reihenfolge"""
+        while True:
+            with self.pending_cond:
+                while self.connected and not self.pending:
+                    self.pending_cond.wait(0.5)
+                if not self.connected:
+                    return
+            # Erst nach der Leitungssperre entnehmen: eine laufende Uebertragung
+            # kann den Befehl inzwischen selbst geschrieben haben
+            with self.link_lock:
+                with self.pending_cond:
+                    if not self.pending:
+                        continue
+                    data = self.pending.pop()
+                    self.writing = True
+                try:
+                    port.write(data)
+                    self.writer_stats.sent += 1
+                except Exception as e:
+                    self.log(f"Schreibfehler: {e}")
+                finally:
+                    with self.pending_cond:
+                        self.writing = False
+                        self.pending_cond.notify_all()
+
+    def enqueue(self, kind: str, data: bytes):
+        """Reiht einen Befehl fuer den Writer-Thread ein; aeltere wartende derselben Art entfallen"""
+        with self.pending_cond:
+            self.pending.put(kind, data)
+            self.pending_cond.notify_all()
+
+    def write_pending(self) -> int:
+        """Schreibt wartende Befehle sofort (waehrend einer Uebertragung, Leitung gesperrt)"""
+        with self.pending_cond:
+            items = self.pending.take()
+            self.pending_cond.notify_all()
+        for data in items:
+            self.serial.write(data)
+        self.writer_stats.sent += len(items)
+        self.writer_stats.interleaved += len(items)
+        return len(items)
+
+    @property
+    def queue_depth(self) -> int:
+        """Anzahl wartender Befehle im Writer-Thread"""
+        return len(self.pending)
+
+    def flush(self, timeout: float = 1.0) -> bool:
+        """Wartet, bis alle wartenden Befehle geschrieben sind"""
+        deadline = time.monotonic() + timeout
+        with self.pending_cond:
+            while self.pending or self.writing:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.connected:
+                    return False
+                self.pending_cond.wait(remaining)
+        return True
+
+    def format_writer_stats(self) -> str:
+        """Writer-Statistik als Logzeile"""
+        s = self.writer_stats
+        return (f"Befehle: {s.sent} gesendet, {s.dropped} veraltet verworfen, "
+                f"max. {s.max_depth} wartend, {s.interleaved} in Uploads eingeschoben, "
+                f"{s.acks} bestaetigt, {s.lost_replies} Antworten verloren")
+
+    def discard_replies(self):
+        """Verwirft liegengebliebene Antworten"""
+        while True:
+            try:
+                self.lines.get_nowait()
+            except queue.Empty:
+                break
+
+    def send_line(self, command: str):
+        """Sendet einen Textbefehl; liegengebliebene Antworten werden verworfen"""
+        self.discard_replies()
+        self.serial.write(f"{command}\n".encode())
+
+    def send_frame(self, frame: bytes):
+        """Sendet einen Binaerrahmen; liegengebliebene Antworten werden verworfen"""
+        self.discard_replies()
+        self.serial.write(frame)
+
+    def wait_for(self, tokens: Sequence[str], timeout: float, log_lines: bool = True) -> Optional[str]:
+        """Wartet auf eine Zeile, die mit einem der Tokens beginnt (None nach Ablauf der Frist)"""
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            try:
+                line = self.lines.get(timeout=remaining)
+            except queue.Empty:
+                return None
+            if not isinstance(line, str):
+                continue
+            if log_lines:
+                self.log(f"  ESP32: {line}")
+            if line.startswith(tuple(tokens)):
+                return line
+            if self.set_replies is not None and line.startswith(("CACHED_OK:", "CACHE_FAIL:")):
+                self.set_replies.append(line)
+
+    def wait_for_frame(self, opcode: int, timeout: float) -> Optional[esp32_protocol.Frame]:
+        """Wartet auf die Antwort (Rahmen) zu opcode"""
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            try:
+                item = self.lines.get(timeout=remaining)
+            except queue.Empty:
+                return None
+            if isinstance(item, esp32_protocol.Frame):
+                if item.is_response and item.command == opcode:
+                    return item
+            else:
+                self.log(f"  ESP32: {item}")
+
+    def read_response(self, timeout: float = 1.0) -> List[str]:
+        """Liest alle Antworten vom ESP32, die innerhalb von timeout eintreffen (0 = nur vorhandene)"""
+        responses = []
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    item = self.lines.get(timeout=remaining)
+                else:
+                    item = self.lines.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, str):
+                responses.append(item)
+        return responses
+
+    def choose_encoding(self, payload: bytes) -> Tuple[str, bytes]:
+        """Waehlt die Uebertragungs-Kodierung und liefert (Kodierung, Nutzdaten)"""
+        return choose_encoding(payload, self.features, self.compression)
+
+    def cache_image(self, slot: int, image_data: bytes, progress_callback=None,
+                    base_slot: Optional[int] = None) -> bool:
+        """Cached ein Bild auf dem ESP32
+
+        Mit base_slot werden nur die Kacheln gesendet, die sich vom Bild in
+        base_slot unterscheiden; sonst wird der bekannte Slot-Inhalt mit den
+        wenigsten Abweichungen als Basis genommen. Ohne Basis geht das ganze
+        Bild raus.
+        """
+        if not self.serial or not self.connected:
+            return False
+
+        if slot < 0 or slot >= MAX_SLOTS:
+            self.log(f"Ungueltiger Slot: {slot}")
+            return False
+
+        if len(image_data) != IMAGE_SIZE:
+            self.log(f"Falsche Bildgroesse: {len(image_data)} (erwartet: {IMAGE_SIZE})")
+            return False
+
+        with self.link_lock:
+            try:
+                if self.slot_matches(slot, image_data):
+                    self.log(f"Bild {slot + 1} liegt bereits auf dem ESP32 - nichts zu senden")
+                    return True
+
+                patch = self.build_patch(slot, image_data, base_slot)
+                if patch is not None:
+                    base, tiles, payload = patch
+                    if not tiles:
+                        self.log(f"Bild {slot + 1} unveraendert - nichts zu senden")
+                        self.mark_cached(slot, image_data)
+                        return True
+
+                    encoding, payload = self.choose_encoding(payload)
+                    command = patch_command(slot, base, len(tiles), encoding, len(payload),
+                                            self.protocol_version, self.use_blocks)
+                    self.log(f"PATCH: {len(tiles)} Kacheln gegen Slot {base}, {len(payload)} bytes")
+                else:
+                    encoding, payload = self.choose_encoding(image_data)
+                    command = cache_command(slot, encoding, len(payload),
+                                            self.protocol_version, self.use_blocks)
+                    if encoding == rgb565_codec.ENCODING_RLE:
+                        self.log(f"{encoding}: {len(payload)} statt {IMAGE_SIZE} bytes "
+                                 f"({len(payload) * 100 // IMAGE_SIZE}%)")
+
+                if self.transfer(command, payload, progress_callback):
+                    self.mark_cached(slot, image_data)
+                    self.log(f"Bild {slot + 1} erfolgreich gecached!")
+                    return True
+                return False
+
+            except Exception as e:
+                self.log(f"Cache-Fehler: {e}")
+                return False
+
+    def build_patch(self, slot: int, image_data: bytes, base_slot: Optional[int]) -> Optional[tuple]:
+        """(Basis-Slot, Kacheln, Nutzdaten) fuer ein PATCH oder None fuer ein volles CACHE"""
+        if "PATCH" not in self.features:
+            return None
+
+        if base_slot is not None:
+            candidates = [base_slot] if 0 <= base_slot < MAX_SLOTS else []
+        else:
+            # Eigener Slot zuerst, damit er bei Gleichstand gewinnt
+            candidates = [slot] + [s for s in range(MAX_SLOTS) if s != slot]
+
+        best = None
+        for base in candidates:
+            if self.slot_images[base] is None:
+                continue
+            tiles = rgb565_codec.dirty_tiles(self.slot_images[base], image_data)
+            if best is None or len(tiles) < len(best[1]):
+                best = (base, tiles)
+
+        if best is None or len(best[1]) > rgb565_codec.MAX_PATCH_TILES:
+            return None
+
+        base, tiles = best
+        if not tiles and base != slot:
+            # Identisch mit dem Basis-Slot: eine Kachel reicht fuer die Kopie
+            tiles = [(0, 0)]
+        return base, tiles, rgb565_codec.build_patch(image_data, tiles)
+
+    @property
+    def use_blocks(self) -> bool:
+        """Datenphase als CRC-gesicherte Bloecke?"""
+        return "BLOCK" in self.features
+
+    @property
+    def preemptible(self) -> bool:
+        """Duerfen SHOW/OVERLAY-Rahmen zwischen Bloecke eingeschoben werden?"""
+        return bool(self.protocol_version) and self.use_blocks and "PREEMPT" in self.features
+
+    def transfer(self, command: Union[str, bytes], payload: bytes, progress_callback=None) -> bool:
+        """Sendet einen Befehl (Text oder Rahmen) mit Nutzdaten und wartet auf CACHED_OK"""
+        if isinstance(command, bytes):
+            self.send_frame(command)
+            self.log(f"Sende Rahmen {command.hex()}")
+        else:
+            self.send_line(command)
+            self.log(f"Sende {command}")
+
+        if self.use_blocks:
+            if not self.send_blocks(payload, progress_callback):
+                return False
+        elif not self.send_stream(payload, progress_callback):
+            return False
+
+        # Auf Bestaetigung warten
+        reply = self.wait_for(("CACHED_OK", "ERROR"), CACHED_TIMEOUT)
+        if reply and reply.startswith("CACHED_OK"):
+            return True
+
+        self.log("Keine CACHED_OK Bestaetigung")
+        return False
+
+    def send_stream(self, payload: bytes, progress_callback=None) -> bool:
+        """Datenphase ohne Blockrahmen (aeltere Sketches)"""
+        # Auf ACK warten
+        reply = self.wait_for(("ACK", "ERROR"), ACK_TIMEOUT)
+        if reply is None:
+            self.log("Kein ACK erhalten, sende trotzdem...")
+        elif reply.startswith("ERROR"):
+            return False
+
+        self.write_stream(payload, progress_callback)
+        return True
+
+    def write_stream(self, payload: bytes, progress_callback=None):
+        """Schreibt Nutzdaten ohne Blockrahmen in Chunks"""
+        # Daten in Chunks senden
+        chunk_size = 4096
+        total_sent = 0
+        view = memoryview(payload)
+
+        while total_sent < len(payload):
+            chunk = view[total_sent:total_sent + chunk_size]
+            self.serial.write(chunk)
+            total_sent += len(chunk)
+
+            progress = int((total_sent / len(payload)) * 100)
+            if progress_callback:
+                progress_callback(progress)
+
+            # Kurze Pause fuer Stabilitaet
+            time.sleep(0.005)
+
+        self.log(f"Gesendet: {total_sent} bytes")
+
+    def send_blocks(self, payload: bytes, progress_callback=None) -> bool:
+        """Datenphase als CRC-gesicherte Bloecke im Fenster des ESP32"""
+        window = parse_window(self.wait_for(("WINDOW:", "ERROR"), ACK_TIMEOUT))
+        if window is None:
+            self.log("Kein Empfangsfenster vom ESP32")
+            return False
+
+        blocks = BlockWindow(payload, window, progress_callback)
+        while not blocks.finished:
+            while blocks.can_send:
+                if self.preemptible:
+                    self.write_pending()
+                self.serial.write(blocks.next_block())
+
+            reply = self.wait_block_reply()
+            # Keine Antwort: alle ausstehenden Bloecke erneut senden
+            if not (blocks.timeout() if reply is None else blocks.reply(reply)):
+                self.log(blocks.error)
+                return False
+
+        self.serial.write(END_BLOCK)
+        self.log(f"Gesendet: {len(payload)} bytes in {blocks.count} Bloecken ({blocks.resent} wiederholt)")
+        return True
+
+    def wait_block_reply(self) -> Optional[str]:
+        """Wartet auf BOK/BERR; wartende SHOW/OVERLAY-Befehle gehen in der Zwischenzeit raus"""
+        if not self.preemptible:
+            return self.wait_for(BLOCK_REPLIES, BLOCK_TIMEOUT, log_lines=False)
+
+        deadline = time.monotonic() + BLOCK_TIMEOUT
+        while True:
+            self.write_pending()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            reply = self.wait_for(BLOCK_REPLIES, min(PREEMPT_POLL, remaining), log_lines=False)
+            if reply is not None:
+                return reply
+
+    def cache_set(self, images: Sequence[Tuple[int, bytes]], progress_callback=None,
+                  slot_callback: Optional[Callable[[int, bool], None]] = None) -> Dict[int, bool]:
+        """Cached mehrere Bilder in einer Sitzung
+
+        images: Liste von (Slot, RGB565-Daten). progress_callback bekommt den
+        Gesamtfortschritt in Prozent, slot_callback(slot, ok) wird fuer jeden
+        Slot aufgerufen, sobald seine Bestaetigung eintrifft. Liefert
+        {Slot: Erfolg}. Ohne SET im Sketch wird Slot fuer Slot gecached.
+        """
+        results: Dict[int, bool] = {}
+
+        def finish(slot: int, ok: bool):
+            results[slot] = ok
+            if slot_callback:
+                slot_callback(slot, ok)
+
+        if not self.serial or not self.connected:
+            for slot, _ in images:
+                finish(slot, False)
+            return results
+
+        entries = []
+        for slot, image_data in images:
+            if slot < 0 or slot >= MAX_SLOTS or len(image_data) != IMAGE_SIZE:
+                self.log(f"Bild {slot + 1} uebersprungen (ungueltiger Slot oder Groesse)")
+                finish(slot, False)
+            elif self.slot_matches(slot, image_data):
+                self.log(f"Bild {slot + 1} liegt bereits auf dem ESP32 - nichts zu senden")
+                finish(slot, True)
+            else:
+                encoding, payload = self.choose_encoding(image_data)
+                entries.append((slot, image_data, encoding, payload))
+
+        if not entries:
+            return results
+
+        if "SET" not in self.features:
+            for slot, image_data, _, _ in entries:
+                finish(slot, self.cache_image(slot, image_data, progress_callback))
+            return results
+
+        with self.link_lock:
+            try:
+                self.send_set_header(entries)
+                reply = self.wait_for(("ACK", "ERROR"), ACK_TIMEOUT)
+                if reply is None or reply.startswith("ERROR"):
+                    self.log("Cache-Set vom ESP32 abgelehnt")
+                    for slot, *_ in entries:
+                        finish(slot, False)
+                    return results
+
+                pending = {slot: image_data for slot, image_data, _, _ in entries}
+                self.set_replies = []
+                total = sum(len(payload) for *_, payload in entries)
+                sent = 0
+
+                def handle_replies():
+                    while self.set_replies:
+                        kind, _, value = self.set_replies.pop(0).partition(":")
+                        slot = int(value)
+                        if slot not in pending:
+                            continue
+                        image_data = pending.pop(slot)
+                        ok = kind == "CACHED_OK"
+                        if ok:
+                            self.mark_cached(slot, image_data)
+                        finish(slot, ok)
+
+                for slot, _, _, payload in entries:
+                    def entry_progress(p, offset=sent, size=len(payload)):
+                        if progress_callback:
+                            progress_callback(int((offset + size * p / 100) * 100 / total))
+
+                    if self.use_blocks:
+                        if not self.send_blocks(payload, entry_progress):
+                            break
+                    else:
+                        self.write_stream(payload, entry_progress)
+                    sent += len(payload)
+                    handle_replies()
+
+                # Restliche Bestaetigungen einsammeln
+                deadline = time.monotonic() + CACHED_TIMEOUT
+                while pending:
+                    reply = self.wait_for(("SET_OK", "ERROR"), deadline - time.monotonic())
+                    handle_replies()
+                    if reply is None or reply.startswith(("SET_OK", "ERROR")):
+                        break
+                handle_replies()
+
+                for slot in list(pending):
+                    pending.pop(slot)
+                    finish(slot, False)
+
+            except Exception as e:
+                self.log(f"Cache-Set-Fehler: {e}")
+                for slot, *_ in entries:
+                    if slot not in results:
+                        finish(slot, False)
+            finally:
+                self.set_replies = None
+
+        ok_count = sum(1 for ok in results.values() if ok)
+        self.log(f"Cache-Set: {ok_count}/{len(results)} Bilder gecached")
+        return results
+
+    def send_set_header(self, entries: list):
+        """Kuendigt alle Slots eines Cache-Sets mit Groesse und Kodierung an"""
+        if self.protocol_version:
+            frame = esp32_protocol.encode_cache_set(
+                [(slot, len(payload), encoding == rgb565_codec.ENCODING_RLE)
+                 for slot, _, encoding, payload in entries],
+                self.use_blocks,
+            )
+            self.send_frame(frame)
+            self.log(f"Sende Cache-Set ({len(entries)} Bilder)")
+            return
+
+        command = "CACHESET:" + ";".join(
+            f"{slot}:{len(payload)}:{encoding}" for slot, _, encoding, payload in entries
+        )
+        if self.use_blocks:
+            command += ":BLK"
+        self.send_line(command)
+        self.log(f"Sende {command}")
+
+    def show_image(self, slot: int, gear: int = 0, speed: int = 0) -> bool:
+        """Zeigt ein gecachtes Bild an (ueber den Writer-Thread, neuester gewinnt)"""
+        if not self.serial or not self.connected:
+            return False
+
+        try:
+            self.enqueue("show", show_command(slot, gear, speed, self.protocol_version))
+            self.overlay = (slot, gear, speed)
+            return True
+        except:
+            return False
+
+    def update_overlay(self, gear: int = 0, speed: int = 0) -> bool:
+        """Aktualisiert nur Gang/Geschwindigkeit des angezeigten Bildes
+
+        Sendet nichts, solange sich die angezeigten Werte nicht aendern.
+        Ohne OVERLAY-Unterstuetzung wird das Bild per SHOW neu gezeichnet.
+        """
+        if not self.serial or not self.connected or self.overlay is None:
+            return False
+
+        slot, shown_gear, shown_speed = self.overlay
+        if (gear, speed) == (shown_gear, shown_speed):
+            return True
+        if "OVERLAY" not in self.features:
+            return self.show_image(slot, gear, speed)
+
+        try:
+            self.enqueue("overlay", overlay_command(gear, speed, self.protocol_version))
+            self.overlay = (slot, gear, speed)
+            return True
+        except:
+            return False
+
+    def get_status(self) -> List[str]:
+        """Holt den Status vom ESP32"""
+        if not self.serial or not self.connected:
+            return []
+
+        with self.link_lock:
+            try:
+                if self.protocol_version:
+                    return self.get_status_binary()
+
+                self.send_line("STATUS")
+                responses = []
+                deadline = time.monotonic() + 2.0
+                while True:
+                    line = self.wait_for(("",), deadline - time.monotonic(), log_lines=False)
+                    if line is None:
+                        break
+                    responses.append(line)
+                    if line.startswith("STATUS_OK"):
+                        break
+                return responses
+            except:
+                return []
+
+    def get_status_binary(self) -> List[str]:
+        """STATUS ueber das Binaerprotokoll, aufbereitet als Textzeilen"""
+        self.send_frame(esp32_protocol.encode_status())
+        reply = self.wait_for_frame(esp32_protocol.OP_STATUS, 2.0)
+        if reply is None or reply.status != esp32_protocol.STATUS_OK:
+            return []
+        status = esp32_protocol.decode_status(reply)
+        lines = [f"Slot {slot}: {'USED' if slot in status['used_slots'] else 'EMPTY'}"
+                 for slot in range(MAX_SLOTS)]
+        lines.append(f"Currently displayed: Slot {status['current_slot']}")
+        lines.append(f"PSRAM Free: {status['psram_free']} bytes")
+        lines.append("STATUS_OK")
+        return lines
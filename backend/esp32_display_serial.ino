@@ -12,7 +12,28 @@
  * 
  * Protocol:
  * - Cache image: "CACHE:[slot]:[size]\n" + RGB565 data
+ * - Cache compressed: "CACHE:[slot]:[size]:RLE\n" + RLE data (see rgb565_codec.py)
+ * - Patch image: "PATCH:[slot]:[base]:[tiles]:[size]:[RAW|RLE]\n" + tile records
+ *   (32x32 tiles of the image in [base], see rgb565_codec.py)
+ * - Block mode: append ":BLK" to a CACHE/PATCH command.
+ *   Device answers "WINDOW:[n]", then expects frames
+ *   [0x5A][seq u16][len u16][data][crc32 u32] (little-endian) and replies
+ *   "BOK:[seq]" or "BERR:[seq]" per frame; failed frames are resent.
+ *   The host ends the data phase with an empty frame (seq 0xFFFF).
+ *   Between blocks the host may send binary SHOW/OVERLAY/STATUS frames;
+ *   they are handled right away, other opcodes are answered with BUSY.
+ * - Cache set: "CACHESET:[slot]:[size]:[enc];[slot]:[size]:[enc];...\n"
+ *   (optional ":BLK"), then all payloads back to back. Each slot is
+ *   confirmed with "CACHED_OK:[slot]" or "CACHE_FAIL:[slot]", then "SET_OK".
+ * - Slot hashes: "HASHES\n" -> "HASHES:[crc32 hex or -],..." (one per slot)
+ * - Capabilities: "CAPS\n" -> "CAPS:[feature,...]"
+ * - Binary commands (see esp32_protocol.py):
+ *   [0xA5][opcode][len][payload][xor of opcode, len, payload]
+ *   Responses use opcode | 0x80 with a status byte first; no text output
+ *   on the SHOW path. HELLO negotiates the protocol version.
  * - Show image: "SHOW:[slot]\n"
+ * - Overlay update: "OVERLAY:[gear]:[speed]\n" -> "OVERLAY_OK"; repaints only
+ *   the gear/speed regions of the displayed image (binary: OP_OVERLAY)
  * - Clear cache: "CLEAR\n"
  * - Status: "STATUS\n"
  */
@@ -45,6 +66,62 @@
 #define MAX_CACHED_IMAGES 8
 #define IMAGE_SIZE (SCREEN_WIDTH * SCREEN_HEIGHT * 2)  // 307200 bytes per image
 
+// Compressed transfer (RLE on 16-bit pixels, worst case: one header per 128 literal pixels)
+#define RLE_MAX_PACKET 128
+#define RLE_MAX_SIZE (IMAGE_SIZE + (IMAGE_SIZE / 2 + RLE_MAX_PACKET - 1) / RLE_MAX_PACKET)
+
+// Partial updates: changed 32x32 tiles as [tx][ty][pixels] records
+#define TILE_SIZE 32
+#define TILES_X (SCREEN_WIDTH / TILE_SIZE)
+#define TILES_Y (SCREEN_HEIGHT / TILE_SIZE)
+#define TILE_RECORD_SIZE (2 + TILE_SIZE * TILE_SIZE * 2)
+#define MAX_PATCH_TILES 100
+#define PATCH_MAX_SIZE (MAX_PATCH_TILES * TILE_RECORD_SIZE)
+
+// Block-framed transfer: CRC32 per block, WINDOW blocks in flight (fits the 16KB RX buffer)
+#define BLOCK_MAGIC 0x5A
+#define BLOCK_SIZE 4096
+#define BLOCK_WINDOW 3
+#define BLOCK_END 0xFFFF
+#define MAX_BLOCKS ((RLE_MAX_SIZE + BLOCK_SIZE - 1) / BLOCK_SIZE)
+
+// Binary command frames
+#define FRAME_MAGIC 0xA5
+#define FRAME_RESPONSE 0x80
+#define FRAME_MAX_PAYLOAD 64
+#define PROTOCOL_VERSION 1
+
+#define OP_HELLO  0x01
+#define OP_SHOW   0x02
+#define OP_STATUS 0x03
+#define OP_CLEAR  0x04
+#define OP_CACHE  0x05
+#define OP_PATCH  0x06
+#define OP_CACHE_SET 0x07
+#define OP_HASHES 0x08
+#define OP_OVERLAY 0x09
+
+#define FRAME_OK             0
+#define FRAME_BAD_SLOT       1
+#define FRAME_EMPTY_SLOT     2
+#define FRAME_BAD_FRAME      3
+#define FRAME_UNKNOWN_OPCODE 4
+#define FRAME_BUSY           5
+
+#define CACHE_FLAG_RLE    0x01
+#define CACHE_FLAG_BLOCKS 0x02
+
+// Protocol extensions reported by CAPS
+#define FEATURES "RLE,PATCH,BLOCK,BIN,SET,HASH,OVERLAY,PREEMPT"
+
+// Telemetry overlay (text size 3: 18x24 px per character)
+#define OVERLAY_Y      10
+#define OVERLAY_H      24
+#define GEAR_X         72
+#define GEAR_W         54
+#define SPEED_X        365
+#define SPEED_W        60
+
 // Create display object
 Arduino_DataBus *bus = new Arduino_HWSPI(TFT_DC, TFT_CS, TFT_SCK, TFT_MOSI);
 Arduino_GFX *gfx = new Arduino_ILI9488(bus, TFT_RST, 0 /* rotation */, false /* IPS */);
@@ -52,10 +129,16 @@ Arduino_GFX *gfx = new Arduino_ILI9488(bus, TFT_RST, 0 /* rotation */, false /*
 // Image cache in PSRAM
 uint8_t* imageCache[MAX_CACHED_IMAGES] = {nullptr};
 bool cacheSlotUsed[MAX_CACHED_IMAGES] = {false};
+uint32_t cacheSlotCrc[MAX_CACHED_IMAGES] = {0};  // CRC32 of each slot, lets the host skip re-uploads
 int currentDisplayedSlot = -1;
 
-// Temporary buffer for receiving
+// Temporary buffers for receiving
 uint8_t* receiveBuffer = nullptr;
+uint8_t* rleBuffer = nullptr;
+uint8_t* patchBuffer = nullptr;
+uint8_t blockBuffer[BLOCK_SIZE + 4];
+bool blockDone[MAX_BLOCKS];
+uint32_t crcTable[256];
 
 // State variables
 bool receivingImage = false;
@@ -70,12 +153,33 @@ void displayCachedImage(int slot);
 void cacheImage(int slot, uint8_t* data, size_t size);
 void clearCache();
 void printStatus();
+void printHashes();
 void displayWelcomeScreen();
+void drawTelemetryOverlay(int gear, int speed);
+bool updateOverlay(int gear, int speed);
+void restoreRegion(int slot, int x, int y, int w, int h);
 void sendAck();
+size_t decodeRle(const uint8_t* src, size_t srcLen, uint8_t* dst, size_t dstCap);
+bool receivePayload(uint8_t* target, size_t size);
+bool receiveBlocks(uint8_t* target, size_t size);
+bool readExact(uint8_t* dst, size_t len, unsigned long deadline);
+void initCrc32();
+uint32_t crc32(const uint8_t* data, size_t len);
+bool applyPatch(uint8_t* image, const uint8_t* patch, int tiles);
+void processPatchCommand(String line, bool blocks);
+void handleCache(int slot, size_t size, bool rle, bool blocks);
+void handlePatch(int slot, int base, int tiles, size_t size, bool rle, bool blocks);
+void processFrame();
+void handleFrame(bool inTransfer);
+void processCacheSetCommand(String line, bool blocks);
+void handleCacheSet(int count, const int* slots, const size_t* sizes, const bool* rle, bool blocks);
+void sendFrame(uint8_t opcode, const uint8_t* payload, uint8_t len);
+void sendStatusFrame(uint8_t opcode, uint8_t status);
 
 void setup() {
   Serial.begin(921600);  // Increased from 115200 to 921600 for faster transfer!
   Serial.setRxBufferSize(16384);  // Increase RX buffer to 16KB for faster reception
+  initCrc32();
   delay(1000);
   
   Serial.println("\n\n=================================");
@@ -107,7 +211,9 @@ void setup() {
   
   // Allocate receive buffer in PSRAM
   receiveBuffer = (uint8_t*)ps_malloc(IMAGE_SIZE);
-  if (receiveBuffer == nullptr) {
+  rleBuffer = (uint8_t*)ps_malloc(RLE_MAX_SIZE);
+  patchBuffer = (uint8_t*)ps_malloc(PATCH_MAX_SIZE);
+  if (receiveBuffer == nullptr || rleBuffer == nullptr || patchBuffer == nullptr) {
     Serial.println("ERROR: Failed to allocate receive buffer!");
     while(1) delay(1000);
   }
@@ -118,9 +224,16 @@ void setup() {
   Serial.println("\nReady for image caching!");
   Serial.println("Commands:");
   Serial.println("  CACHE:[slot]:[size]  - Cache image (slot 0-7)");
+  Serial.println("  CACHE:[slot]:[size]:RLE - Cache RLE compressed image");
+  Serial.println("  PATCH:[slot]:[base]:[tiles]:[size]:[enc] - Update changed tiles");
+  Serial.println("  CACHESET:[slot]:[size]:[enc];... - Cache several images in one session");
+  Serial.println("  ...:BLK              - CACHE/PATCH/CACHESET with CRC-checked blocks");
+  Serial.println("  CAPS                 - List protocol extensions");
   Serial.println("  SHOW:[slot]          - Display cached image");
+  Serial.println("  OVERLAY:[gear]:[speed] - Redraw only the gear/speed overlay");
   Serial.println("  CLEAR                - Clear all cache");
   Serial.println("  STATUS               - Show cache status");
+  Serial.println("  HASHES               - CRC32 of every cache slot");
   Serial.println("ACK");
   
   lastStatusTime = millis();
@@ -128,7 +241,12 @@ void setup() {
 
 void loop() {
   if (Serial.available()) {
-    processSerialCommand();
+    if (Serial.peek() == FRAME_MAGIC) {
+      processFrame();
+    } else {
+      processSerialCommand();
+    }
+    return;  // Check for the next command right away
   }
   
   // Periodic status update
@@ -137,7 +255,149 @@ void loop() {
     lastStatusTime = millis();
   }
   
-  delay(10);
+  delay(1);
+}
+
+// Binary command frame: fixed layout, no string parsing.
+void processFrame() {
+  Serial.read();  // FRAME_MAGIC
+  handleFrame(false);
+}
+
+// Frame body after the magic byte. During a block transfer only commands
+// that do not touch the receive buffers are allowed.
+void handleFrame(bool inTransfer) {
+  uint8_t header[2];
+  uint8_t payload[FRAME_MAX_PAYLOAD + 1];
+  unsigned long deadline = millis() + 100;
+  
+  if (!readExact(header, 2, deadline)) return;
+  uint8_t opcode = header[0];
+  uint8_t len = header[1];
+  if (len > FRAME_MAX_PAYLOAD) {
+    sendStatusFrame(opcode, FRAME_BAD_FRAME);
+    return;
+  }
+  if (!readExact(payload, len + 1, deadline)) return;
+  
+  uint8_t check = opcode ^ len;
+  for (int i = 0; i < len; i++) check ^= payload[i];
+  if (check != payload[len]) {
+    sendStatusFrame(opcode, FRAME_BAD_FRAME);
+    return;
+  }
+  
+  if (inTransfer && opcode != OP_SHOW && opcode != OP_OVERLAY && opcode != OP_STATUS) {
+    sendStatusFrame(opcode, FRAME_BUSY);
+    return;
+  }
+  
+  switch (opcode) {
+    case OP_HELLO: {
+      uint8_t reply[3] = {FRAME_OK, PROTOCOL_VERSION, MAX_CACHED_IMAGES};
+      sendFrame(OP_HELLO | FRAME_RESPONSE, reply, sizeof(reply));
+      break;
+    }
+    case OP_SHOW: {
+      if (len < 4) { sendStatusFrame(opcode, FRAME_BAD_FRAME); break; }
+      int slot = payload[0];
+      int gear = (int8_t)payload[1];
+      int speed = payload[2] | (payload[3] << 8);
+      if (slot >= MAX_CACHED_IMAGES) { sendStatusFrame(opcode, FRAME_BAD_SLOT); break; }
+      if (!cacheSlotUsed[slot]) { sendStatusFrame(opcode, FRAME_EMPTY_SLOT); break; }
+      displayCachedImageWithTelemetry(slot, gear, speed);
+      sendStatusFrame(opcode, FRAME_OK);
+      break;
+    }
+    case OP_OVERLAY: {
+      if (len < 3) { sendStatusFrame(opcode, FRAME_BAD_FRAME); break; }
+      int gear = (int8_t)payload[0];
+      int speed = payload[1] | (payload[2] << 8);
+      sendStatusFrame(opcode, updateOverlay(gear, speed) ? FRAME_OK : FRAME_EMPTY_SLOT);
+      break;
+    }
+    case OP_STATUS: {
+      uint8_t used = 0;
+      for (int i = 0; i < MAX_CACHED_IMAGES; i++) {
+        if (cacheSlotUsed[i]) used |= (1 << i);
+      }
+      uint32_t psramFree = ESP.getFreePsram();
+      uint8_t reply[7] = {FRAME_OK, used, (uint8_t)(int8_t)currentDisplayedSlot,
+                          (uint8_t)psramFree, (uint8_t)(psramFree >> 8),
+                          (uint8_t)(psramFree >> 16), (uint8_t)(psramFree >> 24)};
+      sendFrame(OP_STATUS | FRAME_RESPONSE, reply, sizeof(reply));
+      break;
+    }
+    case OP_HASHES: {
+      uint8_t reply[2 + MAX_CACHED_IMAGES * 4] = {FRAME_OK, 0};
+      for (int i = 0; i < MAX_CACHED_IMAGES; i++) {
+        uint32_t crc = cacheSlotUsed[i] ? cacheSlotCrc[i] : 0;
+        if (cacheSlotUsed[i]) reply[1] |= (1 << i);
+        reply[2 + i * 4] = crc;
+        reply[3 + i * 4] = crc >> 8;
+        reply[4 + i * 4] = crc >> 16;
+        reply[5 + i * 4] = crc >> 24;
+      }
+      sendFrame(OP_HASHES | FRAME_RESPONSE, reply, sizeof(reply));
+      break;
+    }
+    case OP_CLEAR:
+      clearCache();
+      sendStatusFrame(opcode, FRAME_OK);
+      break;
+    case OP_CACHE: {
+      // Data phase replies (ACK, WINDOW, BOK, CACHED_OK) stay text lines
+      if (len < 6) { sendStatusFrame(opcode, FRAME_BAD_FRAME); break; }
+      size_t size = payload[2] | (payload[3] << 8) | (payload[4] << 16) | ((uint32_t)payload[5] << 24);
+      handleCache(payload[0], size, payload[1] & CACHE_FLAG_RLE, payload[1] & CACHE_FLAG_BLOCKS);
+      break;
+    }
+    case OP_PATCH: {
+      if (len < 8) { sendStatusFrame(opcode, FRAME_BAD_FRAME); break; }
+      size_t size = payload[4] | (payload[5] << 8) | (payload[6] << 16) | ((uint32_t)payload[7] << 24);
+      handlePatch(payload[0], payload[1], payload[2], size,
+                  payload[3] & CACHE_FLAG_RLE, payload[3] & CACHE_FLAG_BLOCKS);
+      break;
+    }
+    case OP_CACHE_SET: {
+      int count = len >= 2 ? payload[1] : 0;
+      if (count < 1 || count > MAX_CACHED_IMAGES || len < 2 + count * 6) {
+        sendStatusFrame(opcode, FRAME_BAD_FRAME);
+        break;
+      }
+      int slots[MAX_CACHED_IMAGES];
+      size_t sizes[MAX_CACHED_IMAGES];
+      bool rle[MAX_CACHED_IMAGES];
+      for (int i = 0; i < count; i++) {
+        const uint8_t* entry = payload + 2 + i * 6;
+        slots[i] = entry[0];
+        rle[i] = entry[1] & CACHE_FLAG_RLE;
+        sizes[i] = entry[2] | (entry[3] << 8) | (entry[4] << 16) | ((uint32_t)entry[5] << 24);
+      }
+      handleCacheSet(count, slots, sizes, rle, payload[0] & CACHE_FLAG_BLOCKS);
+      break;
+    }
+    default:
+      sendStatusFrame(opcode, FRAME_UNKNOWN_OPCODE);
+  }
+}
+
+void sendFrame(uint8_t opcode, const uint8_t* payload, uint8_t len) {
+  uint8_t frame[FRAME_MAX_PAYLOAD + 4];
+  frame[0] = FRAME_MAGIC;
+  frame[1] = opcode;
+  frame[2] = len;
+  uint8_t check = opcode ^ len;
+  for (int i = 0; i < len; i++) {
+    frame[3 + i] = payload[i];
+    check ^= payload[i];
+  }
+  frame[3 + len] = check;
+  Serial.write(frame, len + 4);
+}
+
+void sendStatusFrame(uint8_t opcode, uint8_t status) {
+  sendFrame(opcode | FRAME_RESPONSE, &status, 1);
 }
 
 void processSerialCommand() {
@@ -148,70 +408,34 @@ void processSerialCommand() {
   
   Serial.printf(">>> Received: %s\n", line.c_str());
   
+  // Block-framed data phase for CACHE/PATCH
+  bool blocks = line.endsWith(":BLK");
+  if (blocks) {
+    line.remove(line.length() - 4);
+  }
+  
   if (line.startsWith("CACHE:")) {
-    // Cache image command: CACHE:[slot]:[size]
+    // Cache image command: CACHE:[slot]:[size] or CACHE:[slot]:[size]:[encoding]
     int firstColon = line.indexOf(':', 6);
     if (firstColon > 0) {
       int slot = line.substring(6, firstColon).toInt();
-      expectedSize = line.substring(firstColon + 1).toInt();
-      
-      if (slot < 0 || slot >= MAX_CACHED_IMAGES) {
-        Serial.printf("ERROR: Invalid slot %d (must be 0-%d)\n", slot, MAX_CACHED_IMAGES - 1);
-        return;
-      }
-      
-      if (expectedSize != IMAGE_SIZE) {
-        Serial.printf("ERROR: Invalid size %d (expected %d)\n", expectedSize, IMAGE_SIZE);
-        return;
-      }
-      
-      Serial.printf(">>> Caching to slot %d: %d bytes\n", slot, expectedSize);
-      targetCacheSlot = slot;
-      receivingImage = true;
-      receivedBytes = 0;
-      
-      sendAck();
-      
-      // Receive image data with MAXIMUM speed
-      unsigned long startTime = millis();
-      unsigned long timeoutTime = startTime + 30000;
+      int secondColon = line.indexOf(':', firstColon + 1);
+      bool rle = false;
       
-      // Read in LARGE blocks for maximum speed
-      while (receivedBytes < expectedSize && millis() < timeoutTime) {
-        size_t available = Serial.available();
-        if (available > 0) {
-          size_t toRead = min(available, expectedSize - receivedBytes);
-          
-          // Read as much as possible at once
-          size_t actualRead = Serial.readBytes(receiveBuffer + receivedBytes, toRead);
-          receivedBytes += actualRead;
-          
-          // Progress update only every 50KB for speed
-          if (receivedBytes % 51200 == 0 || receivedBytes == expectedSize) {
-            int progress = (receivedBytes * 100) / expectedSize;
-            Serial.printf(">>> %d%% ", progress);
-          }
+      if (secondColon > 0) {
+        expectedSize = line.substring(firstColon + 1, secondColon).toInt();
+        String encoding = line.substring(secondColon + 1);
+        if (encoding == "RLE") {
+          rle = true;
+        } else if (encoding != "RAW") {
+          Serial.printf("ERROR: Unknown encoding %s\n", encoding.c_str());
+          return;
         }
-        // NO YIELD, NO DELAY - maximum speed!
-      }
-      Serial.println();  // Newline after progress
-      
-      if (receivedBytes == expectedSize) {
-        unsigned long duration = millis() - startTime;
-        Serial.printf(">>> Image received in %lu ms\n", duration);
-        
-        // Store in cache
-        cacheImage(targetCacheSlot, receiveBuffer, receivedBytes);
-        
-        Serial.printf(">>> Image cached to slot %d\n", targetCacheSlot);
-        Serial.println("CACHED_OK");
       } else {
-        Serial.printf("ERROR: Timeout! Received %d of %d bytes\n", receivedBytes, expectedSize);
+        expectedSize = line.substring(firstColon + 1).toInt();
       }
       
-      receivingImage = false;
-      targetCacheSlot = -1;
-      
+      handleCache(slot, expectedSize, rle, blocks);
     }
     
   } else if (line.startsWith("SHOW:")) {
@@ -292,6 +516,27 @@ void processSerialCommand() {
       Serial.println("SHOW_OK");
     }
     
+  } else if (line.startsWith("OVERLAY:")) {
+    // Overlay update: OVERLAY:[gear]:[speed]
+    int colon = line.indexOf(':', 8);
+    if (colon < 0) {
+      Serial.println("ERROR: Invalid OVERLAY command");
+      return;
+    }
+    int gear = line.substring(8, colon).toInt();
+    int speed = line.substring(colon + 1).toInt();
+    if (updateOverlay(gear, speed)) {
+      Serial.println("OVERLAY_OK");
+    } else {
+      Serial.println("ERROR: No image displayed");
+    }
+    
+  } else if (line.startsWith("PATCH:")) {
+    processPatchCommand(line, blocks);
+    
+  } else if (line.startsWith("CACHESET:")) {
+    processCacheSetCommand(line, blocks);
+    
   } else if (line.startsWith("CLEAR")) {
     Serial.println(">>> Clearing cache...");
     clearCache();
@@ -300,11 +545,373 @@ void processSerialCommand() {
   } else if (line.startsWith("STATUS")) {
     printStatus();
     
+  } else if (line.startsWith("HASHES")) {
+    printHashes();
+    
+  } else if (line.startsWith("CAPS")) {
+    Serial.println("CAPS:" FEATURES);
+    
   } else {
     Serial.printf("Unknown command: %s\n", line.c_str());
   }
 }
 
+// CACHE data phase (text and binary command): receive, decode, store.
+void handleCache(int slot, size_t size, bool rle, bool blocks) {
+  expectedSize = size;
+  
+  if (slot < 0 || slot >= MAX_CACHED_IMAGES) {
+    Serial.printf("ERROR: Invalid slot %d (must be 0-%d)\n", slot, MAX_CACHED_IMAGES - 1);
+    return;
+  }
+  
+  if (rle ? (expectedSize == 0 || expectedSize > RLE_MAX_SIZE) : expectedSize != IMAGE_SIZE) {
+    Serial.printf("ERROR: Invalid size %d (expected %d)\n", expectedSize, IMAGE_SIZE);
+    return;
+  }
+  
+  uint8_t* target = rle ? rleBuffer : receiveBuffer;
+  Serial.printf(">>> Caching to slot %d: %d bytes%s\n", slot, expectedSize, rle ? " (RLE)" : "");
+  targetCacheSlot = slot;
+  receivingImage = true;
+  receivedBytes = 0;
+  
+  sendAck();
+  
+  unsigned long startTime = millis();
+  if (blocks ? receiveBlocks(target, expectedSize) : receivePayload(target, expectedSize)) {
+    unsigned long duration = millis() - startTime;
+    Serial.printf(">>> Image received in %lu ms\n", duration);
+    
+    size_t imageBytes = receivedBytes;
+    if (rle) {
+      imageBytes = decodeRle(rleBuffer, receivedBytes, receiveBuffer, IMAGE_SIZE);
+    }
+    
+    if (imageBytes != IMAGE_SIZE) {
+      Serial.printf("ERROR: RLE data decoded to %d of %d bytes\n", imageBytes, IMAGE_SIZE);
+    } else {
+      // Store in cache
+      cacheImage(targetCacheSlot, receiveBuffer, imageBytes);
+      
+      Serial.printf(">>> Image cached to slot %d\n", targetCacheSlot);
+      Serial.println("CACHED_OK");
+    }
+  }
+  
+  receivingImage = false;
+  targetCacheSlot = -1;
+}
+
+void processCacheSetCommand(String line, bool blocks) {
+  // CACHESET:[slot]:[size]:[enc];[slot]:[size]:[enc];...
+  int slots[MAX_CACHED_IMAGES];
+  size_t sizes[MAX_CACHED_IMAGES];
+  bool rle[MAX_CACHED_IMAGES];
+  int count = 0;
+  int pos = 9;
+  
+  while (pos < (int)line.length()) {
+    if (count >= MAX_CACHED_IMAGES) {
+      Serial.println("ERROR: Too many images in cache set");
+      return;
+    }
+    int end = line.indexOf(';', pos);
+    if (end < 0) end = line.length();
+    String entry = line.substring(pos, end);
+    int first = entry.indexOf(':');
+    int second = entry.indexOf(':', first + 1);
+    if (first < 0 || second < 0) {
+      Serial.println("ERROR: Malformed CACHESET command");
+      return;
+    }
+    slots[count] = entry.substring(0, first).toInt();
+    sizes[count] = entry.substring(first + 1, second).toInt();
+    rle[count] = entry.substring(second + 1) == "RLE";
+    count++;
+    pos = end + 1;
+  }
+  
+  handleCacheSet(count, slots, sizes, rle, blocks);
+}
+
+// Receive several images in one session: validate all entries, ACK once,
+// then receive the payloads back to back and confirm each slot.
+void handleCacheSet(int count, const int* slots, const size_t* sizes, const bool* rle, bool blocks) {
+  for (int i = 0; i < count; i++) {
+    if (slots[i] < 0 || slots[i] >= MAX_CACHED_IMAGES ||
+        (rle[i] ? (sizes[i] == 0 || sizes[i] > RLE_MAX_SIZE) : sizes[i] != IMAGE_SIZE)) {
+      Serial.printf("ERROR: Invalid cache set entry %d (slot %d, %d bytes)\n", i, slots[i], sizes[i]);
+      return;
+    }
+  }
+  
+  Serial.printf(">>> Cache set: %d images\n", count);
+  receivingImage = true;
+  sendAck();
+  
+  unsigned long startTime = millis();
+  for (int i = 0; i < count; i++) {
+    int slot = slots[i];
+    uint8_t* target = rle[i] ? rleBuffer : receiveBuffer;
+    targetCacheSlot = slot;
+    
+    if (!(blocks ? receiveBlocks(target, sizes[i]) : receivePayload(target, sizes[i]))) {
+      Serial.println("ERROR: Cache set aborted");
+      receivingImage = false;
+      targetCacheSlot = -1;
+      return;
+    }
+    
+    size_t imageBytes = receivedBytes;
+    if (rle[i]) {
+      imageBytes = decodeRle(rleBuffer, receivedBytes, receiveBuffer, IMAGE_SIZE);
+    }
+    
+    if (imageBytes == IMAGE_SIZE) {
+      cacheImage(slot, receiveBuffer, imageBytes);
+    }
+    if (imageBytes == IMAGE_SIZE && cacheSlotUsed[slot]) {
+      Serial.printf("CACHED_OK:%d\n", slot);
+    } else {
+      Serial.printf("CACHE_FAIL:%d\n", slot);
+    }
+  }
+  
+  Serial.printf(">>> Cache set received in %lu ms\n", millis() - startTime);
+  Serial.println("SET_OK");
+  receivingImage = false;
+  targetCacheSlot = -1;
+}
+
+void processPatchCommand(String line, bool blocks) {
+  // PATCH:[slot]:[base]:[tiles]:[size]:[encoding]
+  int fields[4];
+  int pos = 6;
+  for (int i = 0; i < 4; i++) {
+    int colon = line.indexOf(':', pos);
+    if (colon < 0) {
+      Serial.println("ERROR: Malformed PATCH command");
+      return;
+    }
+    fields[i] = line.substring(pos, colon).toInt();
+    pos = colon + 1;
+  }
+  int slot = fields[0];
+  int base = fields[1];
+  int tiles = fields[2];
+  size_t size = fields[3];
+  String encoding = line.substring(pos);
+  bool rle = encoding == "RLE";
+  
+  if (!rle && encoding != "RAW") {
+    Serial.printf("ERROR: Unknown encoding %s\n", encoding.c_str());
+    return;
+  }
+  
+  handlePatch(slot, base, tiles, size, rle, blocks);
+}
+
+// PATCH data phase (text and binary command): receive tiles, apply to base.
+void handlePatch(int slot, int base, int tiles, size_t size, bool rle, bool blocks) {
+  expectedSize = size;
+  
+  if (slot < 0 || slot >= MAX_CACHED_IMAGES || base < 0 || base >= MAX_CACHED_IMAGES) {
+    Serial.printf("ERROR: Invalid slot %d/%d (must be 0-%d)\n", slot, base, MAX_CACHED_IMAGES - 1);
+    return;
+  }
+  
+  if (!cacheSlotUsed[base]) {
+    Serial.printf("ERROR: Base slot %d is empty\n", base);
+    return;
+  }
+  
+  size_t patchBytes = (size_t)tiles * TILE_RECORD_SIZE;
+  if (tiles <= 0 || tiles > MAX_PATCH_TILES ||
+      (rle ? (expectedSize == 0 || expectedSize > RLE_MAX_SIZE) : expectedSize != patchBytes)) {
+    Serial.printf("ERROR: Invalid patch %d tiles / %d bytes\n", tiles, expectedSize);
+    return;
+  }
+  
+  Serial.printf(">>> Patching slot %d from slot %d: %d tiles, %d bytes%s\n",
+                slot, base, tiles, expectedSize, rle ? " (RLE)" : "");
+  targetCacheSlot = slot;
+  receivingImage = true;
+  
+  sendAck();
+  
+  unsigned long startTime = millis();
+  uint8_t* target = rle ? rleBuffer : patchBuffer;
+  if (blocks ? receiveBlocks(target, expectedSize) : receivePayload(target, expectedSize)) {
+    size_t decoded = receivedBytes;
+    if (rle) {
+      decoded = decodeRle(rleBuffer, receivedBytes, patchBuffer, PATCH_MAX_SIZE);
+    }
+    
+    if (decoded != patchBytes) {
+      Serial.printf("ERROR: Patch data decoded to %d of %d bytes\n", decoded, patchBytes);
+    } else {
+      memcpy(receiveBuffer, imageCache[base], IMAGE_SIZE);
+      if (applyPatch(receiveBuffer, patchBuffer, tiles)) {
+        cacheImage(slot, receiveBuffer, IMAGE_SIZE);
+        Serial.printf(">>> Slot %d patched in %lu ms\n", slot, millis() - startTime);
+        Serial.println("CACHED_OK");
+      }
+    }
+  }
+  
+  receivingImage = false;
+  targetCacheSlot = -1;
+}
+
+// Receive exactly size bytes into target (30s timeout). Progress is reported
+// every 50KB; on timeout an ERROR line is printed and false returned.
+bool receivePayload(uint8_t* target, size_t size) {
+  receivedBytes = 0;
+  unsigned long timeoutTime = millis() + 30000;
+  
+  // Read in LARGE blocks for maximum speed
+  while (receivedBytes < size && millis() < timeoutTime) {
+    size_t available = Serial.available();
+    if (available > 0) {
+      size_t toRead = min(available, size - receivedBytes);
+      
+      // Read as much as possible at once
+      size_t actualRead = Serial.readBytes(target + receivedBytes, toRead);
+      receivedBytes += actualRead;
+      
+      // Progress update only every 50KB for speed
+      if (receivedBytes % 51200 == 0 || receivedBytes == size) {
+        int progress = (receivedBytes * 100) / size;
+        Serial.printf(">>> %d%% ", progress);
+      }
+    }
+    // NO YIELD, NO DELAY - maximum speed!
+  }
+  Serial.println();  // Newline after progress
+  
+  if (receivedBytes != size) {
+    Serial.printf("ERROR: Timeout! Received %d of %d bytes\n", receivedBytes, size);
+    return false;
+  }
+  return true;
+}
+
+// Receive size bytes as CRC-checked blocks. Grants the host a window of
+// BLOCK_WINDOW blocks and acknowledges every block with BOK/BERR; a block
+// with a bad header is skipped until the next magic byte (the host resends
+// it after its own timeout). Duplicates are acknowledged again; the data
+// phase ends with the host's empty BLOCK_END frame.
+bool receiveBlocks(uint8_t* target, size_t size) {
+  size_t blocks = (size + BLOCK_SIZE - 1) / BLOCK_SIZE;
+  if (blocks > MAX_BLOCKS) {
+    Serial.printf("ERROR: Too many blocks (%d)\n", blocks);
+    return false;
+  }
+  memset(blockDone, 0, sizeof(blockDone));
+  size_t remaining = blocks;
+  receivedBytes = 0;
+  
+  Serial.printf("WINDOW:%d\n", BLOCK_WINDOW);
+  
+  unsigned long timeoutTime = millis() + 30000;
+  uint8_t header[5];
+  
+  while (true) {
+    if (!readExact(header, 1, timeoutTime)) break;
+    if (header[0] == FRAME_MAGIC) {
+      handleFrame(true);  // SHOW/OVERLAY interleaved between blocks
+      continue;
+    }
+    if (header[0] != BLOCK_MAGIC) continue;
+    if (!readExact(header + 1, 4, timeoutTime)) break;
+    
+    uint16_t seq = header[1] | (header[2] << 8);
+    uint16_t len = header[3] | (header[4] << 8);
+    if (seq == BLOCK_END && len == 0) {
+      if (!readExact(blockBuffer, 4, timeoutTime)) break;  // CRC of the empty frame
+      if (remaining == 0) break;
+      continue;
+    }
+    size_t offset = (size_t)seq * BLOCK_SIZE;
+    if (seq >= blocks || len != min((size_t)BLOCK_SIZE, size - offset)) continue;  // resync
+    
+    if (!readExact(blockBuffer, len + 4, timeoutTime)) break;
+    uint32_t crc = blockBuffer[len] | (blockBuffer[len + 1] << 8) |
+                   (blockBuffer[len + 2] << 16) | ((uint32_t)blockBuffer[len + 3] << 24);
+    if (crc32(blockBuffer, len) != crc) {
+      Serial.printf("BERR:%u\n", seq);
+      continue;
+    }
+    
+    memcpy(target + offset, blockBuffer, len);
+    if (!blockDone[seq]) {
+      blockDone[seq] = true;
+      receivedBytes += len;
+      remaining--;
+    }
+    Serial.printf("BOK:%u\n", seq);
+  }
+  
+  if (remaining > 0) {
+    Serial.printf("ERROR: Timeout! %d of %d blocks missing\n", remaining, blocks);
+    return false;
+  }
+  return true;
+}
+
+bool readExact(uint8_t* dst, size_t len, unsigned long deadline) {
+  size_t got = 0;
+  while (got < len && millis() < deadline) {
+    size_t available = Serial.available();
+    if (available > 0) {
+      got += Serial.readBytes(dst + got, min(available, len - got));
+    }
+  }
+  return got == len;
+}
+
+// CRC-32 (IEEE 802.3, same as zlib.crc32 on the host)
+void initCrc32() {
+  for (uint32_t i = 0; i < 256; i++) {
+    uint32_t c = i;
+    for (int k = 0; k < 8; k++) {
+      c = (c & 1) ? (0xEDB88320 ^ (c >> 1)) : (c >> 1);
+    }
+    crcTable[i] = c;
+  }
+}
+
+uint32_t crc32(const uint8_t* data, size_t len) {
+  uint32_t c = 0xFFFFFFFF;
+  for (size_t i = 0; i < len; i++) {
+    c = crcTable[(c ^ data[i]) & 0xFF] ^ (c >> 8);
+  }
+  return c ^ 0xFFFFFFFF;
+}
+
+// Copy tile records (format: see rgb565_codec.py) into a full frame.
+bool applyPatch(uint8_t* image, const uint8_t* patch, int tiles) {
+  const size_t rowBytes = SCREEN_WIDTH * 2;
+  const size_t tileBytes = TILE_SIZE * 2;
+  
+  for (int t = 0; t < tiles; t++) {
+    const uint8_t* record = patch + (size_t)t * TILE_RECORD_SIZE;
+    uint8_t tx = record[0];
+    uint8_t ty = record[1];
+    if (tx >= TILES_X || ty >= TILES_Y) {
+      Serial.printf("ERROR: Invalid tile %d,%d\n", tx, ty);
+      return false;
+    }
+    const uint8_t* pixels = record + 2;
+    for (int row = 0; row < TILE_SIZE; row++) {
+      size_t offset = (ty * TILE_SIZE + row) * rowBytes + tx * tileBytes;
+      memcpy(image + offset, pixels + row * tileBytes, tileBytes);
+    }
+  }
+  return true;
+}
+
 void cacheImage(int slot, uint8_t* data, size_t size) {
   // Free old data if slot was used
   if (cacheSlotUsed[slot] && imageCache[slot] != nullptr) {
@@ -324,6 +931,7 @@ void cacheImage(int slot, uint8_t* data, size_t size) {
   // Copy data
   memcpy(imageCache[slot], data, size);
   cacheSlotUsed[slot] = true;
+  cacheSlotCrc[slot] = crc32(imageCache[slot], size);
   
   Serial.printf("Cache slot %d: %d bytes allocated\n", slot, size);
 }
@@ -348,7 +956,30 @@ void displayCachedImageWithTelemetry(int slot, int gear, int speed) {
   
   // Display cached image
   gfx->draw16bitRGBBitmap(0, 0, (uint16_t*)imageCache[slot], SCREEN_WIDTH, SCREEN_HEIGHT);
-  
+  currentDisplayedSlot = slot;
+  drawTelemetryOverlay(gear, speed);
+}
+
+// Repaint only the gear/speed regions: restore the cached background, then draw the text.
+bool updateOverlay(int gear, int speed) {
+  int slot = currentDisplayedSlot;
+  if (slot < 0 || !cacheSlotUsed[slot] || imageCache[slot] == nullptr) {
+    return false;
+  }
+  restoreRegion(slot, GEAR_X, OVERLAY_Y, GEAR_W, OVERLAY_H);
+  restoreRegion(slot, SPEED_X, OVERLAY_Y, SPEED_W, OVERLAY_H);
+  drawTelemetryOverlay(gear, speed);
+  return true;
+}
+
+void restoreRegion(int slot, int x, int y, int w, int h) {
+  uint16_t* pixels = (uint16_t*)imageCache[slot];
+  for (int row = y; row < y + h; row++) {
+    gfx->draw16bitRGBBitmap(x, row, pixels + row * SCREEN_WIDTH + x, w, 1);
+  }
+}
+
+void drawTelemetryOverlay(int gear, int speed) {
   // Draw numbers in the TOP BAR (upper part of the display)
   // Based on the reference image: numbers should be at the top
   // Display is 480x320, so we scale the positions accordingly
@@ -358,7 +989,7 @@ void displayCachedImageWithTelemetry(int slot, int gear, int speed) {
   
   // LEFT: Gear number (approximately 15% from left, near top)
   // Reference: X=90 in ~600px wide → 15% → 72px in 480px
-  gfx->setCursor(72, 10);
+  gfx->setCursor(GEAR_X, OVERLAY_Y);
   if (gear == 0) {
     gfx->print("N");  // Neutral
   } else if (gear == -1) {
@@ -380,10 +1011,8 @@ void displayCachedImageWithTelemetry(int slot, int gear, int speed) {
     speedX -= 40;  // Three digits
   }
   
-  gfx->setCursor(speedX, 10);
+  gfx->setCursor(speedX, OVERLAY_Y);
   gfx->print(speed);
-  
-  currentDisplayedSlot = slot;
 }
 
 void clearCache() {
@@ -407,7 +1036,7 @@ void printStatus() {
   int usedSlots = 0;
   for (int i = 0; i < MAX_CACHED_IMAGES; i++) {
     if (cacheSlotUsed[i]) {
-      Serial.printf("Slot %d: USED (%d KB)\n", i, IMAGE_SIZE / 1024);
+      Serial.printf("Slot %d: USED (%d KB, CRC %08X)\n", i, IMAGE_SIZE / 1024, cacheSlotCrc[i]);
       usedSlots++;
     } else {
       Serial.printf("Slot %d: EMPTY\n", i);
@@ -421,6 +1050,19 @@ void printStatus() {
   Serial.println("STATUS_OK");
 }
 
+void printHashes() {
+  Serial.print("HASHES:");
+  for (int i = 0; i < MAX_CACHED_IMAGES; i++) {
+    if (i > 0) Serial.print(",");
+    if (cacheSlotUsed[i]) {
+      Serial.printf("%08X", cacheSlotCrc[i]);
+    } else {
+      Serial.print("-");
+    }
+  }
+  Serial.println();
+}
+
 void displayWelcomeScreen() {
   gfx->fillScreen(0x18E3);
   
@@ -462,3 +1104,38 @@ void displayWelcomeScreen() {
 void sendAck() {
   Serial.println("ACK");
 }
+
+// Decode RLE packets (format: see rgb565_codec.py). Returns the number of
+// bytes written to dst, or 0 if the data is malformed or too large.
+size_t decodeRle(const uint8_t* src, size_t srcLen, uint8_t* dst, size_t dstCap) {
+  size_t in = 0;
+  size_t out = 0;
+  
+  while (in < srcLen) {
+    uint8_t header = src[in++];
+    size_t count = (header & 0x7F) + 1;
+    size_t bytes = count * 2;
+    
+    if (out + bytes > dstCap) return 0;
+    
+    if (header & 0x80) {
+      // Repeat one pixel
+      if (in + 2 > srcLen) return 0;
+      uint8_t lo = src[in];
+      uint8_t hi = src[in + 1];
+      in += 2;
+      for (size_t i = 0; i < count; i++) {
+        dst[out++] = lo;
+        dst[out++] = hi;
+      }
+    } else {
+      // Literal pixels
+      if (in + bytes > srcLen) return 0;
+      memcpy(dst + out, src + in, bytes);
+      in += bytes;
+      out += bytes;
+    }
+  }
+  
+  return out;
+}
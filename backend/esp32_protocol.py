@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ESP32 Binaer-Protokoll
+======================
+
+Kompakte Befehlsrahmen fuer esp32_display_serial.ino statt Textzeilen:
+
+    [0xA5][Opcode][Laenge][Nutzdaten (Laenge Bytes)][Pruefsumme]
+
+Die Pruefsumme ist das XOR ueber Opcode, Laenge und Nutzdaten. Antworten
+des ESP32 haben dasselbe Format mit Opcode | 0x80; das erste Nutzbyte ist
+der Status (STATUS_OK oder ein Fehlercode).
+
+Unterstuetzt der Sketch "BIN" (CAPS), handeln Host und ESP32 beim
+Verbinden per HELLO die Protokollversion aus. Textzeilen (ACK, WINDOW,
+CACHED_OK, ...) und Binaerrahmen koennen gemischt ankommen; der
+StreamDecoder trennt beides.
+"""
+
+import struct
+from dataclasses import dataclass
+from typing import List, Optional, Tuple, Union
+
+FRAME_MAGIC = 0xA5
+RESPONSE_FLAG = 0x80
+MAX_PAYLOAD = 64
+PROTOCOL_VERSION = 1
+
+# Opcodes
+OP_HELLO = 0x01
+OP_SHOW = 0x02
+OP_STATUS = 0x03
+OP_CLEAR = 0x04
+OP_CACHE = 0x05
+OP_PATCH = 0x06
+OP_CACHE_SET = 0x07
+OP_HASHES = 0x08
+OP_OVERLAY = 0x09
+
+# Status-Codes in Antworten
+STATUS_OK = 0
+STATUS_BAD_SLOT = 1
+STATUS_EMPTY_SLOT = 2
+STATUS_BAD_FRAME = 3
+STATUS_UNKNOWN_OPCODE = 4
+STATUS_BUSY = 5
+
+STATUS_TEXT = {
+    STATUS_OK: "OK",
+    STATUS_BAD_SLOT: "Ungueltiger Slot",
+    STATUS_EMPTY_SLOT: "Slot leer",
+    STATUS_BAD_FRAME: "Fehlerhafter Rahmen",
+    STATUS_UNKNOWN_OPCODE: "Unbekannter Befehl",
+    STATUS_BUSY: "Uebertragung laeuft",
+}
+
+# CACHE-Flags
+CACHE_FLAG_RLE = 0x01
+CACHE_FLAG_BLOCKS = 0x02
+
+
+@dataclass
+class Frame:
+    """Ein dekodierter Binaerrahmen"""
+    opcode: int
+    payload: bytes
+
+    @property
+    def is_response(self) -> bool:
+        return bool(self.opcode & RESPONSE_FLAG)
+
+    @property
+    def command(self) -> int:
+        return self.opcode & ~RESPONSE_FLAG
+
+    @property
+    def status(self) -> int:
+        return self.payload[0] if self.payload else STATUS_BAD_FRAME
+
+
+def checksum(data: bytes) -> int:
+    """XOR ueber alle Bytes"""
+    value = 0
+    for b in data:
+        value ^= b
+    return value
+
+
+def encode_frame(opcode: int, payload: bytes = b"") -> bytes:
+    """Baut einen Rahmen fuer opcode mit payload"""
+    if len(payload) > MAX_PAYLOAD:
+        raise ValueError(f"Nutzdaten zu lang: {len(payload)} > {MAX_PAYLOAD}")
+    body = bytes((opcode, len(payload))) + payload
+    return bytes((FRAME_MAGIC,)) + body + bytes((checksum(body),))
+
+
+def encode_hello(version: int = PROTOCOL_VERSION) -> bytes:
+    return encode_frame(OP_HELLO, bytes((version,)))
+
+
+def encode_show(slot: int, gear: int = 0, speed: int = 0) -> bytes:
+    """SHOW: Slot (u8), Gang (i8, -1 = R), Geschwindigkeit (u16)"""
+    gear = max(-128, min(127, gear))
+    speed = max(0, min(0xFFFF, speed))
+    return encode_frame(OP_SHOW, struct.pack('<BbH', slot, gear, speed))
+
+
+def encode_overlay(gear: int = 0, speed: int = 0) -> bytes:
+    """OVERLAY: Gang (i8), Geschwindigkeit (u16) ueber dem angezeigten Bild"""
+    gear = max(-128, min(127, gear))
+    speed = max(0, min(0xFFFF, speed))
+    return encode_frame(OP_OVERLAY, struct.pack('<bH', gear, speed))
+
+
+def encode_status() -> bytes:
+    return encode_frame(OP_STATUS)
+
+
+def encode_clear() -> bytes:
+    return encode_frame(OP_CLEAR)
+
+
+def encode_hashes() -> bytes:
+    return encode_frame(OP_HASHES)
+
+
+def encode_cache(slot: int, size: int, rle: bool = False, blocks: bool = False) -> bytes:
+    """CACHE-Kopf: Slot (u8), Flags (u8), Groesse (u32); danach folgt die Datenphase"""
+    flags = (CACHE_FLAG_RLE if rle else 0) | (CACHE_FLAG_BLOCKS if blocks else 0)
+    return encode_frame(OP_CACHE, struct.pack('<BBI', slot, flags, size))
+
+
+def encode_patch(slot: int, base: int, tiles: int, size: int, rle: bool = False,
+                 blocks: bool = False) -> bytes:
+    """PATCH-Kopf: Slot, Basis-Slot, Kacheln (u8), Flags (u8), Groesse (u32)"""
+    flags = (CACHE_FLAG_RLE if rle else 0) | (CACHE_FLAG_BLOCKS if blocks else 0)
+    return encode_frame(OP_PATCH, struct.pack('<BBBBI', slot, base, tiles, flags, size))
+
+
+def encode_cache_set(entries: List[Tuple[int, int, bool]], blocks: bool = False) -> bytes:
+    """CACHESET-Kopf: Flags (u8), Anzahl (u8), je Bild Slot (u8), Flags (u8), Groesse (u32)"""
+    payload = bytearray(struct.pack('<BB', CACHE_FLAG_BLOCKS if blocks else 0, len(entries)))
+    for slot, size, rle in entries:
+        payload += struct.pack('<BBI', slot, CACHE_FLAG_RLE if rle else 0, size)
+    return encode_frame(OP_CACHE_SET, bytes(payload))
+
+
+def decode_hello(frame: Frame) -> int:
+    """Protokollversion aus der HELLO-Antwort"""
+    return frame.payload[1] if len(frame.payload) > 1 else 0
+
+
+def decode_status(frame: Frame) -> dict:
+    """STATUS-Antwort: belegte Slots, angezeigter Slot, freier PSRAM"""
+    _, used_mask, current, psram_free = struct.unpack('<BBbI', frame.payload[:7])
+    return {
+        "used_slots": [slot for slot in range(8) if used_mask & (1 << slot)],
+        "current_slot": current,
+        "psram_free": psram_free,
+    }
+
+
+def decode_hashes(frame: Frame) -> List[Optional[int]]:
+    """HASHES-Antwort: CRC32 je Slot, None fuer leere Slots"""
+    used_mask = frame.payload[1]
+    count = (len(frame.payload) - 2) // 4
+    crcs = struct.unpack(f'<{count}I', frame.payload[2:2 + count * 4])
+    return [crc if used_mask & (1 << slot) else None for slot, crc in enumerate(crcs)]
+
+
+class StreamDecoder:
+    """Zerlegt den Empfangsstrom in Textzeilen (str) und Binaerrahmen (Frame)"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def feed(self, data: bytes) -> List[Union[str, Frame]]:
+        self.buffer.extend(data)
+        items: List[Union[str, Frame]] = []
+        while self.buffer:
+            if self.buffer[0] == FRAME_MAGIC:
+                frame = self._take_frame()
+                if frame is None:
+                    break
+                if isinstance(frame, Frame):
+                    items.append(frame)
+                continue
+
+            end = self.buffer.find(b"\n")
+            magic = self.buffer.find(bytes((FRAME_MAGIC,)))
+            if end < 0 or 0 <= magic < end:
+                if magic < 0:
+                    break
+                # Textrest vor einem Rahmen (ohne Zeilenende) abschliessen
+                end = magic
+                line = bytes(self.buffer[:end])
+                del self.buffer[:end]
+            else:
+                line = bytes(self.buffer[:end])
+                del self.buffer[:end + 1]
+            text = line.decode('utf-8', errors='ignore').strip()
+            if text:
+                items.append(text)
+        return items
+
+    def _take_frame(self) -> Optional[Union[Frame, bool]]:
+        """Frame, False (verworfen) oder None (unvollstaendig)"""
+        if len(self.buffer) < 3:
+            return None
+        length = self.buffer[2]
+        if length > MAX_PAYLOAD:
+            del self.buffer[:1]
+            return False
+        total = 3 + length + 1
+        if len(self.buffer) < total:
+            return None
+        body = bytes(self.buffer[1:total - 1])
+        valid = checksum(body) == self.buffer[total - 1]
+        if not valid:
+            # Kein gueltiger Rahmen: Magic-Byte verwerfen und neu synchronisieren
+            del self.buffer[:1]
+            return False
+        del self.buffer[:total]
+        return Frame(body[0], body[2:])
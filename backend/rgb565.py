@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+RGB565 Konvertierung
+====================
+
+Gemeinsame Bild-Konvertierung fuer Server (server.py) und Desktop-App
+(bus_display_app.py / BusDisplay_Complete.py).
+
+Die Umwandlung RGB888 -> RGB565 (little-endian) laeuft mit NumPy als
+Bit-Shift/Maske ueber den ganzen Frame in einem Schritt. Ohne NumPy wird
+die bisherige Pixel-Schleife verwendet (gleiche Ausgabe, nur langsamer).
+"""
+
+from typing import Optional, Tuple
+
+from PIL import Image
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+SCREEN_WIDTH = 480
+SCREEN_HEIGHT = 320
+
+# Vorverkleinerung bis auf dieses Vielfache der Zielgroesse (siehe prepare_image)
+REDUCING_GAP = 2.0
+
+
+def rgb888_to_rgb565(r: int, g: int, b: int) -> int:
+    """Konvertiert einen RGB888-Pixel zu RGB565"""
+    r5 = (r >> 3) & 0x1F
+    g6 = (g >> 2) & 0x3F
+    b5 = (b >> 3) & 0x1F
+    return (r5 << 11) | (g6 << 5) | b5
+
+
+def pack_rgb565_python(img: Image.Image) -> bytes:
+    """Referenz-Implementierung: packt ein RGB-Bild Pixel fuer Pixel"""
+    rgb565_data = bytearray()
+    for r, g, b in img.getdata():
+        rgb565 = rgb888_to_rgb565(r, g, b)
+        # Little-endian
+        rgb565_data.append(rgb565 & 0xFF)
+        rgb565_data.append((rgb565 >> 8) & 0xFF)
+    return bytes(rgb565_data)
+
+
+def pack_rgb565_numpy(img: Image.Image) -> bytes:
+    """Packt ein RGB-Bild vektorisiert ueber den ganzen Frame"""
+    pixels = np.asarray(img, dtype=np.uint16)
+    rgb565 = (
+        ((pixels[..., 0] & 0xF8) << 8)
+        | ((pixels[..., 1] & 0xFC) << 3)
+        | (pixels[..., 2] >> 3)
+    )
+    return rgb565.astype('<u2').tobytes()
+
+
+def pack_rgb565(img: Image.Image) -> bytes:
+    """Packt ein RGB-Bild ins RGB565 Format (little-endian)"""
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    if NUMPY_AVAILABLE:
+        return pack_rgb565_numpy(img)
+    return pack_rgb565_python(img)
+
+
+def prepare_image(img: Image.Image, width: int = SCREEN_WIDTH,
+                  height: int = SCREEN_HEIGHT) -> Image.Image:
+    """Bringt ein Bild auf Display-Groesse (RGB, LANCZOS)
+
+    Grosse Bilder werden vorher guenstig verkleinert: JPEGs schon beim
+    Dekodieren im DCT-Bereich (draft), alle anderen per reduce() bis auf
+    REDUCING_GAP-fache Zielgroesse. Das abschliessende LANCZOS laeuft damit
+    immer auf einem Bild nahe der Zielgroesse.
+    """
+    gap_size = (int(width * REDUCING_GAP), int(height * REDUCING_GAP))
+    if img.format == 'JPEG':
+        img.draft(None, gap_size)
+    img = img.convert('RGB')
+    return img.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=REDUCING_GAP)
+
+
+def prepare_image_full(img: Image.Image, width: int = SCREEN_WIDTH,
+                       height: int = SCREEN_HEIGHT) -> Image.Image:
+    """Referenz: volle Dekodierung, dann LANCZOS auf Zielgroesse"""
+    img = img.convert('RGB')
+    return img.resize((width, height), Image.Resampling.LANCZOS)
+
+
+def convert_image(img: Image.Image, width: int = SCREEN_WIDTH,
+                  height: int = SCREEN_HEIGHT) -> bytes:
+    """Konvertiert ein geoeffnetes Bild zu RGB565"""
+    return pack_rgb565(prepare_image(img, width, height))
+
+
+def open_image(image_path: str, max_pixels: Optional[int] = None) -> Image.Image:
+    """Oeffnet ein Bild und prueft die Pixelzahl, bevor dekodiert wird"""
+    img = Image.open(image_path)
+    if max_pixels and img.width * img.height > max_pixels:
+        img.close()
+        raise Image.DecompressionBombError(
+            f"Bild zu gross: {img.width}x{img.height} Pixel (max. {max_pixels})"
+        )
+    return img
+
+
+def convert_file(image_path: str, width: int = SCREEN_WIDTH, height: int = SCREEN_HEIGHT,
+                 max_pixels: Optional[int] = None) -> bytes:
+    """Konvertiert eine Bilddatei zu RGB565"""
+    with open_image(image_path, max_pixels) as img:
+        return convert_image(img, width, height)
+
+
+def convert_file_to_path(image_path: str, output_path: str, width: int = SCREEN_WIDTH,
+                         height: int = SCREEN_HEIGHT, max_pixels: Optional[int] = None) -> Tuple[int, int]:
+    """Konvertiert eine Bilddatei und schreibt die RGB565-Daten nach output_path"""
+    data = convert_file(image_path, width, height, max_pixels)
+    with open(output_path, 'wb') as f:
+        f.write(data)
+    return width, height
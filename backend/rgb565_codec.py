@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+RGB565 Transfer-Codec (RLE)
+===========================
+
+Lauflaengen-Kodierung auf 16-Bit-Pixeln fuer die serielle Uebertragung
+zum ESP32. Flache Dashboard-Grafiken bestehen zum grossen Teil aus
+Flaechen gleicher Farbe und schrumpfen damit auf einen Bruchteil der
+307.200 Bytes eines Frames.
+
+Format (Pixel little-endian wie im RGB565-Frame):
+    Header < 0x80:  (Header + 1) Pixel folgen unveraendert (Literal)
+    Header >= 0x80: naechster Pixel wird ((Header & 0x7F) + 1) mal wiederholt
+
+Der Decoder in esp32_display_serial.ino (decodeRle) implementiert exakt
+dieses Format.
+
+Fuer Teil-Updates (PATCH) wird ein Frame in TILE_SIZE x TILE_SIZE Kacheln
+zerlegt; uebertragen werden nur Kacheln, die sich gegenueber dem Bild im
+Ziel- oder Basis-Slot geaendert haben. Jede Kachel ist ein Datensatz aus
+Spalte (1 Byte), Zeile (1 Byte) und TILE_SIZE * TILE_SIZE Pixeln.
+"""
+
+import itertools
+import struct
+from array import array
+from typing import Iterable, List, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+ENCODING_RAW = "RAW"
+ENCODING_RLE = "RLE"
+
+MAX_PACKET_PIXELS = 128
+MIN_REPEAT = 2
+
+FRAME_WIDTH = 480
+FRAME_HEIGHT = 320
+TILE_SIZE = 32
+TILES_X = FRAME_WIDTH // TILE_SIZE
+TILES_Y = FRAME_HEIGHT // TILE_SIZE
+TILE_RECORD_SIZE = 2 + TILE_SIZE * TILE_SIZE * 2
+# Mehr geaenderte Kacheln lohnen sich nicht, dann wird das ganze Bild gesendet
+MAX_PATCH_TILES = 100
+
+# array('H') liest in Host-Byte-Reihenfolge, die Daten sind Little-Endian
+_HOST_BIG_ENDIAN = array('H', b'\x00\x01')[0] == 1
+
+
+def max_encoded_size(raw_size: int) -> int:
+    """Groesste moegliche RLE-Ausgabe (nur Literale) fuer raw_size Bytes"""
+    pixels = raw_size // 2
+    return raw_size + (pixels + MAX_PACKET_PIXELS - 1) // MAX_PACKET_PIXELS
+
+
+def _runs_python(data: bytes) -> Iterable[Tuple[int, int]]:
+    """(Pixelwert, Laenge) aller Laeufe gleicher Pixel"""
+    pixels = array('H', data)
+    if _HOST_BIG_ENDIAN:
+        pixels.byteswap()
+    return ((value, sum(1 for _ in group)) for value, group in itertools.groupby(pixels))
+
+
+def _runs_numpy(data: bytes) -> Iterable[Tuple[int, int]]:
+    """(Pixelwert, Laenge) aller Laeufe, Laufgrenzen vektorisiert bestimmt"""
+    pixels = np.frombuffer(data, dtype='<u2')
+    if pixels.size == 0:
+        return []
+    starts = np.concatenate(([0], np.flatnonzero(pixels[1:] != pixels[:-1]) + 1))
+    lengths = np.diff(np.append(starts, pixels.size))
+    return zip(pixels[starts].tolist(), lengths.tolist())
+
+
+def _encode_runs(data: bytes, runs: Iterable[Tuple[int, int]]) -> bytes:
+    """Schreibt Laeufe als RLE-Pakete"""
+    out = bytearray()
+    literal_start = None
+    pos = 0
+
+    def flush_literal(start: int, end: int):
+        while start < end:
+            count = min(MAX_PACKET_PIXELS, end - start)
+            out.append(count - 1)
+            out.extend(data[start * 2:(start + count) * 2])
+            start += count
+
+    for value, length in runs:
+        if length >= MIN_REPEAT:
+            if literal_start is not None:
+                flush_literal(literal_start, pos)
+                literal_start = None
+            pos += length
+            while length:
+                count = min(MAX_PACKET_PIXELS, length)
+                out.append(0x80 | (count - 1))
+                out.extend(struct.pack('<H', value))
+                length -= count
+        else:
+            if literal_start is None:
+                literal_start = pos
+            pos += length
+
+    if literal_start is not None:
+        flush_literal(literal_start, pos)
+
+    return bytes(out)
+
+
+def encode_rle_python(data: bytes) -> bytes:
+    """Referenz-Encoder ohne NumPy"""
+    return _encode_runs(data, _runs_python(data))
+
+
+def encode_rle(data: bytes) -> bytes:
+    """Kodiert einen RGB565-Frame als RLE"""
+    if len(data) % 2:
+        raise ValueError("RGB565-Daten muessen eine gerade Laenge haben")
+    if NUMPY_AVAILABLE:
+        return _encode_runs(data, _runs_numpy(data))
+    return encode_rle_python(data)
+
+
+def decode_rle(payload: bytes, expected_size: int = None) -> bytes:
+    """Referenz-Decoder (entspricht decodeRle im Sketch)"""
+    out = bytearray()
+    i = 0
+    size = len(payload)
+    while i < size:
+        header = payload[i]
+        i += 1
+        count = (header & 0x7F) + 1
+        if header & 0x80:
+            if i + 2 > size:
+                raise ValueError("RLE-Daten abgeschnitten (Wiederholung)")
+            out.extend(payload[i:i + 2] * count)
+            i += 2
+        else:
+            if i + count * 2 > size:
+                raise ValueError("RLE-Daten abgeschnitten (Literal)")
+            out.extend(payload[i:i + count * 2])
+            i += count * 2
+        if expected_size is not None and len(out) > expected_size:
+            raise ValueError(f"RLE-Daten zu lang (> {expected_size} Bytes)")
+
+    if expected_size is not None and len(out) != expected_size:
+        raise ValueError(f"RLE-Daten ergeben {len(out)} statt {expected_size} Bytes")
+    return bytes(out)
+
+
+def dirty_tiles_python(reference: bytes, image: bytes) -> List[Tuple[int, int]]:
+    """Referenz: vergleicht jede Kachel zeilenweise"""
+    row_bytes = FRAME_WIDTH * 2
+    tile_bytes = TILE_SIZE * 2
+    tiles = []
+    for ty in range(TILES_Y):
+        for tx in range(TILES_X):
+            for row in range(ty * TILE_SIZE, (ty + 1) * TILE_SIZE):
+                start = row * row_bytes + tx * tile_bytes
+                if reference[start:start + tile_bytes] != image[start:start + tile_bytes]:
+                    tiles.append((tx, ty))
+                    break
+    return tiles
+
+
+def dirty_tiles(reference: bytes, image: bytes) -> List[Tuple[int, int]]:
+    """Liste der (Spalte, Zeile) aller Kacheln, die sich unterscheiden"""
+    if len(reference) != len(image):
+        raise ValueError("Frames unterschiedlicher Groesse")
+    if not NUMPY_AVAILABLE:
+        return dirty_tiles_python(reference, image)
+    shape = (TILES_Y, TILE_SIZE, TILES_X, TILE_SIZE)
+    ref = np.frombuffer(reference, dtype='<u2').reshape(shape)
+    new = np.frombuffer(image, dtype='<u2').reshape(shape)
+    changed = (ref != new).any(axis=(1, 3))
+    return [(int(tx), int(ty)) for ty, tx in zip(*np.nonzero(changed))]
+
+
+def build_patch(image: bytes, tiles: List[Tuple[int, int]]) -> bytes:
+    """Baut die PATCH-Nutzdaten aus den angegebenen Kacheln von image"""
+    row_bytes = FRAME_WIDTH * 2
+    tile_bytes = TILE_SIZE * 2
+    view = memoryview(image)
+    out = bytearray()
+    for tx, ty in tiles:
+        out.append(tx)
+        out.append(ty)
+        for row in range(ty * TILE_SIZE, (ty + 1) * TILE_SIZE):
+            start = row * row_bytes + tx * tile_bytes
+            out.extend(view[start:start + tile_bytes])
+    return bytes(out)
+
+
+def apply_patch(reference: bytes, patch: bytes) -> bytes:
+    """Referenz: wendet PATCH-Nutzdaten auf einen Frame an (wie applyPatch im Sketch)"""
+    if len(patch) % TILE_RECORD_SIZE:
+        raise ValueError("PATCH-Daten haben keine ganze Anzahl Kacheln")
+    row_bytes = FRAME_WIDTH * 2
+    tile_bytes = TILE_SIZE * 2
+    out = bytearray(reference)
+    for offset in range(0, len(patch), TILE_RECORD_SIZE):
+        tx, ty = patch[offset], patch[offset + 1]
+        if tx >= TILES_X or ty >= TILES_Y:
+            raise ValueError(f"Ungueltige Kachel {tx},{ty}")
+        pixels = offset + 2
+        for row in range(TILE_SIZE):
+            start = (ty * TILE_SIZE + row) * row_bytes + tx * tile_bytes
+            out[start:start + tile_bytes] = patch[pixels + row * tile_bytes:pixels + (row + 1) * tile_bytes]
+    return bytes(out)
@@ -3,11 +3,13 @@ from fastapi.responses import FileResponse, JSONResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional
+from typing import List, Optional, Literal
+from concurrent.futures import ProcessPoolExecutor
 import uuid
 from datetime import datetime, timezone
 from PIL import Image
@@ -16,6 +18,9 @@ import struct
 import json
 import asyncio
 import aiofiles
+import hashlib
+
+import rgb565
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -31,8 +36,73 @@ RGB565_DIR = ROOT_DIR / "rgb565"
 UPLOAD_DIR.mkdir(exist_ok=True)
 RGB565_DIR.mkdir(exist_ok=True)
 
+# Image conversion runs in a bounded process pool so the event loop stays free
+CONVERSION_WORKERS = int(os.environ.get('CONVERSION_WORKERS', min(4, os.cpu_count() or 1)))
+MAX_FINISHED_JOBS = 500
+
+# Upload limits: request bodies are capped before they are spooled (UploadLimitMiddleware),
+# file type and per-file size are checked while copying the upload to disk
+MAX_UPLOAD_BYTES = int(os.environ.get('MAX_UPLOAD_BYTES', 25 * 1024 * 1024))
+MAX_BATCH_BYTES = int(os.environ.get('MAX_BATCH_BYTES', 8 * MAX_UPLOAD_BYTES))
+MULTIPART_OVERHEAD = 64 * 1024
+MAX_IMAGE_PIXELS = int(os.environ.get('MAX_IMAGE_PIXELS', 40_000_000))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+
+# File signatures of accepted image formats
+IMAGE_SIGNATURES = (
+    b'\x89PNG\r\n\x1a\n',
+    b'\xff\xd8\xff',
+    b'GIF87a',
+    b'GIF89a',
+    b'BM',
+    b'II*\x00',
+    b'MM\x00*',
+)
+
+# Concurrent uploads of the same content wait this long for the first conversion
+CONVERSION_WAIT_TIMEOUT = 120.0
+CONVERSION_WAIT_POLL = 0.2
+
+class UploadLimitMiddleware:
+    """Reject upload requests above the size limit before their body is spooled"""
+    def __init__(self, app, limits: dict):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope.get("path")) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        too_large = HTTPException(status_code=413, detail=f"Request body exceeds {limit} bytes")
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            response = JSONResponse({"detail": too_large.detail}, status_code=413)
+            await response(scope, receive, send)
+            return
+
+        # Chunked bodies carry no Content-Length: count while the body is read
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise too_large
+            return message
+
+        await self.app(scope, limited_receive, send)
+
 # Create the main app without a prefix
 app = FastAPI()
+app.add_middleware(UploadLimitMiddleware, limits={
+    "/api/images/upload": MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD,
+    "/api/images/upload-batch": MAX_BATCH_BYTES + MULTIPART_OVERHEAD,
+})
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -103,6 +173,7 @@ class DisplayImage(BaseModel):
     rgb565_path: str
     width: int
     height: int
+    content_hash: Optional[str] = None
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class DisplayImageCreate(BaseModel):
@@ -112,44 +183,242 @@ class TelemetryData(BaseModel):
     gear: int = Field(ge=0, le=6, description="Gear position (0=N, 1-6=Gears)")
     speed: int = Field(ge=0, le=200, description="Speed in km/h")
 
-# Image conversion functions
-def rgb888_to_rgb565(r: int, g: int, b: int) -> int:
-    """Convert RGB888 to RGB565 format"""
-    r5 = (r >> 3) & 0x1F
-    g6 = (g >> 2) & 0x3F
-    b5 = (b >> 3) & 0x1F
-    return (r5 << 11) | (g6 << 5) | b5
+class ConversionJob(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    image_id: str
+    name: str
+    status: Literal["queued", "running", "done", "failed"] = "queued"
+    progress: int = 0
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+# Conversion job tracking with progress push to /ws/jobs subscribers
+class JobManager:
+    def __init__(self, workers: int):
+        self.jobs: dict = {}
+        self.subscribers: List[WebSocket] = []
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.slots = asyncio.Semaphore(workers)
+        self.workers = workers
+        self.tasks: set = set()
+
+    def start(self):
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        logger.info(f"Conversion pool started with {self.workers} worker(s)")
+
+    def shutdown(self):
+        if self.pool:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
+    def create(self, image_id: str, name: str) -> ConversionJob:
+        job = ConversionJob(image_id=image_id, name=name)
+        self.jobs[job.id] = job
+        self._prune()
+        return job
+
+    def get(self, job_id: str) -> Optional[ConversionJob]:
+        return self.jobs.get(job_id)
+
+    def submit(self, coro):
+        """Keep a reference to the background task until it finishes"""
+        task = asyncio.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def update(self, job: ConversionJob, **fields):
+        for key, value in fields.items():
+            setattr(job, key, value)
+        job.updated_at = datetime.now(timezone.utc)
+        await self.broadcast(job)
+
+    async def subscribe(self, websocket: WebSocket):
+        await websocket.accept()
+        self.subscribers.append(websocket)
+
+    def unsubscribe(self, websocket: WebSocket):
+        if websocket in self.subscribers:
+            self.subscribers.remove(websocket)
+
+    async def broadcast(self, job: ConversionJob):
+        message = {"type": "job", "job": job.model_dump(mode="json")}
+        disconnected = []
+        for connection in self.subscribers:
+            try:
+                await connection.send_text(json.dumps(message))
+            except Exception as e:
+                logger.error(f"Error sending job update: {e}")
+                disconnected.append(connection)
+
+        for conn in disconnected:
+            self.unsubscribe(conn)
+
+    def _prune(self):
+        finished = [j for j in self.jobs.values() if j.status in ("done", "failed")]
+        for job in sorted(finished, key=lambda j: j.updated_at)[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job.id]
+
+jobs = JobManager(CONVERSION_WORKERS)
+
+# Image conversion jobs
+async def convert_in_pool(original_path: Path, rgb565_path: Path, on_start=None) -> tuple:
+    """Convert an image to RGB565 in the worker pool, bounded by the worker count"""
+    async with jobs.slots:
+        if on_start:
+            await on_start()
+        return await asyncio.get_running_loop().run_in_executor(
+            jobs.pool, rgb565.convert_file_to_path, str(original_path), str(rgb565_path),
+            rgb565.SCREEN_WIDTH, rgb565.SCREEN_HEIGHT, MAX_IMAGE_PIXELS
+        )
+
+def build_image_doc(image_id: str, name: str, original_path: Path, rgb565_path: Path,
+                    width: int, height: int, content_hash: Optional[str] = None) -> tuple:
+    """Create the DisplayImage model and its Mongo document"""
+    image_doc = DisplayImage(
+        id=image_id,
+        name=name,
+        original_path=str(original_path),
+        rgb565_path=str(rgb565_path),
+        width=width,
+        height=height,
+        content_hash=content_hash
+    )
+
+    doc = image_doc.model_dump()
+    doc['created_at'] = doc['created_at'].isoformat()
+    return image_doc, doc
+
+def finish_content_hash(digest, width: int = rgb565.SCREEN_WIDTH, height: int = rgb565.SCREEN_HEIGHT) -> str:
+    """SHA-256 of the source bytes plus the target size"""
+    digest.update(f":{width}x{height}".encode())
+    return digest.hexdigest()
+
+def is_image_header(header: bytes) -> bool:
+    """Check the first bytes of an upload against known image signatures"""
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return True
+    return header.startswith(IMAGE_SIGNATURES)
+
+async def find_duplicate(content_hash: str) -> Optional[dict]:
+    """Find an existing image with identical source bytes whose artifacts still exist"""
+    existing = await db.display_images.find_one({"content_hash": content_hash}, {"_id": 0})
+    if existing and Path(existing['original_path']).exists() and Path(existing['rgb565_path']).exists():
+        return existing
+    return None
+
+async def claim_conversion(content_hash: str, image_id: str) -> bool:
+    """Insert-or-reuse: the unique index lets only one upload per content hash convert at a time"""
+    try:
+        await db.image_conversions.insert_one({"content_hash": content_hash, "image_id": image_id})
+        return True
+    except DuplicateKeyError:
+        return False
+
+async def release_conversion(content_hash: str, image_id: str):
+    await db.image_conversions.delete_one({"content_hash": content_hash, "image_id": image_id})
+
+async def wait_for_conversion(content_hash: str, timeout: float = CONVERSION_WAIT_TIMEOUT) -> Optional[dict]:
+    """Wait until a concurrent conversion of the same content is released, then return its image"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while await db.image_conversions.find_one({"content_hash": content_hash}):
+        if loop.time() > deadline:
+            return None
+        await asyncio.sleep(CONVERSION_WAIT_POLL)
+    return await find_duplicate(content_hash)
+
+async def claim_or_reuse(content_hash: str, image_id: str) -> Optional[dict]:
+    """Claim the conversion of content_hash, or return the image another upload converted meanwhile"""
+    while not await claim_conversion(content_hash, image_id):
+        existing = await wait_for_conversion(content_hash)
+        if existing:
+            return existing
+        if await db.image_conversions.find_one({"content_hash": content_hash}):
+            raise TimeoutError("Timed out waiting for a concurrent conversion of the same image")
+        # The other conversion failed: try to claim it ourselves
+    return None
+
+def reuse_duplicate(existing: dict, image_id: str, name: str, original_path: Path) -> tuple:
+    """Point a new record at the artifacts of an existing image and drop the redundant upload"""
+    if str(original_path) != existing['original_path']:
+        original_path.unlink(missing_ok=True)
+    return build_image_doc(
+        image_id, name, Path(existing['original_path']), Path(existing['rgb565_path']),
+        existing['width'], existing['height'], existing['content_hash']
+    )
 
-def convert_image_to_rgb565(image_path: str, output_path: str, target_width: int = 480, target_height: int = 320) -> tuple:
-    """Convert image to RGB565 format for ESP32 display"""
+async def save_upload(file: UploadFile) -> tuple:
+    """Store an uploaded image in UPLOAD_DIR"""
+    # Validate file type
+    if not file.content_type or not file.content_type.startswith('image/'):
+        raise HTTPException(status_code=400, detail="File must be an image")
+
+    # Generate unique ID
+    image_id = str(uuid.uuid4())
+    original_filename = file.filename or "unnamed.png"
+
+    # Stream original image to disk in chunks
+    original_path = UPLOAD_DIR / f"{image_id}_{original_filename}"
+    partial_path = original_path.with_name(original_path.name + ".part")
+    digest = hashlib.sha256()
+    size = 0
     try:
-        # Open and resize image
-        img = Image.open(image_path)
-        img = img.convert('RGB')
-        img = img.resize((target_width, target_height), Image.Resampling.LANCZOS)
-        
-        # Convert to RGB565
-        rgb565_data = bytearray()
-        pixels = img.load()
-        
-        for y in range(target_height):
-            for x in range(target_width):
-                r, g, b = pixels[x, y]
-                rgb565 = rgb888_to_rgb565(r, g, b)
-                # Little endian format
-                rgb565_data.append(rgb565 & 0xFF)
-                rgb565_data.append((rgb565 >> 8) & 0xFF)
-        
-        # Save RGB565 data
-        with open(output_path, 'wb') as f:
-            f.write(rgb565_data)
-        
-        logger.info(f"Converted image to RGB565: {output_path} ({len(rgb565_data)} bytes)")
-        return target_width, target_height
-    except Exception as e:
-        logger.error(f"Error converting image: {e}")
+        async with aiofiles.open(partial_path, 'wb') as f:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                if size == 0 and not is_image_header(chunk):
+                    raise HTTPException(status_code=400, detail="File is not a supported image")
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    raise HTTPException(status_code=413, detail=f"File exceeds {MAX_UPLOAD_BYTES} bytes")
+                digest.update(chunk)
+                await f.write(chunk)
+        if size == 0:
+            raise HTTPException(status_code=400, detail="File is empty")
+        partial_path.replace(original_path)
+    except BaseException:
+        partial_path.unlink(missing_ok=True)
         raise
 
+    return image_id, original_filename, original_path, finish_content_hash(digest)
+
+async def run_conversion_job(job: ConversionJob, image_doc: DisplayImage):
+    """Convert an uploaded image in the worker pool and store it once finished"""
+    original_path = Path(image_doc.original_path)
+    rgb565_path = Path(image_doc.rgb565_path)
+    claimed = False
+    try:
+        # Another upload of the same content may be converting right now
+        existing = await claim_or_reuse(image_doc.content_hash, image_doc.id)
+        if existing:
+            _, doc = reuse_duplicate(existing, image_doc.id, image_doc.name, original_path)
+            await db.display_images.insert_one(doc)
+            await jobs.update(job, status="done", progress=100)
+            return
+        claimed = True
+
+        width, height = await convert_in_pool(
+            original_path, rgb565_path,
+            on_start=lambda: jobs.update(job, status="running", progress=10)
+        )
+        await jobs.update(job, progress=90)
+
+        image_doc.width, image_doc.height = width, height
+        doc = image_doc.model_dump()
+        doc['created_at'] = doc['created_at'].isoformat()
+        await db.display_images.insert_one(doc)
+
+        logger.info(f"Converted image to RGB565: {rgb565_path} ({width}x{height})")
+        await jobs.update(job, status="done", progress=100)
+    except Exception as e:
+        logger.error(f"Conversion job {job.id} failed: {e}")
+        original_path.unlink(missing_ok=True)
+        rgb565_path.unlink(missing_ok=True)
+        await jobs.update(job, status="failed", error=str(e))
+    finally:
+        if claimed:
+            await release_conversion(image_doc.content_hash, image_doc.id)
+
 # API Routes
 @api_router.get("/")
 async def root():
@@ -159,58 +428,183 @@ async def root():
         "endpoints": {
             "images": "/api/images",
             "upload": "/api/images/upload",
-            "websocket": "/ws/esp32"
+            "upload_batch": "/api/images/upload-batch",
+            "jobs": "/api/jobs/{job_id}",
+            "websocket": "/ws/esp32",
+            "job_updates": "/ws/jobs"
         }
     }
 
 @api_router.post("/images/upload")
 async def upload_image(file: UploadFile = File(...)):
-    """Upload and convert image to RGB565 format"""
+    """Upload image and queue its conversion to RGB565 format
+
+    The response carries the image document as before plus the conversion
+    job; the image is listed under /api/images once the job is done.
+    """
     try:
-        # Validate file type
-        if not file.content_type.startswith('image/'):
-            raise HTTPException(status_code=400, detail="File must be an image")
+        image_id, original_filename, original_path, content_hash = await save_upload(file)
+        job = jobs.create(image_id, original_filename)
         
-        # Generate unique ID
-        image_id = str(uuid.uuid4())
-        original_filename = file.filename or "unnamed.png"
-        
-        # Save original image
-        original_path = UPLOAD_DIR / f"{image_id}_{original_filename}"
-        async with aiofiles.open(original_path, 'wb') as f:
-            content = await file.read()
-            await f.write(content)
-        
-        # Convert to RGB565
-        rgb565_filename = f"{image_id}.rgb565"
-        rgb565_path = RGB565_DIR / rgb565_filename
-        
-        width, height = convert_image_to_rgb565(str(original_path), str(rgb565_path))
-        
-        # Save to database
-        image_doc = DisplayImage(
-            id=image_id,
-            name=original_filename,
-            original_path=str(original_path),
-            rgb565_path=str(rgb565_path),
-            width=width,
-            height=height
-        )
+        # Identical image already converted: reuse its RGB565 data
+        existing = await find_duplicate(content_hash)
+        if existing:
+            image_doc, doc = reuse_duplicate(existing, image_id, original_filename, original_path)
+            await db.display_images.insert_one(doc)
+            await jobs.update(job, status="done", progress=100)
+            
+            return {
+                "success": True,
+                "image": image_doc,
+                "job": job,
+                "duplicate_of": existing['id'],
+                "message": "Image already converted, reusing RGB565 data"
+            }
         
-        doc = image_doc.model_dump()
-        doc['created_at'] = doc['created_at'].isoformat()
-        await db.display_images.insert_one(doc)
+        # Convert to RGB565 in the background
+        image_doc, _ = build_image_doc(image_id, original_filename, original_path,
+                                       RGB565_DIR / f"{image_id}.rgb565",
+                                       rgb565.SCREEN_WIDTH, rgb565.SCREEN_HEIGHT, content_hash)
+        jobs.submit(run_conversion_job(job, image_doc))
         
         return {
             "success": True,
             "image": image_doc,
-            "message": f"Image uploaded and converted to RGB565 ({width}x{height})"
+            "job": job,
+            "message": "Image uploaded, conversion to RGB565 queued"
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Upload error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.post("/images/upload-batch")
+async def upload_images_batch(files: List[UploadFile] = File(...)):
+    """Upload several images, convert them in parallel and store them in one insert"""
+    async def save(file: UploadFile) -> dict:
+        name = file.filename or "unnamed.png"
+        try:
+            image_id, name, original_path, content_hash = await save_upload(file)
+            return {"name": name, "image_id": image_id, "original_path": original_path, "content_hash": content_hash}
+        except Exception as e:
+            logger.error(f"Batch upload error for {name}: {e}")
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            return {"name": name, "error": detail}
+    
+    claims = []
+    
+    async def convert(upload: dict) -> dict:
+        """Return the stored image (existing or freshly converted) for one content hash"""
+        existing = await find_duplicate(upload['content_hash'])
+        if existing:
+            return existing
+        existing = await claim_or_reuse(upload['content_hash'], upload['image_id'])
+        if existing:
+            return existing
+        claims.append((upload['content_hash'], upload['image_id']))
+        rgb565_path = RGB565_DIR / f"{upload['image_id']}.rgb565"
+        try:
+            width, height = await convert_in_pool(upload['original_path'], rgb565_path)
+        except Exception:
+            rgb565_path.unlink(missing_ok=True)
+            raise
+        _, doc = build_image_doc(upload['image_id'], upload['name'], upload['original_path'],
+                                 rgb565_path, width, height, upload['content_hash'])
+        return doc
+    
+    uploads = await asyncio.gather(*(save(f) for f in files))
+    
+    # Convert every distinct image once, duplicates inside the batch share the result
+    unique = {}
+    for upload in uploads:
+        if "error" not in upload:
+            unique.setdefault(upload['content_hash'], upload)
+    try:
+        converted = dict(zip(unique, await asyncio.gather(
+            *(convert(u) for u in unique.values()), return_exceptions=True
+        )))
+        return await store_batch(uploads, converted)
+    finally:
+        # Released only after the insert so waiting uploads find the stored image
+        for content_hash, image_id in claims:
+            await release_conversion(content_hash, image_id)
+
+async def discard_artifacts(doc: dict):
+    """Delete the files of an unstored document unless another stored image uses them"""
+    if await db.display_images.count_documents({"rgb565_path": doc['rgb565_path']}) == 0:
+        Path(doc['original_path']).unlink(missing_ok=True)
+        Path(doc['rgb565_path']).unlink(missing_ok=True)
+
+async def store_batch(uploads: List[dict], converted: dict) -> dict:
+    """Insert the converted batch images in one go and build the per-file results"""
+    results = []
+    docs = []
+    positions = []  # index into results for each doc
+    for upload in uploads:
+        if "error" in upload:
+            results.append({"name": upload['name'], "success": False, "error": upload['error']})
+            continue
+        
+        stored = converted[upload['content_hash']]
+        if isinstance(stored, Exception):
+            logger.error(f"Batch conversion error for {upload['name']}: {stored}")
+            upload['original_path'].unlink(missing_ok=True)
+            results.append({"name": upload['name'], "success": False, "error": str(stored)})
+            continue
+        
+        if stored['id'] == upload['image_id']:
+            image_doc, doc = build_image_doc(upload['image_id'], upload['name'], upload['original_path'],
+                                             Path(stored['rgb565_path']), stored['width'], stored['height'],
+                                             upload['content_hash'])
+        else:
+            image_doc, doc = reuse_duplicate(stored, upload['image_id'], upload['name'], upload['original_path'])
+        docs.append(doc)
+        positions.append(len(results))
+        results.append({"name": upload['name'], "success": True, "image": image_doc,
+                        "duplicate": stored['id'] != upload['image_id']})
+    
+    stored_count = len(docs)
+    if docs:
+        try:
+            await db.display_images.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            # Unordered insert: every document not listed in writeErrors was stored
+            failed = {error['index']: error.get('errmsg', "Insert failed")
+                      for error in e.details.get('writeErrors', [])}
+            logger.error(f"Batch insert error for {len(failed)} image(s): {e}")
+            for index, message in failed.items():
+                results[positions[index]] = {"name": results[positions[index]]['name'],
+                                             "success": False, "error": message}
+                await discard_artifacts(docs[index])
+            stored_count -= len(failed)
+        except Exception as e:
+            logger.error(f"Batch insert error: {e}")
+            # Unknown which documents made it: remove them so a retry does not reuse orphans
+            await db.display_images.delete_many({"id": {"$in": [doc['id'] for doc in docs]}})
+            for doc in docs:
+                await discard_artifacts(doc)
+            raise HTTPException(status_code=500, detail=str(e))
+    
+    logger.info(f"Batch upload: {stored_count}/{len(results)} images stored as RGB565")
+    
+    return {
+        "success": stored_count == len(results),
+        "results": results,
+        "message": f"{stored_count} of {len(results)} images uploaded and converted to RGB565"
+    }
+
+@api_router.get("/jobs/{job_id}", response_model=ConversionJob)
+async def get_job(job_id: str):
+    """Get conversion job status"""
+    job = jobs.get(job_id)
+    
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return job
+
 @api_router.get("/images", response_model=List[DisplayImage])
 async def get_images():
     """Get all uploaded images"""
@@ -272,16 +666,17 @@ async def delete_image(image_id: str):
     if not image:
         raise HTTPException(status_code=404, detail="Image not found")
     
-    # Delete files
+    # Delete from database
+    await db.display_images.delete_one({"id": image_id})
+    
+    # Delete files once no other record references them
     try:
-        Path(image['original_path']).unlink(missing_ok=True)
-        Path(image['rgb565_path']).unlink(missing_ok=True)
+        for key in ('original_path', 'rgb565_path'):
+            if await db.display_images.count_documents({key: image[key]}) == 0:
+                Path(image[key]).unlink(missing_ok=True)
     except Exception as e:
         logger.error(f"Error deleting files: {e}")
     
-    # Delete from database
-    await db.display_images.delete_one({"id": image_id})
-    
     return {"success": True, "message": "Image deleted"}
 
 @api_router.post("/images/{image_id}/send")
@@ -369,6 +764,19 @@ async def websocket_endpoint(websocket: WebSocket):
         logger.error(f"WebSocket error: {e}")
         manager.disconnect(websocket)
 
+# WebSocket endpoint for conversion job progress
+@app.websocket("/ws/jobs")
+async def jobs_websocket_endpoint(websocket: WebSocket):
+    await jobs.subscribe(websocket)
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        jobs.unsubscribe(websocket)
+    except Exception as e:
+        logger.error(f"Job WebSocket error: {e}")
+        jobs.unsubscribe(websocket)
+
 # Include the router in the main app
 app.include_router(api_router)
 
@@ -387,6 +795,15 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def start_conversion_pool():
+    jobs.start()
+    await db.display_images.create_index("content_hash")
+    # Claims are only held while a conversion runs; drop leftovers of a previous run
+    await db.image_conversions.delete_many({})
+    await db.image_conversions.create_index("content_hash", unique=True)
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    jobs.shutdown()
     client.close()
@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Slot Manager
+============
+
+Virtuelle Bildtabelle ueber den MAX_SLOTS physischen Cache-Slots des ESP32.
+
+Bilder werden unter einer beliebigen ID registriert (z.B. Bildnummer 1-8
+oder (Fahrzeug, Bildnummer) fuer fahrzeugspezifische Grafiken). Wird ein
+Bild angezeigt, das gerade in keinem Slot liegt, laedt der Manager es bei
+Bedarf hoch und verdraengt dafuer das Bild mit der niedrigsten Prioritaet,
+bei Gleichstand das am laengsten nicht benutzte (LRU).
+
+Fahrzeugspezifische Bilder kommen aus einem Ordner mit je einem
+Unterordner pro Fahrzeug (siehe scan_variant_folder). Der Ordnername muss
+in der Fahrzeug-ID der Telemetrie vorkommen, z.B. "Lions_City" fuer
+"BP_MAN_Lions_City_12_C_2147482"; fehlt ein Bild, gilt das Grundbild.
+
+Slots, deren Inhalt der Manager nicht kennt (z.B. aus einer frueheren
+Sitzung), gelten als Grundbild (Slot + 1): nicht registrierte Bildnummern
+werden weiterhin direkt auf ihren Slot abgebildet.
+
+Treffer, Fehlgriffe und Verdraengungen werden gezaehlt, um die Groesse
+des Arbeitsbereichs abschaetzen zu koennen.
+
+Der Prefetcher laedt das voraussichtlich naechste Bild (Uebergangsgraph
+von determine_image plus Hinweise aus dem BusState) in Ruhephasen vorab
+hoch, damit beim Wechsel kein Upload mehr noetig ist. Der Upload laeuft in
+einem eigenen Thread und haelt die Slot-Tabelle dabei nicht gesperrt.
+"""
+
+import queue
+import re
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from esp32_controller import ESP32Controller, MAX_SLOTS
+
+# Prioritaet der Grundbilder und Fahrzeugbilder; untereinander entscheidet LRU
+BASE_PRIORITY = 1
+
+IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg", ".bmp", ".gif")
+
+# Slot-Inhalt eines geaenderten oder entfernten Bildes: wird als Erstes ueberschrieben
+STALE = "<veraltet>"
+
+
+@dataclass
+class VirtualImage:
+    """Ein registriertes Bild"""
+    image_id: Hashable
+    data: bytes
+    priority: int = 0
+    crc: int = 0
+
+
+@dataclass
+class SlotStats:
+    """Zaehler fuer Treffer/Fehlgriffe"""
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    upload_failures: int = 0
+    upload_seconds: float = 0.0
+    prefetches: int = 0
+    prefetch_hits: int = 0
+    prefetch_wasted: int = 0
+    stall_avoided_seconds: float = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    @property
+    def prefetch_accuracy(self) -> float:
+        return self.prefetch_hits / self.prefetches if self.prefetches else 0.0
+
+
+class SlotManager:
+    """Bildet registrierte Bilder auf die physischen Slots ab"""
+
+    def __init__(self, esp32: ESP32Controller, slots: int = MAX_SLOTS, log_callback=None):
+        self.esp32 = esp32
+        self.log = log_callback or print
+        self.slot_count = slots
+        self.images: Dict[Hashable, VirtualImage] = {}
+        self.resident: List[Optional[Hashable]] = [None] * slots
+        self.last_used: List[float] = [0.0] * slots
+        self.prefetched: Dict[int, float] = {}   # Slot -> Uploaddauer, noch nicht angezeigt
+        self.variants: Set[Hashable] = set()
+        self.variant_matches: Dict[Hashable, Optional[Hashable]] = {}
+        self.uploading: Dict[int, Hashable] = {}  # Slot -> Bild, Upload laeuft
+        self.stats = SlotStats()
+        self.lock = threading.RLock()
+        self.uploaded = threading.Condition(self.lock)
+
+    def register(self, image_id: Hashable, data: bytes, priority: int = 0,
+                 slot: Optional[int] = None):
+        """Registriert ein Bild; slot gibt an, dass es dort bereits liegt"""
+        with self.lock:
+            old = self.images.get(image_id)
+            self.images[image_id] = VirtualImage(image_id, bytes(data), priority, zlib.crc32(data))
+            if isinstance(image_id, tuple) and len(image_id) == 2:
+                self.variants.add(image_id[0])
+                self.variant_matches.clear()
+            current = self.slot_of(image_id)
+            if current is not None and (old is None or old.crc != self.images[image_id].crc):
+                # Inhalt geaendert: alter Slot-Inhalt gilt nicht mehr
+                self.resident[current] = STALE
+            if slot is not None:
+                self.assign(slot, image_id)
+
+    def unregister(self, image_id: Hashable):
+        """Entfernt ein Bild aus der Tabelle (der Slot wird frei)"""
+        with self.lock:
+            self.images.pop(image_id, None)
+            slot = self.slot_of(image_id)
+            if slot is not None:
+                self.resident[slot] = STALE
+
+    def assign(self, slot: int, image_id: Hashable):
+        """Vermerkt, dass image_id in slot liegt"""
+        with self.lock:
+            for other, resident in enumerate(self.resident):
+                if resident == image_id:
+                    self.resident[other] = STALE
+            self.resident[slot] = image_id
+            self.last_used[slot] = time.monotonic()
+            self.prefetched.pop(slot, None)
+
+    def slot_of(self, image_id: Hashable) -> Optional[int]:
+        """Physischer Slot eines Bildes oder None"""
+        for slot, resident in enumerate(self.resident):
+            if resident == image_id:
+                return slot
+        return None
+
+    def sync_with_device(self):
+        """Uebernimmt die Belegung anhand der vom ESP32 gemeldeten Slot-Hashes"""
+        with self.lock:
+            by_crc = {image.crc: image_id for image_id, image in self.images.items()}
+            self.prefetched.clear()
+            for slot in range(self.slot_count):
+                crc = self.esp32.slot_hashes[slot]
+                self.resident[slot] = by_crc.get(crc) if crc is not None else None
+
+    def match_variant(self, vehicle: Optional[Hashable]) -> Optional[Hashable]:
+        """Registrierte Variante fuer vehicle: exakt oder als Teil der Fahrzeug-ID (laengster Treffer)"""
+        if vehicle is None:
+            return None
+        with self.lock:
+            if vehicle not in self.variant_matches:
+                if vehicle in self.variants:
+                    match = vehicle
+                else:
+                    name = str(vehicle).lower()
+                    found = [v for v in self.variants if isinstance(v, str) and v.lower() in name]
+                    match = max(found, key=len) if found else None
+                self.variant_matches[vehicle] = match
+            return self.variant_matches[vehicle]
+
+    def resolve(self, image_id: Hashable, variant: Optional[Hashable] = None) -> Hashable:
+        """(Variante, image_id), falls fuer das Fahrzeug variant ein eigenes Bild registriert ist"""
+        key = self.match_variant(variant)
+        if key is not None and (key, image_id) in self.images:
+            return (key, image_id)
+        return image_id
+
+    def slot_empty(self, slot: int) -> bool:
+        """Liegt nachweislich nichts in slot? Ohne HASH ist ein nie gecachter Slot unbekannt"""
+        if self.resident[slot] is not None or self.esp32.cached_slots[slot]:
+            return False
+        return "HASH" in self.esp32.features
+
+    def holder(self, slot: int) -> Optional[Hashable]:
+        """Bild in slot; unbekannter Inhalt gilt als Grundbild slot + 1"""
+        if self.resident[slot] is not None:
+            return self.resident[slot]
+        return None if self.slot_empty(slot) else slot + 1
+
+    def slot_priority(self, slot: int) -> int:
+        image = self.images.get(self.resident[slot])
+        return image.priority if image is not None else BASE_PRIORITY
+
+    def choose_victim(self, protect: Iterable[Hashable] = ()) -> Optional[int]:
+        """Freier Slot, sonst niedrigste Prioritaet und am laengsten unbenutzt"""
+        for slot in range(self.slot_count):
+            if slot not in self.uploading and (self.slot_empty(slot) or self.resident[slot] == STALE):
+                return slot
+        protect = set(protect)
+        candidates = [s for s in range(self.slot_count)
+                      if s not in self.uploading and self.holder(s) not in protect]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda s: (self.slot_priority(s), self.last_used[s]))
+
+    def claim(self, slot: int, image: VirtualImage):
+        """Reserviert slot fuer den Upload von image (Aufrufer haelt self.lock)"""
+        evicted = self.holder(slot)
+        if evicted is not None and evicted != STALE:
+            self.stats.evictions += 1
+            self.log(f"Slot {slot + 1}: verdraenge {evicted} fuer {image.image_id}")
+        if self.prefetched.pop(slot, None) is not None:
+            self.stats.prefetch_wasted += 1
+        self.resident[slot] = STALE
+        self.uploading[slot] = image.image_id
+
+    def upload(self, slot: int, image: VirtualImage, prefetch: bool = False) -> Optional[float]:
+        """Laedt image in den reservierten slot hoch und liefert die Dauer
+
+        self.lock wird waehrend der Uebertragung nicht gehalten, damit
+        show() fuer bereits geladene Bilder nicht auf den Upload wartet.
+        """
+        start = time.perf_counter()
+        ok = False
+        try:
+            ok = self.esp32.cache_image(slot, image.data)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                del self.uploading[slot]
+                self.stats.upload_seconds += elapsed
+                if ok:
+                    self.assign(slot, image.image_id)
+                    if prefetch:
+                        self.stats.prefetches += 1
+                        self.prefetched[slot] = elapsed
+                        # Vorab geladen zaehlt nicht als benutzt
+                        self.last_used[slot] = 0.0
+                else:
+                    self.stats.upload_failures += 1
+                self.uploaded.notify_all()
+        return elapsed if ok else None
+
+    def ensure(self, image_id: Hashable) -> Optional[int]:
+        """Sorgt dafuer, dass image_id in einem Slot liegt, und liefert den Slot"""
+        with self.lock:
+            start = time.perf_counter()
+            while image_id in self.uploading.values():
+                # Laeuft gerade als Prefetch: den Rest abwarten statt neu hochzuladen
+                self.uploaded.wait()
+            waited = time.perf_counter() - start
+
+            slot = self.slot_of(image_id)
+            if slot is not None:
+                self.stats.hits += 1
+                self.last_used[slot] = time.monotonic()
+                staged = self.prefetched.pop(slot, None)
+                if staged is not None:
+                    self.stats.prefetch_hits += 1
+                    self.stats.stall_avoided_seconds += max(0.0, staged - waited)
+                return slot
+
+            image = self.images.get(image_id)
+            if image is None:
+                return None
+
+            self.stats.misses += 1
+            slot = self.choose_victim()
+            if slot is None:
+                return None
+            self.claim(slot, image)
+
+        if self.upload(slot, image) is None:
+            return None
+        return slot
+
+    def wants_prefetch(self, image_id: Hashable) -> bool:
+        """Ist image_id registriert und weder geladen noch im Upload?"""
+        with self.lock:
+            return (image_id in self.images and self.slot_of(image_id) is None
+                    and image_id not in self.uploading.values())
+
+    def prefetch(self, image_id: Hashable, protect: Iterable[Hashable] = ()) -> bool:
+        """Laedt image_id vorab hoch, ohne Bilder aus protect oder mit hoeherer Prioritaet zu verdraengen"""
+        with self.lock:
+            if not self.wants_prefetch(image_id):
+                return False
+            image = self.images[image_id]
+            slot = self.choose_victim(protect)
+            if slot is None:
+                return False
+            if self.holder(slot) not in (None, STALE) and self.slot_priority(slot) > image.priority:
+                return False
+            self.claim(slot, image)
+
+        return self.upload(slot, image, prefetch=True) is not None
+
+    def show(self, image_id: Hashable, gear: int = 0, speed: int = 0,
+             variant: Optional[Hashable] = None) -> bool:
+        """Zeigt ein Bild an und laedt es vorher bei Bedarf hoch
+
+        Nicht registrierte Bildnummern 1..MAX_SLOTS werden wie bisher direkt
+        auf Slot (Nummer - 1) abgebildet, solange dort kein anderes Bild
+        hochgeladen wurde.
+        """
+        image_id = self.resolve(image_id, variant)
+        with self.lock:
+            registered = image_id in self.images
+            fallback = (not registered and isinstance(image_id, int) and 1 <= image_id <= self.slot_count
+                        and self.resident[image_id - 1] is None)
+        if registered:
+            slot = self.ensure(image_id)
+            if slot is None:
+                return False
+        elif fallback:
+            slot = image_id - 1
+            with self.lock:
+                self.last_used[slot] = time.monotonic()
+        else:
+            self.log(f"Bild {image_id} nicht registriert")
+            return False
+        return self.esp32.show_image(slot, gear, speed)
+
+    def format_stats(self) -> str:
+        """Statistik als Logzeile"""
+        s = self.stats
+        return (f"Slots: {s.hits} Treffer, {s.misses} Fehlgriffe "
+                f"({s.hit_rate * 100:.0f}% Trefferquote), {s.evictions} verdraengt, "
+                f"{s.upload_seconds:.1f}s Upload, {len(self.images)} Bilder registriert; "
+                f"Prefetch: {s.prefetch_hits}/{s.prefetches} getroffen "
+                f"({s.prefetch_accuracy * 100:.0f}%), {s.prefetch_wasted} verworfen, "
+                f"{s.stall_avoided_seconds:.1f}s Wartezeit vermieden")
+
+
+def scan_variant_folder(folder: str) -> Dict[str, Dict[int, str]]:
+    """Fahrzeugbilder in folder: {Unterordner: {Bildnummer: Pfad}}
+
+    Je Fahrzeug ein Unterordner; die Bildnummer (1-8) steht am Ende des
+    Dateinamens, z.B. "4.png" oder "bild4.jpg".
+    """
+    variants: Dict[str, Dict[int, str]] = {}
+    for vehicle_dir in sorted(Path(folder).iterdir()):
+        if not vehicle_dir.is_dir():
+            continue
+        images: Dict[int, str] = {}
+        for path in sorted(vehicle_dir.iterdir()):
+            match = re.search(r"(\d+)$", path.stem)
+            if path.suffix.lower() in IMAGE_SUFFIXES and match and 1 <= int(match.group(1)) <= MAX_SLOTS:
+                images.setdefault(int(match.group(1)), str(path))
+        if images:
+            variants[vehicle_dir.name] = images
+    return variants
+
+
+# Uebergaenge aus determine_image: Bild -> moegliche Folgebilder (wahrscheinlichste zuerst)
+TRANSITIONS: Dict[int, Tuple[int, ...]] = {
+    8: (7, 1),          # Zuendung: Animation -> Motor aus / laeuft
+    7: (1, 8),          # Motor startet
+    1: (4, 2, 3, 8),    # Tuer, Nebel, Zuendung
+    2: (1, 3, 4),
+    3: (1, 2, 4),
+    4: (5, 1),          # Tuer-Sequenz
+    5: (6, 1),
+    6: (5, 1),
+}
+
+
+class Prefetcher:
+    """Laedt voraussichtliche Folgebilder in Ruhephasen vorab in freie Slots
+
+    Der Upload laeuft in einem eigenen Thread; die Telemetrie-Schleife fragt
+    weiter ab und sendet SHOW. Vorab geladen wird nur, wenn der Sketch SHOW
+    zwischen die Bloecke eines Uploads schieben kann (PREEMPT), sonst muesste
+    der naechste Bildwechsel auf den Upload warten.
+    """
+
+    def __init__(self, slots: SlotManager, depth: int = 2, idle_delay: float = 0.5):
+        self.slots = slots
+        self.depth = depth
+        self.idle_delay = idle_delay
+        self.current_image = None
+        self.changed_at = 0.0
+        self.requests: "queue.Queue[Optional[Tuple[Hashable, List[Hashable]]]]" = queue.Queue(maxsize=1)
+        self.worker: Optional[threading.Thread] = None
+
+    def start(self):
+        """Startet den Upload-Thread, falls er nicht laeuft"""
+        if self.worker is None or not self.worker.is_alive():
+            self.worker = threading.Thread(target=self.run, name="prefetch", daemon=True)
+            self.worker.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Beendet den Upload-Thread; ein laufender Upload wird noch abgeschlossen"""
+        if self.worker is None:
+            return
+        try:
+            self.requests.get_nowait()
+            self.requests.task_done()
+        except queue.Empty:
+            pass
+        self.requests.put(None)
+        self.worker.join(timeout)
+        self.worker = None
+
+    def run(self):
+        while True:
+            request = self.requests.get()
+            if request is None:
+                return
+            image_id, protect = request
+            try:
+                if self.slots.prefetch(image_id, protect):
+                    self.slots.log(f"Prefetch: {image_id}")
+            finally:
+                self.requests.task_done()
+
+    def wait(self):
+        """Wartet, bis der beauftragte Prefetch erledigt ist"""
+        self.requests.join()
+
+    @property
+    def busy(self) -> bool:
+        """Wartet ein Auftrag oder laeuft gerade ein Upload?"""
+        return self.requests.unfinished_tasks > 0 or bool(self.slots.uploading)
+
+    def predict(self, current: int, state) -> List[int]:
+        """Wahrscheinliche Folgebilder fuer current und den aktuellen BusState"""
+        hints: List[int] = []
+        if not state.ignition_on:
+            hints += [8, 7]
+        elif state.front_door_open:
+            hints += [5, 6] if state.rear_door_open or state.kneeling else [5]
+        elif state.speed == 0 and state.engine_running:
+            # Stillstand mit geschlossenen Tueren: Haltestelle wahrscheinlich
+            hints += [4, 5]
+
+        predicted: List[int] = []
+        for image in hints + list(TRANSITIONS.get(current, ())):
+            if image != current and image not in predicted:
+                predicted.append(image)
+        return predicted
+
+    def step(self, current: int, state, variant: Optional[Hashable] = None) -> bool:
+        """Beauftragt hoechstens ein Bild, sobald die Anzeige idle_delay lang stabil ist"""
+        now = time.monotonic()
+        if current != self.current_image:
+            self.current_image = current
+            self.changed_at = now
+            return False
+        if now - self.changed_at < self.idle_delay:
+            return False
+        if not self.slots.esp32.preemptible or self.busy:
+            return False
+
+        wanted = [self.slots.resolve(image, variant) for image in self.predict(current, state)[:self.depth]]
+        protect = [self.slots.resolve(current, variant)] + wanted
+        for image_id in wanted:
+            if self.slots.wants_prefetch(image_id):
+                self.start()
+                self.requests.put_nowait((image_id, protect))
+                return True
+        return False
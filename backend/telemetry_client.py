@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Telemetrie-Client
+=================
+
+Gemeinsamer HTTP-Client fuer die Telemetrie-Schnittstelle von "The Bus",
+genutzt von bus_display_app.py, BusDisplay_Complete.py,
+telemetry_display.py und telemetry_diagnose.py.
+
+Alle Abfragen laufen ueber eine requests.Session mit Keep-Alive-Pool: die
+TCP-Verbindung zum Spiel bleibt zwischen den 100-ms-Abfragen offen, statt
+fuer jede Abfrage neu aufgebaut zu werden. Verbindungs- und Lese-Timeout
+sind getrennt (ein nicht erreichbares Spiel faellt schnell auf), und jede
+Abfrage wird mit ihrer Laufzeit in LatencyStats erfasst.
+
+AsyncTelemetryClient ist das Gegenstueck fuer asyncio (telemetry_display.py):
+ein schlanker HTTP/1.1-Client auf asyncio-Streams ohne Zusatzpaket, der im
+selben Event-Loop wie die seriellen Verbindungen laeuft. Abfragen koennen
+gleichzeitig laufen, und ein Timeout bricht nur die Abfrage ab: die
+betroffene Verbindung wird verworfen, der Loop laeuft weiter.
+
+PollScheduler bestimmt den Abfragetakt: schnell, solange eine zeitgesteuerte
+Sequenz laeuft oder sich der Zustand aendert (die 2-s/3-s-Fenster von
+determine_image enden dann auf wenige ms genau), langsam bei abgestelltem
+Bus oder nicht erreichbarem Spiel.
+
+TelemetryHealth verfolgt den Verbindungszustand (up/degraded/down). Ist das
+Spiel aus, wird nur noch mit exponentiell wachsendem, zufaellig gestreutem
+Abstand und kurzem Timeout nachgefragt, statt alle 100 ms mit 1 s Timeout.
+"""
+
+import asyncio
+import json
+import random
+import time
+import urllib.parse
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+    REQUESTS_AVAILABLE = True
+except ImportError:
+    REQUESTS_AVAILABLE = False
+
+
+# Timeouts in Sekunden: Verbindungsaufbau, Antwort
+CONNECT_TIMEOUT = 0.5
+READ_TIMEOUT = 1.0
+POOL_SIZE = 4
+LATENCY_WINDOW = 200
+
+# Kurze Timeouts fuer Proben, solange das Spiel als nicht erreichbar gilt
+PROBE_TIMEOUT = (0.3, 0.5)
+
+# Verbindungszustand
+HEALTH_UP = "up"
+HEALTH_DEGRADED = "degraded"
+HEALTH_DOWN = "down"
+DOWN_AFTER = 3          # aufeinanderfolgende Fehler bis "down"
+BACKOFF_BASE = 0.25
+BACKOFF_MAX = 5.0
+
+# Abfrageintervalle in Sekunden
+POLL_FAST = 0.025       # Sequenz laeuft oder Zustand aendert sich
+POLL_NORMAL = 0.1
+POLL_IDLE = 1.0         # Zuendung aus und nichts passiert, oder kein Fahrzeug
+ACTIVE_HOLD = 1.0       # nach einer Aenderung so lange schnell bleiben
+IDLE_AFTER = 5.0        # so lange ohne Aenderung, bevor auf POLL_IDLE gewechselt wird
+RATE_WINDOW = 10.0
+
+# Variablen, die die Display-Steuerung je Fahrzeug abfragt
+TELEMETRY_VARS = "Buttons,AllLamps,IsPlayerControlled,BusLogic,Velocity,Gear,Speed"
+
+
+@dataclass
+class LatencyStats:
+    """Laufzeiten der Abfragen (gleitendes Fenster fuer Mittelwert und Perzentile)"""
+    requests: int = 0
+    failures: int = 0
+    last: float = 0.0
+    recent: Deque[float] = field(default_factory=lambda: deque(maxlen=LATENCY_WINDOW))
+
+    def record(self, seconds: float):
+        self.requests += 1
+        self.last = seconds
+        self.recent.append(seconds)
+
+    def record_failure(self):
+        self.requests += 1
+        self.failures += 1
+
+    @property
+    def mean(self) -> float:
+        return sum(self.recent) / len(self.recent) if self.recent else 0.0
+
+    def percentile(self, p: float) -> float:
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+    def format(self) -> str:
+        """Statistik als Logzeile"""
+        return (f"Telemetrie: {self.requests} Abfragen, {self.failures} Fehler, "
+                f"Mittel {self.mean * 1000:.1f} ms, p95 {self.percentile(95) * 1000:.1f} ms")
+
+
+class TelemetryHealth:
+    """Verbindungszustand zum Spiel mit exponentiellem Backoff"""
+
+    def __init__(self):
+        self.state = HEALTH_UP
+        self.failures = 0
+        self.outages = 0
+        self.probes = 0
+
+    @property
+    def down(self) -> bool:
+        return self.state == HEALTH_DOWN
+
+    def success(self):
+        self.state = HEALTH_UP
+        self.failures = 0
+
+    def failure(self):
+        self.failures += 1
+        if self.failures < DOWN_AFTER:
+            self.state = HEALTH_DEGRADED
+        elif self.state != HEALTH_DOWN:
+            self.state = HEALTH_DOWN
+            self.outages += 1
+
+    def retry_delay(self) -> float:
+        """Wartezeit bis zur naechsten Probe (verdoppelt sich je Fehler, mit Jitter)"""
+        delay = min(BACKOFF_BASE * 2 ** max(0, self.failures - DOWN_AFTER), BACKOFF_MAX)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def format(self) -> str:
+        """Zustand als Logzeile"""
+        return f"Verbindung: {self.state}, {self.outages} Ausfaelle, {self.probes} Proben"
+
+
+class TelemetryClient:
+    """HTTP-Client mit Keep-Alive-Pool und Laufzeitmessung"""
+
+    def __init__(self, base_url: str,
+                 timeout: Tuple[float, float] = (CONNECT_TIMEOUT, READ_TIMEOUT),
+                 pool_size: int = POOL_SIZE):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.stats = LatencyStats()
+        self.health = TelemetryHealth()
+        self.session = requests.Session()
+        # Keine automatischen Wiederholungen: die Abfrageschleife fragt ohnehin gleich wieder
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def get_json(self, path: str, params: Optional[Dict[str, str]] = None,
+                 timeout: Optional[Tuple[float, float]] = None) -> Any:
+        """GET auf base_url + path, liefert das JSON (Fehler werden weitergereicht)
+
+        Verbindungsfehler kommen als requests.RequestException, eine Antwort,
+        die kein gueltiges JSON ist, als ValueError.
+        """
+        if self.health.down:
+            self.health.probes += 1
+            timeout = timeout or PROBE_TIMEOUT
+        start = time.perf_counter()
+        try:
+            response = self.session.get(f"{self.base_url}{path}", params=params,
+                                        timeout=timeout or self.timeout)
+        except Exception:
+            self.stats.record_failure()
+            self.health.failure()
+            raise
+        self.health.success()
+        try:
+            if response.status_code != 200:
+                raise ValueError(f"HTTP {response.status_code}")
+            data = response.json()
+        except ValueError:
+            self.stats.record_failure()
+            raise
+        self.stats.record(time.perf_counter() - start)
+        return data
+
+    def get_vehicles(self) -> Any:
+        return self.get_json("/vehicles")
+
+    def get_player(self) -> Any:
+        return self.get_json("/player")
+
+    def get_vehicle(self, vehicle: str, variables: Optional[str] = TELEMETRY_VARS) -> Any:
+        params = {"vars": variables} if variables else None
+        return self.get_json(f"/vehicles/{vehicle}", params=params)
+
+    def get_current_vehicle(self) -> Optional[str]:
+        """ID des vom Spieler gefahrenen Fahrzeugs oder None"""
+        vehicles = self.get_vehicles()
+        if not vehicles:
+            return None
+        player = self.get_player()
+        if player.get("Mode") == "Vehicle":
+            return player.get("CurrentVehicle")
+        return None
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self) -> "TelemetryClient":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class TelemetryError(Exception):
+    """Abfrage fehlgeschlagen (Verbindung, Timeout oder ungueltige Antwort)"""
+
+
+class TelemetryUnavailable(TelemetryError):
+    """Spiel nicht erreichbar (Verbindungsfehler oder Timeout)"""
+
+
+Connection = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+
+class AsyncTelemetryClient:
+    """HTTP/1.1-Client auf asyncio-Streams mit Keep-Alive-Pool und Laufzeitmessung"""
+
+    def __init__(self, base_url: str,
+                 timeout: Tuple[float, float] = (CONNECT_TIMEOUT, READ_TIMEOUT),
+                 pool_size: int = POOL_SIZE):
+        self.base_url = base_url.rstrip("/")
+        parts = urllib.parse.urlsplit(self.base_url)
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.idle: List[Connection] = []
+        self.stats = LatencyStats()
+        self.health = TelemetryHealth()
+
+    async def acquire(self) -> Connection:
+        """Freie Keep-Alive-Verbindung oder eine neue"""
+        while self.idle:
+            reader, writer = self.idle.pop()
+            if not reader.at_eof() and not writer.is_closing():
+                return reader, writer
+            writer.close()
+        return await asyncio.wait_for(asyncio.open_connection(self.host, self.port),
+                                      self.timeout[0])
+
+    def release(self, connection: Connection):
+        if len(self.idle) < self.pool_size:
+            self.idle.append(connection)
+        else:
+            connection[1].close()
+
+    async def read_response(self, reader: asyncio.StreamReader) -> Tuple[int, bytes, bool]:
+        """Liest Status, Body und ob die Verbindung offen bleiben darf"""
+        status_line = await reader.readline()
+        parts = status_line.split(None, 2)
+        if len(parts) < 2 or not parts[0].startswith(b"HTTP/"):
+            raise ValueError(f"Ungueltige Antwort: {status_line[:40]!r}")
+        status = int(parts[1])
+
+        headers: Dict[str, str] = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip().lower()
+
+        keep_alive = parts[0] == b"HTTP/1.1" and headers.get("connection") != "close"
+        if headers.get("transfer-encoding") == "chunked":
+            body = bytearray()
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    break
+                body += await reader.readexactly(size)
+                await reader.readexactly(2)
+        elif "content-length" in headers:
+            body = await reader.readexactly(int(headers["content-length"]))
+        else:
+            # Ende des Bodys = Verbindungsende
+            body = await reader.read()
+            keep_alive = False
+        return status, bytes(body), keep_alive
+
+    async def fetch(self, path: str, params: Optional[Dict[str, str]]) -> Any:
+        if params:
+            path += "?" + urllib.parse.urlencode(params)
+        reader, writer = await self.acquire()
+        try:
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+                         f"Accept: application/json\r\nConnection: keep-alive\r\n\r\n".encode())
+            await writer.drain()
+            status, body, keep_alive = await self.read_response(reader)
+        except BaseException:
+            # Timeout/Abbruch mitten in der Antwort: Stream-Zustand unbekannt, verwerfen
+            writer.close()
+            raise
+        if keep_alive:
+            self.release((reader, writer))
+        else:
+            writer.close()
+        if status != 200:
+            raise ValueError(f"HTTP {status}")
+        return json.loads(body)
+
+    async def get_json(self, path: str, params: Optional[Dict[str, str]] = None,
+                       timeout: Optional[float] = None) -> Any:
+        """GET auf base_url + path mit Gesamt-Timeout, liefert das JSON"""
+        if self.health.down:
+            self.health.probes += 1
+            timeout = timeout or sum(PROBE_TIMEOUT)
+        start = time.perf_counter()
+        try:
+            data = await asyncio.wait_for(self.fetch(path, params), timeout or sum(self.timeout))
+        except (OSError, EOFError, asyncio.TimeoutError) as e:
+            self.stats.record_failure()
+            self.health.failure()
+            raise TelemetryUnavailable(f"{path}: {str(e) or type(e).__name__}") from e
+        except ValueError as e:
+            # Das Spiel hat geantwortet, nur nicht mit brauchbaren Daten
+            self.stats.record_failure()
+            self.health.success()
+            raise TelemetryError(f"{path}: {e}") from e
+        self.health.success()
+        self.stats.record(time.perf_counter() - start)
+        return data
+
+    async def get_vehicles(self) -> Any:
+        return await self.get_json("/vehicles")
+
+    async def get_player(self) -> Any:
+        return await self.get_json("/player")
+
+    async def get_vehicle(self, vehicle: str, variables: Optional[str] = TELEMETRY_VARS) -> Any:
+        params = {"vars": variables} if variables else None
+        return await self.get_json(f"/vehicles/{vehicle}", params=params)
+
+    async def get_current_vehicle(self) -> Optional[str]:
+        """ID des vom Spieler gefahrenen Fahrzeugs oder None (beide Abfragen gleichzeitig)"""
+        vehicles, player = await gather_all(self.get_vehicles(), self.get_player())
+        if vehicles and player.get("Mode") == "Vehicle":
+            return player.get("CurrentVehicle")
+        return None
+
+    async def close(self):
+        for _, writer in self.idle:
+            writer.close()
+        self.idle.clear()
+
+
+async def gather_all(*coros) -> list:
+    """Wie asyncio.gather, wartet aber auch bei Fehlern alle Abfragen ab und meldet den ersten"""
+    results = await asyncio.gather(*coros, return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return results
+
+
+@dataclass
+class PollStats:
+    """Abfragerate und Entscheidungslatenz des PollSchedulers"""
+    polls: int = 0
+    modes: Counter = field(default_factory=Counter)
+    poll_times: Deque[float] = field(default_factory=lambda: deque(maxlen=2000))
+    decisions: int = 0
+    decision_latency: Deque[float] = field(default_factory=lambda: deque(maxlen=LATENCY_WINDOW))
+
+    def rate(self, now: Optional[float] = None) -> float:
+        """Abfragen pro Sekunde im letzten RATE_WINDOW"""
+        now = time.monotonic() if now is None else now
+        recent = [t for t in self.poll_times if now - t <= RATE_WINDOW]
+        return len(recent) / RATE_WINDOW
+
+    def format(self) -> str:
+        """Statistik als Logzeile"""
+        latency = sorted(self.decision_latency)
+        mean = sum(latency) / len(latency) if latency else 0.0
+        worst = latency[-1] if latency else 0.0
+        modes = ", ".join(f"{name} {count}" for name, count in self.modes.most_common())
+        return (f"Abfragetakt: {self.polls} Abfragen ({modes}), aktuell {self.rate():.1f}/s; "
+                f"Entscheidungslatenz {mean * 1000:.0f} ms Mittel, {worst * 1000:.0f} ms max. "
+                f"({self.decisions} Bildwechsel)")
+
+
+class PollScheduler:
+    """Adaptiver Abfragetakt je nach Aktivitaet der Zustandsmaschine"""
+
+    def __init__(self):
+        self.interval = POLL_NORMAL
+        self.mode = "normal"
+        self.last_poll = 0.0
+        self.prev_poll = 0.0
+        self.last_change = 0.0
+        self.stats = PollStats()
+
+    def due(self, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        return now - self.last_poll >= self.interval
+
+    def delay(self, now: Optional[float] = None) -> float:
+        """Wartezeit bis zur naechsten Abfrage"""
+        now = time.monotonic() if now is None else now
+        return max(0.0, self.last_poll + self.interval - now)
+
+    def started(self, now: Optional[float] = None):
+        """Vermerkt den Beginn einer Abfrage"""
+        now = time.monotonic() if now is None else now
+        self.prev_poll, self.last_poll = self.last_poll, now
+        self.stats.polls += 1
+        self.stats.modes[self.mode] += 1
+        self.stats.poll_times.append(now)
+
+    def decided(self, now: Optional[float] = None):
+        """Bildwechsel: hoechstens so alt kann die ausloesende Aenderung sein"""
+        now = time.monotonic() if now is None else now
+        if self.prev_poll:
+            self.stats.decisions += 1
+            self.stats.decision_latency.append(now - self.prev_poll)
+
+    def update(self, reachable: bool, active: bool = False, changed: bool = False,
+               idle: bool = False, health: Optional[TelemetryHealth] = None,
+               now: Optional[float] = None) -> float:
+        """Setzt das Intervall nach einer Abfrage neu und liefert es
+
+        reachable=False heisst: keine Fahrzeugdaten. Ob das Spiel selbst
+        fehlt, entscheidet health.
+        """
+        now = time.monotonic() if now is None else now
+        if not reachable:
+            if health is None or health.down:
+                self.mode = "offline"
+                self.interval = health.retry_delay() if health else POLL_IDLE
+            elif health.state == HEALTH_DEGRADED:
+                self.mode, self.interval = "gestoert", POLL_NORMAL
+            else:
+                # Spiel antwortet, aber kein Fahrzeug (Menue, Zuschauermodus)
+                self.mode, self.interval = "ruhe", POLL_IDLE
+            return self.interval
+
+        if changed:
+            self.last_change = now
+        if active or now - self.last_change < ACTIVE_HOLD:
+            self.mode, self.interval = "schnell", POLL_FAST
+        elif idle and now - self.last_change >= IDLE_AFTER:
+            self.mode, self.interval = "ruhe", POLL_IDLE
+        else:
+            self.mode, self.interval = "normal", POLL_NORMAL
+        return self.interval
@@ -8,17 +8,20 @@ Nützlich um die korrekten Feldnamen für Ihr Setup herauszufinden.
 
 Verwendung:
     python telemetry_diagnose.py --telemetry 192.168.2.216:37337
+    python telemetry_diagnose.py --monitor --record frames.jsonl
 """
 
 import argparse
 import json
 import time
 import sys
-import requests
+from typing import Optional
 from requests.exceptions import RequestException
 
+from telemetry_client import TelemetryClient
 
-def get_all_telemetry(base_url: str) -> dict:
+
+def get_all_telemetry(client: TelemetryClient) -> dict:
     """Holt alle verfügbaren Telemetrie-Daten"""
     result = {
         "vehicles": None,
@@ -30,15 +33,13 @@ def get_all_telemetry(base_url: str) -> dict:
     
     # Fahrzeuge abrufen
     try:
-        response = requests.get(f"{base_url}/vehicles", timeout=2)
-        result["vehicles"] = response.json()
+        result["vehicles"] = client.get_vehicles()
     except Exception as e:
         print(f"⚠ Fehler bei /vehicles: {e}")
     
     # Spieler-Info abrufen
     try:
-        response = requests.get(f"{base_url}/player", timeout=2)
-        result["player"] = response.json()
+        result["player"] = client.get_player()
     except Exception as e:
         print(f"⚠ Fehler bei /player: {e}")
     
@@ -54,10 +55,8 @@ def get_all_telemetry(base_url: str) -> dict:
     if current_vehicle:
         # Alle verfügbaren Variablen abrufen
         try:
-            url = f"{base_url}/vehicles/{current_vehicle}"
-            params = {"vars": "Buttons,AllLamps,IsPlayerControlled,BusLogic,Velocity,Gear,Speed,Position"}
-            response = requests.get(url, params=params, timeout=2)
-            result["vehicle_data"] = response.json()
+            result["vehicle_data"] = client.get_vehicle(
+                current_vehicle, "Buttons,AllLamps,IsPlayerControlled,BusLogic,Velocity,Gear,Speed,Position")
             
             if "AllLamps" in result["vehicle_data"]:
                 result["all_lamps"] = result["vehicle_data"]["AllLamps"]
@@ -204,18 +203,28 @@ def print_telemetry(data: dict) -> None:
     print("="*70 + "\n")
 
 
-def monitor_mode(base_url: str, interval: float = 1.0) -> None:
-    """Kontinuierliche Überwachung der Telemetrie-Änderungen"""
+def monitor_mode(client: TelemetryClient, interval: float = 1.0, record: Optional[str] = None) -> None:
+    """Kontinuierliche Überwachung der Telemetrie-Änderungen
+
+    Mit record wird jeder Fahrzeug-Frame als JSON-Zeile angehängt
+    (Eingabe für: python benchmark.py parse --frames DATEI).
+    """
     print("\n🔄 LIVE-ÜBERWACHUNG (Strg+C zum Beenden)")
     print("-" * 40)
     print("Zeigt nur Änderungen an...\n")
     
     last_lamps = {}
     last_buttons = {}
+    recorded = 0
+    record_file = open(record, "a", encoding="utf-8") if record else None
     
     try:
         while True:
-            data = get_all_telemetry(base_url)
+            data = get_all_telemetry(client)
+            
+            if record_file and data.get("vehicle_data"):
+                record_file.write(json.dumps(data["vehicle_data"]) + "\n")
+                recorded += 1
             
             # Lampen-Änderungen
             current_lamps = data.get("all_lamps", {})
@@ -240,6 +249,12 @@ def monitor_mode(base_url: str, interval: float = 1.0) -> None:
             
     except KeyboardInterrupt:
         print("\n\n→ Überwachung beendet")
+        print(f"  {client.stats.format()}")
+        if record_file:
+            print(f"  {recorded} Frames in {record} aufgezeichnet")
+    finally:
+        if record_file:
+            record_file.close()
 
 
 def main():
@@ -266,17 +281,24 @@ def main():
         help="Rohe JSON-Ausgabe"
     )
     
+    parser.add_argument(
+        "--record", "-r",
+        metavar="DATEI",
+        help="Im Überwachungsmodus alle Fahrzeug-Frames als JSON-Zeilen aufzeichnen"
+    )
+    
     args = parser.parse_args()
     
     base_url = f"http://{args.telemetry}"
+    client = TelemetryClient(base_url, timeout=(2, 2))
     
     print(f"\n🔌 Verbinde mit {base_url}...")
     
     # Verbindung testen
     try:
-        requests.get(f"{base_url}/vehicles", timeout=3)
+        client.get_json("/vehicles", timeout=(3, 3))
         print("✓ Verbindung erfolgreich!")
-    except RequestException as e:
+    except (RequestException, ValueError) as e:
         print(f"✗ Verbindungsfehler: {e}")
         print("\nMögliche Ursachen:")
         print("  • Spiel läuft nicht")
@@ -286,9 +308,9 @@ def main():
         sys.exit(1)
     
     if args.monitor:
-        monitor_mode(base_url)
+        monitor_mode(client, record=args.record)
     else:
-        data = get_all_telemetry(base_url)
+        data = get_all_telemetry(client)
         
         if args.json:
             print(json.dumps(data, indent=2, default=str))
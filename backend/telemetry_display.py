@@ -9,26 +9,63 @@ steuert das ESP32-Display basierend auf dem Spielzustand.
 Verwendung:
     python telemetry_display.py --port COM3 --telemetry 192.168.2.216:37337
 
+Mehrere Displays (z.B. Fahrer + Fahrgastinfo) werden von einer
+Telemetrie-Abfrage aus gemeinsam angesteuert: --port mehrfach angeben oder
+per --displays eine JSON-Datei mit Port, Slot-Zuordnung und Bildordner je
+Display. Jedes Display hat eine eigene Verbindung und einen eigenen
+Sende-Task; ein langsames oder getrenntes Display bremst die anderen nicht.
+
+Die Telemetrie wird ebenfalls im Event-Loop abgefragt (AsyncTelemetryClient,
+/player und Fahrzeugdaten gleichzeitig). Eine Abfrage läuft als eigener Task
+mit Timeout; antwortet das Spiel langsam, tickt die Hauptschleife trotzdem
+weiter und bedient die seriellen Verbindungen. Der Abfragetakt passt sich an
+(PollScheduler): schnell während Zünd-/Tür-Sequenzen und Zustandswechseln,
+langsam bei abgestelltem Bus oder nicht erreichbarem Spiel. Ist das Spiel aus,
+wird mit wachsendem Abstand nachgefragt; das zuletzt gefahrene Fahrzeug
+bleibt gemerkt, damit nach dem Wiederverbinden keine Suche nötig ist.
+
 Autor: Bus Display Project
 """
 
 import argparse
 import asyncio
+import glob
 import json
+import os
 import time
 import sys
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
 import serial
 import serial.tools.list_ports
-import requests
-from requests.exceptions import RequestException
+from esp32_async import AsyncESP32Controller
+from telemetry_client import (AsyncTelemetryClient, PollScheduler, TelemetryError,
+                              TelemetryUnavailable, gather_all)
+from telemetry_index import TelemetryIndex
+
+try:
+    import rgb565
+    RGB565_AVAILABLE = True
+except ImportError:
+    RGB565_AVAILABLE = False
 
 # ============================================================================
 # Konfiguration
 # ============================================================================
 
+# Mögliche Lampennamen je Signal - wir probieren verschiedene Varianten
+LAMP_CONFIG = {
+    "ignition": ["LED Ignition", "LED Zuendung", "Ignition", "LED Power"],
+    "engine": ["LED Engine", "LED Motor", "Engine Running", "LED EngineRunning"],
+    "fog_front": ["LED FogLight", "LED Nebelscheinwerfer", "FogLight", "LED FogLightFront"],
+    "fog_rear": ["LED RearFogLight", "LED Nebelschlussleuchte", "RearFogLight", "LED FogLightRear"],
+    "kneeling": ["LED Kneeling", "LED Absenkung", "Kneeling", "LED BusKneeling"],
+    "door1": ["ButtonLight Door 1", "LED Door1", "Door1Open", "LED DoorFront"],
+    "door2": ["ButtonLight Door 2", "LED Door2", "Door2Open", "LED DoorRear"],
+    "door3": ["ButtonLight Door 3", "LED Door3", "Door3Open"],
+}
+
 class DisplayImage(Enum):
     """Bild-Zuordnungen für verschiedene Zustände"""
     NORMAL = 1          # Bild 1: Motor läuft (Normalzustand)
@@ -56,18 +93,130 @@ class BusState:
     connected: bool = False
 
 
+# Wartezeit zwischen Verbindungsversuchen eines getrennten Displays
+RECONNECT_DELAY = 5.0
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".gif")
+
+
+@dataclass
+class DisplayConfig:
+    """Ein angeschlossenes ESP32-Display"""
+    port: str
+    baudrate: int = 921600
+    slots: Dict[int, int] = field(default_factory=dict)  # Bild -> Slot (Standard: Bild n -> Slot n-1)
+    images: Optional[str] = None  # Ordner mit 1.png ... 8.png, wird beim Verbinden gecached
+
+
+def load_display_configs(path: str, default_baudrate: int) -> List[DisplayConfig]:
+    """Liest Display-Konfigurationen aus einer JSON-Liste"""
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f)
+    return [
+        DisplayConfig(
+            port=entry["port"],
+            baudrate=int(entry.get("baudrate", default_baudrate)),
+            slots={int(image): int(slot) for image, slot in entry.get("slots", {}).items()},
+            images=entry.get("images"),
+        )
+        for entry in entries
+    ]
+
+
+class DisplayPanel:
+    """Ein Display mit eigener Verbindung und eigenem Sende-Task
+    
+    Der Telemetrie-Loop setzt nur den Sollzustand (update); der Task des
+    Displays sendet jeweils den neuesten Stand und verbindet sich nach einer
+    Trennung selbst neu.
+    """
+    
+    def __init__(self, config: DisplayConfig):
+        self.config = config
+        self.esp32 = AsyncESP32Controller(log_callback=self.log)
+        self.target: Optional[Tuple[int, int, int]] = None  # (Bild, Gang, Geschwindigkeit)
+        self.shown_image = -1
+        self.changed = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+    
+    def log(self, message: str) -> None:
+        print(f"[{self.config.port}] {message}")
+    
+    def slot_for(self, image: int) -> int:
+        return self.config.slots.get(image, image - 1)
+    
+    def update(self, image: int, gear: int, speed: int) -> None:
+        """Neuer Sollzustand; ältere, noch nicht gesendete Stände entfallen"""
+        self.target = (image, gear, speed)
+        self.changed.set()
+    
+    async def connect(self) -> bool:
+        if not await self.esp32.connect(self.config.port, self.config.baudrate):
+            return False
+        print(f"✓ Seriell verbunden: {self.config.port} @ {self.config.baudrate} baud")
+        if self.config.images:
+            await self.cache_images()
+        self.shown_image = -1
+        if self.target:
+            self.changed.set()
+        return True
+    
+    async def cache_images(self) -> None:
+        """Cached den Bildordner des Displays (unveränderte Slots werden übersprungen)"""
+        if not RGB565_AVAILABLE:
+            self.log("⚠ Pillow nicht installiert - Bildordner wird nicht gecached")
+            return
+        loop = asyncio.get_running_loop()
+        for image in range(1, 9):
+            paths = [p for p in sorted(glob.glob(os.path.join(self.config.images, f"{image}.*")))
+                     if p.lower().endswith(IMAGE_EXTENSIONS)]
+            if not paths:
+                continue
+            data = await loop.run_in_executor(None, rgb565.convert_file, paths[0])
+            await self.esp32.cache_image(self.slot_for(image), data)
+    
+    async def run(self) -> None:
+        """Sende-Task: wendet jeweils den neuesten Sollzustand an"""
+        while True:
+            if not self.esp32.is_open:
+                if self.esp32.connected:
+                    print(f"⚠ Display getrennt: {self.config.port}")
+                    await self.esp32.disconnect()
+                if not await self.connect():
+                    await asyncio.sleep(RECONNECT_DELAY)
+                    continue
+            
+            await self.changed.wait()
+            self.changed.clear()
+            image, gear, speed = self.target
+            if image != self.shown_image:
+                if await self.esp32.show_image(self.slot_for(image), gear, speed):
+                    self.shown_image = image
+            else:
+                await self.esp32.update_overlay(gear, speed)
+    
+    async def close(self) -> None:
+        if self.task:
+            self.task.cancel()
+        if self.esp32.connected:
+            print(f"  {self.config.port}: {self.esp32.format_writer_stats()}")
+            await self.esp32.disconnect()
+
+
 class TelemetryDisplayController:
     """Hauptcontroller für die Display-Steuerung"""
     
-    def __init__(self, telemetry_host: str, telemetry_port: int, serial_port: str, baudrate: int = 921600):
+    def __init__(self, telemetry_host: str, telemetry_port: int, serial_port: Optional[str] = None,
+                 baudrate: int = 921600, displays: Optional[List[DisplayConfig]] = None):
         self.telemetry_url = f"http://{telemetry_host}:{telemetry_port}"
-        self.serial_port = serial_port
-        self.baudrate = baudrate
-        self.serial: Optional[serial.Serial] = None
+        self.client = AsyncTelemetryClient(self.telemetry_url)
+        self.scheduler = PollScheduler()
+        configs = displays or [DisplayConfig(serial_port, baudrate)]
+        self.panels = [DisplayPanel(config) for config in configs]
         
         self.bus_state = BusState()
         self.current_image = -1
         self.current_vehicle: Optional[str] = None
+        self.index = TelemetryIndex(LAMP_CONFIG)
         
         # Timing für Zustandsübergänge
         self.ignition_start_time: Optional[float] = None
@@ -86,84 +235,52 @@ class TelemetryDisplayController:
         self.showing_door_animation = False
         self.in_kneeling_sequence = False
         
-    def connect_serial(self) -> bool:
-        """Verbindung zum ESP32 herstellen"""
-        try:
-            self.serial = serial.Serial(
-                port=self.serial_port,
-                baudrate=self.baudrate,
-                timeout=1
-            )
-            time.sleep(2)  # Warten auf ESP32-Reset
-            print(f"✓ Seriell verbunden: {self.serial_port} @ {self.baudrate} baud")
-            
-            # Warten auf "ACK" vom ESP32
-            start = time.time()
-            while time.time() - start < 5:
-                if self.serial.in_waiting:
-                    line = self.serial.readline().decode('utf-8', errors='ignore').strip()
-                    print(f"  ESP32: {line}")
-                    if "ACK" in line or "Ready" in line:
-                        print("✓ ESP32 bereit!")
-                        return True
-            
-            print("⚠ ESP32 antwortet nicht, aber Verbindung besteht")
-            return True
-            
-        except Exception as e:
-            print(f"✗ Seriell-Fehler: {e}")
-            return False
+    async def connect_serial(self) -> bool:
+        """Alle Displays gleichzeitig verbinden; True, wenn mindestens eines erreichbar ist"""
+        results = await asyncio.gather(*(panel.connect() for panel in self.panels))
+        for panel, ok in zip(self.panels, results):
+            if not ok:
+                print(f"✗ Seriell-Fehler: {panel.config.port}")
+        return any(results)
     
-    def get_current_vehicle(self) -> Optional[str]:
+    async def get_current_vehicle(self) -> Optional[str]:
         """Aktuelles Fahrzeug vom Spiel abrufen"""
         try:
-            # Erst prüfen ob Fahrzeuge verfügbar sind
-            response = requests.get(f"{self.telemetry_url}/vehicles", timeout=1)
-            vehicles = response.json()
-            
-            if not vehicles or len(vehicles) == 0:
-                return None
-            
-            # Spieler-Info abrufen
-            response = requests.get(f"{self.telemetry_url}/player", timeout=1)
-            player_data = response.json()
-            
-            if player_data.get("Mode") == "Vehicle":
-                return player_data.get("CurrentVehicle")
-            
-            return None
-            
-        except RequestException:
+            return await self.client.get_current_vehicle()
+        except TelemetryError:
             return None
     
-    def get_telemetry_data(self) -> Optional[Dict[str, Any]]:
-        """Telemetrie-Daten vom Spiel abrufen"""
+    async def get_telemetry_data(self) -> Optional[Dict[str, Any]]:
+        """Telemetrie-Daten vom Spiel abrufen (/player und Fahrzeugdaten gleichzeitig)"""
         if not self.current_vehicle:
-            self.current_vehicle = self.get_current_vehicle()
+            self.current_vehicle = await self.get_current_vehicle()
             if not self.current_vehicle:
                 return None
         
         try:
-            url = f"{self.telemetry_url}/vehicles/{self.current_vehicle}"
-            params = {"vars": "Buttons,AllLamps,IsPlayerControlled,BusLogic,Velocity,Gear"}
-            response = requests.get(url, params=params, timeout=1)
-            data = response.json()
-            
-            # Prüfen ob Spieler noch im Fahrzeug ist
-            if data.get("IsPlayerControlled") == "false":
-                self.current_vehicle = None
-                return None
-            
-            return data
-            
-        except RequestException:
+            player, data = await gather_all(
+                self.client.get_player(),
+                self.client.get_vehicle(
+                    self.current_vehicle, "Buttons,AllLamps,IsPlayerControlled,BusLogic,Velocity,Gear"))
+        except TelemetryUnavailable:
+            # Spiel nicht erreichbar: Fahrzeug merken, nach dem Wiederverbinden ist keine Suche nötig
+            return None
+        except TelemetryError:
+            self.current_vehicle = None
+            return None
+        
+        # Prüfen ob Spieler noch in diesem Fahrzeug ist
+        if (player.get("Mode") != "Vehicle" or player.get("CurrentVehicle") != self.current_vehicle
+                or data.get("IsPlayerControlled") == "false"):
             self.current_vehicle = None
             return None
+        
+        return data
     
     def parse_telemetry(self, data: Dict[str, Any]) -> None:
-        """Telemetrie-Daten in BusState umwandeln"""
-        lamps = data.get("AllLamps", {})
-        buttons = data.get("Buttons", [])
+        """Telemetrie-Daten in BusState umwandeln (über den Index des Fahrzeugs)"""
+        index = self.index
+        index.prepare(data, self.current_vehicle)
         
         # Vorherige Zustände speichern
         self.prev_ignition = self.bus_state.ignition_on
@@ -172,51 +289,33 @@ class TelemetryDisplayController:
         self.prev_both_doors = self.bus_state.front_door_open and self.bus_state.rear_door_open
         
         # Lampen auswerten (Wert > 0 = AN)
-        # Mögliche Lampennamen - wir probieren verschiedene Varianten
-        ignition_lamps = ["LED Ignition", "LED Zuendung", "Ignition", "LED Power"]
-        engine_lamps = ["LED Engine", "LED Motor", "Engine Running", "LED EngineRunning"]
-        fog_lamps = ["LED FogLight", "LED Nebelscheinwerfer", "FogLight", "LED FogLightFront"]
-        rear_fog_lamps = ["LED RearFogLight", "LED Nebelschlussleuchte", "RearFogLight", "LED FogLightRear"]
-        kneeling_lamps = ["LED Kneeling", "LED Absenkung", "Kneeling", "LED BusKneeling"]
-        
-        def check_lamp(lamp_names: list) -> bool:
-            for name in lamp_names:
-                if name in lamps and float(lamps[name]) > 0:
-                    return True
-            return False
-        
         # Zündung und Motor
-        self.bus_state.ignition_on = check_lamp(ignition_lamps)
-        self.bus_state.engine_running = check_lamp(engine_lamps)
+        self.bus_state.ignition_on = index.lamp("ignition")
+        self.bus_state.engine_running = index.lamp("engine")
         
         # Wenn kein expliziter Motor-Status, schätzen wir basierend auf anderen Daten
         # Motor läuft wahrscheinlich wenn Gang nicht N ist oder Geschwindigkeit > 0
         
         # Lichter
-        self.bus_state.fog_lights_on = check_lamp(fog_lamps)
-        self.bus_state.rear_fog_on = check_lamp(rear_fog_lamps)
+        self.bus_state.fog_lights_on = index.lamp("fog_front")
+        self.bus_state.rear_fog_on = index.lamp("fog_rear")
         
         # Kneeling (Absenkung)
-        self.bus_state.kneeling = check_lamp(kneeling_lamps)
-        
-        # Türen aus Lampen oder Buttons
-        door1_lamps = ["ButtonLight Door 1", "LED Door1", "Door1Open", "LED DoorFront"]
-        door2_lamps = ["ButtonLight Door 2", "LED Door2", "Door2Open", "LED DoorRear"]
-        door3_lamps = ["ButtonLight Door 3", "LED Door3", "Door3Open"]
+        self.bus_state.kneeling = index.lamp("kneeling")
         
-        self.bus_state.front_door_open = check_lamp(door1_lamps)
-        self.bus_state.rear_door_open = check_lamp(door2_lamps) or check_lamp(door3_lamps)
+        # Türen aus Lampen
+        self.bus_state.front_door_open = index.lamp("door1")
+        self.bus_state.rear_door_open = index.lamp("door2") or index.lamp("door3")
         
         # Buttons auswerten für Gänge
-        for button in buttons:
-            if button.get("Name") == "GearSwitch":
-                state = button.get("State", "Neutral")
-                if state == "Drive":
-                    self.bus_state.gear = 1
-                elif state == "Reverse":
-                    self.bus_state.gear = -1
-                else:
-                    self.bus_state.gear = 0
+        state = index.button("GearSwitch")
+        if state is not None:
+            if state == "Drive":
+                self.bus_state.gear = 1
+            elif state == "Reverse":
+                self.bus_state.gear = -1
+            else:
+                self.bus_state.gear = 0
         
         # Geschwindigkeit (falls verfügbar)
         velocity = data.get("Velocity", {})
@@ -323,41 +422,33 @@ class TelemetryDisplayController:
         # ============================================================
         return DisplayImage.NORMAL.value  # Bild 1
     
-    def send_display_command(self, image_slot: int, gear: int = 0, speed: int = 0) -> bool:
-        """Sendet SHOW-Befehl an ESP32"""
-        if not self.serial or not self.serial.is_open:
+    def sequence_active(self) -> bool:
+        """Läuft gerade eine zeitgesteuerte Anzeige-Sequenz?"""
+        return self.showing_ignition_animation or self.showing_door_animation or self.in_kneeling_sequence
+    
+    def state_changed(self) -> bool:
+        """Hat sich seit der letzten Abfrage ein für die Bildwahl relevanter Zustand geändert?"""
+        both_doors = self.bus_state.front_door_open and self.bus_state.rear_door_open
+        return (self.bus_state.ignition_on != self.prev_ignition
+                or self.bus_state.front_door_open != self.prev_front_door
+                or self.bus_state.kneeling != self.prev_kneeling
+                or both_doors != self.prev_both_doors)
+    
+    def send_display_command(self, image: int, gear: int = 0, speed: int = 0) -> bool:
+        """Setzt Bild, Gang und Geschwindigkeit für alle Displays (Senden übernehmen deren Tasks)"""
+        if image < 1 or image > 8:
+            print(f"⚠ Ungültiges Bild: {image}")
             return False
         
-        try:
-            # SHOW:[slot]:[gear]:[speed]
-            # Slot ist 0-basiert (Bild 1 = Slot 0)
-            slot = image_slot - 1  # Umrechnung: Bild 1 → Slot 0
-            
-            if slot < 0 or slot > 7:
-                print(f"⚠ Ungültiger Slot: {slot}")
-                return False
-            
-            command = f"SHOW:{slot}:{gear}:{speed}\n"
-            self.serial.write(command.encode())
-            
-            return True
-            
-        except Exception as e:
-            print(f"✗ Sende-Fehler: {e}")
-            return False
+        for panel in self.panels:
+            panel.update(image, gear, speed)
+        return True
     
     def read_serial_response(self) -> None:
-        """Liest Antworten vom ESP32"""
-        if not self.serial:
-            return
-            
-        try:
-            while self.serial.in_waiting:
-                line = self.serial.readline().decode('utf-8', errors='ignore').strip()
-                if line:
-                    print(f"  ESP32: {line}")
-        except Exception:
-            pass
+        """Gibt Textantworten vom ESP32 aus"""
+        for panel in self.panels:
+            for line in panel.esp32.read_response():
+                print(f"  ESP32 {panel.config.port}: {line}")
     
     async def run(self) -> None:
         """Hauptschleife"""
@@ -365,29 +456,47 @@ class TelemetryDisplayController:
         print("Bus Simulator Display - Telemetry Controller")
         print("="*60)
         print(f"Telemetrie: {self.telemetry_url}")
-        print(f"Seriell: {self.serial_port} @ {self.baudrate} baud")
+        for panel in self.panels:
+            print(f"Seriell: {panel.config.port} @ {panel.config.baudrate} baud")
         print("="*60 + "\n")
         
         # Seriell verbinden
-        if not self.connect_serial():
+        if not await self.connect_serial():
             print("✗ Konnte nicht mit ESP32 verbinden!")
             return
         
+        # Je Display ein Sende-Task (nicht erreichbare verbinden sich selbst neu)
+        for panel in self.panels:
+            panel.task = asyncio.create_task(panel.run())
+        
         print("\n→ Warte auf Spielverbindung...")
         print("  (Stellen Sie sicher, dass Telemetrie im Spiel aktiviert ist)\n")
         
-        last_telemetry_time = 0
+        last_overlay_time = 0
         connection_lost_printed = False
+        health = self.client.health
+        last_health = health.state
+        poll: Optional[asyncio.Task] = None
         
         try:
             while True:
                 now = time.time()
                 
-                # Telemetrie alle 100ms abrufen
-                if now - last_telemetry_time >= 0.1:
-                    last_telemetry_time = now
-                    
-                    data = self.get_telemetry_data()
+                # Telemetrie im adaptiven Takt abfragen; die Abfrage läuft als Task neben der Schleife
+                if poll is None and self.scheduler.due():
+                    self.scheduler.started()
+                    poll = asyncio.create_task(self.get_telemetry_data())
+                
+                if poll is not None and poll.done():
+                    try:
+                        data = poll.result()
+                    except Exception as e:
+                        # Unerwartete Antwort (z.B. kein JSON-Objekt): wie "keine Daten" behandeln
+                        print(f"⚠ Telemetrie-Fehler: {type(e).__name__}: {e}")
+                        self.client.stats.record_failure()
+                        self.current_vehicle = None
+                        data = None
+                    poll = None
                     
                     if data:
                         if not self.bus_state.connected or connection_lost_printed:
@@ -398,6 +507,7 @@ class TelemetryDisplayController:
                         
                         # Bild bestimmen
                         target_image = self.determine_display_image()
+                        changed = target_image != self.current_image or self.state_changed()
                         
                         # Nur senden wenn sich das Bild ändert
                         if target_image != self.current_image:
@@ -408,20 +518,31 @@ class TelemetryDisplayController:
                                 self.bus_state.speed
                             ):
                                 self.current_image = target_image
+                                self.scheduler.decided()
                         
-                        # Telemetrie aktualisieren (Geschwindigkeit etc.) alle 500ms
-                        elif now % 0.5 < 0.1:
+                        # Gang/Geschwindigkeit aktualisieren (nur Overlay, nur bei Aenderung)
+                        elif now - last_overlay_time >= 0.5:
+                            last_overlay_time = now
                             self.send_display_command(
                                 self.current_image,
                                 self.bus_state.gear,
                                 self.bus_state.speed
                             )
+                        
+                        self.scheduler.update(True, active=self.sequence_active(), changed=changed,
+                                              idle=not self.bus_state.ignition_on)
                     
                     else:
+                        self.scheduler.update(False, health=health)
                         if self.bus_state.connected and not connection_lost_printed:
                             print("⚠ Verbindung zum Spiel verloren - warte...")
                             connection_lost_printed = True
                         self.bus_state.connected = False
+                    
+                    if health.state != last_health:
+                        if health.down:
+                            print("✗ Spiel nicht erreichbar - frage seltener nach...")
+                        last_health = health.state
                 
                 # ESP32-Antworten lesen
                 self.read_serial_response()
@@ -432,8 +553,14 @@ class TelemetryDisplayController:
         except KeyboardInterrupt:
             print("\n\n→ Beende...")
         finally:
-            if self.serial and self.serial.is_open:
-                self.serial.close()
+            if poll is not None:
+                poll.cancel()
+            for panel in self.panels:
+                await panel.close()
+            print(f"  {self.client.stats.format()}")
+            print(f"  {self.scheduler.stats.format()}")
+            print(f"  {health.format()}")
+            await self.client.close()
             print("✓ Beendet")
 
 
@@ -461,8 +588,14 @@ def main():
 Beispiele:
   python telemetry_display.py --port COM3
   python telemetry_display.py --port /dev/ttyUSB0 --telemetry 192.168.2.216:37337
+  python telemetry_display.py --port COM3 --port COM4
+  python telemetry_display.py --displays displays.json
   python telemetry_display.py --list-ports
 
+displays.json (ein Eintrag je Display, "slots" und "images" optional):
+  [{"port": "COM3"},
+   {"port": "COM4", "slots": {"4": 0, "5": 0, "6": 0}, "images": "fahrgast"}]
+
 Bild-Zuordnung:
   Bild 1: Motor läuft (Normalzustand)
   Bild 2: Nebelscheinwerfer an
@@ -477,7 +610,13 @@ Bild-Zuordnung:
     
     parser.add_argument(
         "--port", "-p",
-        help="Serieller Port (z.B. COM3 oder /dev/ttyUSB0)"
+        action="append",
+        help="Serieller Port (z.B. COM3 oder /dev/ttyUSB0), mehrfach für mehrere Displays"
+    )
+    
+    parser.add_argument(
+        "--displays", "-d",
+        help="JSON-Datei mit Port, Slot-Zuordnung und Bildordner je Display"
     )
     
     parser.add_argument(
@@ -505,7 +644,11 @@ Bild-Zuordnung:
         list_serial_ports()
         return
     
-    if not args.port:
+    displays = [DisplayConfig(port, args.baudrate) for port in args.port or []]
+    if args.displays:
+        displays += load_display_configs(args.displays, args.baudrate)
+    
+    if not displays:
         print("Fehler: Bitte geben Sie einen seriellen Port an!")
         print("Verwenden Sie --list-ports um verfügbare Ports zu sehen.")
         list_serial_ports()
@@ -520,8 +663,7 @@ Bild-Zuordnung:
     controller = TelemetryDisplayController(
         telemetry_host=telemetry_host,
         telemetry_port=telemetry_port,
-        serial_port=args.port,
-        baudrate=args.baudrate
+        displays=displays
     )
     
     asyncio.run(controller.run())
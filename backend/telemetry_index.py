@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Telemetrie-Index
+================
+
+Kompilierter Zugriff auf AllLamps, Buttons und Doors eines Fahrzeugs.
+
+Beim ersten Frame eines Fahrzeugs wird einmal aufgeloest, welche der
+moeglichen Lampennamen es tatsaechlich gibt und an welcher Position die
+benoetigten Buttons und Tueren stehen. Folgende Frames lesen nur noch diese
+Felder, statt bei jedem Signal alle Namenslisten und Button-Listen zu
+durchsuchen. Aendert sich der Aufbau (anderes Fahrzeug, andere Anzahl
+Lampen/Buttons/Tueren, Button an anderer Position), wird neu aufgeloest.
+
+Lampenwerte kommen als Strings ("0", "1", "0.5"); das Ergebnis von
+float(wert) > 0 wird je String zwischengespeichert.
+"""
+
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+LAMP_VALUE_CACHE = 256
+
+_lamp_values: Dict[Any, bool] = {}
+
+
+def lamp_on(value: Any) -> bool:
+    """Lampenwert > 0 (ungueltige Werte gelten als aus)"""
+    try:
+        return _lamp_values[value]
+    except (KeyError, TypeError):
+        pass
+    try:
+        on = float(value) > 0
+    except (TypeError, ValueError):
+        on = False
+    if len(_lamp_values) < LAMP_VALUE_CACHE:
+        try:
+            _lamp_values[value] = on
+        except TypeError:
+            pass
+    return on
+
+
+def check_lamp_scan(lamps: dict, names: Sequence[str]) -> bool:
+    """Referenz: lineare Suche ueber alle Namen (Verhalten vor dem Index)"""
+    for name in names:
+        if name in lamps:
+            try:
+                if float(lamps[name]) > 0:
+                    return True
+            except (TypeError, ValueError):
+                pass
+    return False
+
+
+class TelemetryIndex:
+    """Je Fahrzeug aufgeloeste Lampen-, Button- und Tuer-Zugriffe"""
+
+    def __init__(self, lamp_config: Dict[str, Sequence[str]],
+                 door_group: Optional[Callable[[str], Optional[str]]] = None):
+        self.lamp_config = lamp_config
+        self.door_group = door_group
+        self.vehicle: Optional[Hashable] = None
+        self.lamp_keys: Dict[str, Tuple[str, ...]] = {}
+        self.button_pos: Dict[str, int] = {}
+        self.door_pos: Dict[str, Tuple[int, ...]] = {}
+        self.shape: Optional[Tuple[int, int, int]] = None
+        self.compiles = 0
+        self.lamps: dict = {}
+        self.buttons: List[dict] = []
+        self.doors: List[dict] = []
+
+    def prepare(self, data: dict, vehicle: Optional[Hashable] = None):
+        """Uebernimmt einen Frame und loest die Indizes bei Bedarf neu auf"""
+        self.lamps = data.get("AllLamps") or {}
+        self.buttons = data.get("Buttons") or []
+        self.doors = data.get("Doors") or []
+        shape = (len(self.lamps), len(self.buttons), len(self.doors))
+        if vehicle != self.vehicle or shape != self.shape:
+            self.compile()
+            self.vehicle = vehicle
+            self.shape = shape
+
+    def compile(self):
+        self.compiles += 1
+        self.lamp_keys = {signal: tuple(name for name in names if name in self.lamps)
+                          for signal, names in self.lamp_config.items()}
+        self.button_pos = {}
+        for pos, button in enumerate(self.buttons):
+            self.button_pos.setdefault(button.get("Name"), pos)
+        groups: Dict[str, List[int]] = {}
+        if self.door_group:
+            for pos, door in enumerate(self.doors):
+                group = self.door_group(door.get("Name", ""))
+                if group:
+                    groups.setdefault(group, []).append(pos)
+        self.door_pos = {group: tuple(positions) for group, positions in groups.items()}
+
+    def lamp(self, signal: str) -> bool:
+        """Ist eine der fuer signal konfigurierten Lampen an?"""
+        lamps = self.lamps
+        for key in self.lamp_keys[signal]:
+            if lamp_on(lamps.get(key)):
+                return True
+        return False
+
+    def button(self, name: str, default: Any = None) -> Any:
+        """State des Buttons name oder default"""
+        pos = self.button_pos.get(name)
+        if pos is None:
+            return default
+        button = self.buttons[pos]
+        if button.get("Name") != name:
+            # Reihenfolge hat sich bei gleicher Anzahl geaendert
+            self.compile()
+            return self.button(name, default)
+        return button.get("State", default)
+
+    def door_open(self, group: str) -> bool:
+        """Ist eine Tuer der Gruppe offen?"""
+        doors = self.doors
+        return any(str(doors[pos].get("Open", "false")).lower() == "true"
+                   for pos in self.door_pos.get(group, ()))
@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# Die Backend-Module importieren sich gegenseitig ueber den Modulnamen
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
@@ -0,0 +1,73 @@
+import asyncio
+import struct
+
+import esp32_async
+import esp32_protocol
+from esp32_async import AsyncESP32Controller
+from esp32_controller import MAX_SLOTS
+
+HASHES = [0x2A, 0, 0x1234, 0, 0, 0, 0, 0]
+USED = 0b101
+
+
+class FakeTransport:
+    """Antwortet wie der Sketch auf den Handshake, mit kurzer Verzoegerung"""
+
+    def __init__(self):
+        self.items = asyncio.Queue()
+        self.decoder = esp32_protocol.StreamDecoder()
+        self.is_open = False
+        self.lost = 0
+
+    async def open(self, port, baudrate):
+        self.items = asyncio.Queue()
+        self.is_open = True
+        self.reply(b"Ready\n")
+
+    def reply(self, data):
+        # Der Sketch quittiert jeden Befehl zuerst mit einer Logzeile, im selben Block
+        asyncio.get_running_loop().call_later(0.003, self.feed, b">>> Received\n" + data)
+
+    def feed(self, data):
+        for item in self.decoder.feed(data):
+            self.items.put_nowait(item)
+
+    async def write(self, data):
+        data = bytes(data)
+        if data == b"CAPS\n":
+            self.reply(b"CAPS:RLE,BLOCK,BIN,HASH\n")
+        elif data == esp32_protocol.encode_hello():
+            self.reply(esp32_protocol.encode_frame(esp32_protocol.OP_HELLO | esp32_protocol.RESPONSE_FLAG,
+                                                   bytes([esp32_protocol.STATUS_OK, 1])))
+        elif data == esp32_protocol.encode_hashes():
+            payload = bytes([esp32_protocol.STATUS_OK, USED]) + struct.pack(f"<{MAX_SLOTS}I", *HASHES)
+            self.reply(esp32_protocol.encode_frame(esp32_protocol.OP_HASHES | esp32_protocol.RESPONSE_FLAG,
+                                                   payload))
+
+    async def close(self):
+        self.is_open = False
+
+
+def test_reconnect_while_responses_are_polled(monkeypatch):
+    monkeypatch.setattr(esp32_async, "SERIAL_AVAILABLE", True)
+
+    async def run():
+        controller = AsyncESP32Controller(log_callback=lambda message: None)
+        controller.transport = FakeTransport()
+        assert await controller.connect("fake")
+        await controller.disconnect()
+
+        # Hauptschleife liest weiter Antworten, waehrend das Display neu verbindet
+        polled = []
+        reconnect = asyncio.create_task(controller.connect("fake"))
+        while not reconnect.done():
+            polled += controller.read_response()
+            await asyncio.sleep(0.001)
+        return controller, reconnect.result(), polled
+
+    controller, ok, polled = asyncio.run(run())
+    assert ok
+    assert polled == []
+    assert controller.features == {"RLE", "BLOCK", "BIN", "HASH"}
+    assert controller.protocol_version == 1
+    assert controller.slot_hashes == [0x2A, None, 0x1234] + [None] * (MAX_SLOTS - 3)
@@ -0,0 +1,172 @@
+import struct
+import zlib
+
+import esp32_controller
+import esp32_protocol
+import rgb565_codec
+from esp32_controller import (BLOCK_SIZE, MAX_BLOCK_RETRIES, MAX_SLOTS, BlockWindow, CommandQueue,
+                              ESP32Controller, WriterStats, cache_command, choose_encoding,
+                              parse_caps, parse_slot_hashes, parse_window)
+
+
+class ScriptedPort:
+    """Liefert vorgegebene Datenbloecke und schliesst sich danach"""
+
+    def __init__(self, *chunks):
+        self.chunks = list(chunks)
+
+    @property
+    def is_open(self):
+        return bool(self.chunks)
+
+    @property
+    def in_waiting(self):
+        return len(self.chunks[0]) if self.chunks else 0
+
+    def read(self, size):
+        return self.chunks.pop(0)
+
+
+def response(opcode, status=esp32_protocol.STATUS_OK):
+    return esp32_protocol.encode_frame(opcode | esp32_protocol.RESPONSE_FLAG, bytes([status]))
+
+
+def queued(controller):
+    items = []
+    while not controller.lines.empty():
+        items.append(controller.lines.get_nowait())
+    return items
+
+
+def test_read_loop_counts_show_and_overlay_acks():
+    controller = ESP32Controller(log_callback=lambda message: None)
+    controller.connected = True
+    port = ScriptedPort(
+        b">>> Displaying cached image from slot 1\nSHOW_OK\nOVERLAY_OK\n",
+        response(esp32_protocol.OP_SHOW) + response(esp32_protocol.OP_OVERLAY),
+        b"ERROR: No image displayed\n" + response(esp32_protocol.OP_SHOW, esp32_protocol.STATUS_EMPTY_SLOT),
+        b"CACHED_OK\n" + response(esp32_protocol.OP_STATUS),
+    )
+
+    controller.read_loop(port)
+
+    items = queued(controller)
+    assert items[0] == "ERROR: No image displayed"
+    assert items[1].command == esp32_protocol.OP_SHOW
+    assert items[1].status == esp32_protocol.STATUS_EMPTY_SLOT
+    assert items[2] == "CACHED_OK"
+    assert items[3].command == esp32_protocol.OP_STATUS
+    assert len(items) == 4
+    assert controller.writer_stats.acks == 5
+
+
+def test_reply_queue_is_bounded(monkeypatch):
+    monkeypatch.setattr(esp32_controller, "REPLY_QUEUE_SIZE", 4)
+    controller = ESP32Controller(log_callback=lambda message: None)
+    controller.connected = True
+    port = ScriptedPort(b"".join(f"Zeile {i}\n".encode() for i in range(10)))
+
+    controller.read_loop(port)
+
+    assert queued(controller) == ["Zeile 6", "Zeile 7", "Zeile 8", "Zeile 9"]
+    assert controller.writer_stats.lost_replies == 6
+
+
+def sequence(block: bytes) -> int:
+    return struct.unpack_from('<H', block, 1)[0]
+
+
+def test_block_window_respects_window_and_acks():
+    progress = []
+    payload = bytes(range(256)) * (BLOCK_SIZE * 3 // 256) + b"tail"
+    blocks = BlockWindow(payload, 2, progress.append)
+
+    sent = []
+    while blocks.can_send:
+        sent.append(blocks.next_block())
+    assert [sequence(b) for b in sent] == [0, 1]
+
+    first = sent[0]
+    assert first[:5] == struct.pack('<BHH', esp32_controller.BLOCK_MAGIC, 0, BLOCK_SIZE)
+    assert first[5:-4] == payload[:BLOCK_SIZE]
+    assert first[-4:] == struct.pack('<I', zlib.crc32(payload[:BLOCK_SIZE]))
+
+    assert blocks.reply("BOK:1")
+    assert blocks.reply("BOK:1")   # doppelte Bestaetigung zaehlt nicht
+    assert [sequence(blocks.next_block())] == [2]
+    assert not blocks.can_send
+    for seq in (0, 2, 3):
+        if blocks.can_send:
+            blocks.next_block()
+        assert blocks.reply(f"BOK:{seq}")
+    assert blocks.finished
+    assert progress == [25, 50, 75, 100]
+
+
+def test_block_window_retries_errors_and_timeouts():
+    blocks = BlockWindow(bytes(BLOCK_SIZE * 2), 2)
+    blocks.next_block()
+    blocks.next_block()
+
+    assert blocks.reply("BERR:1")
+    assert [sequence(blocks.next_block())] == [1]
+    assert blocks.timeout()
+    assert [sequence(blocks.next_block()), sequence(blocks.next_block())] == [0, 1]
+    assert blocks.resent == 3
+    assert blocks.reply("BOK:9")   # unbekannte Sequenz wird ignoriert
+
+
+def test_block_window_gives_up():
+    blocks = BlockWindow(bytes(10), 1)
+    for _ in range(MAX_BLOCK_RETRIES):
+        blocks.next_block()
+        assert blocks.reply("BERR:0")
+    blocks.next_block()
+    assert not blocks.timeout()
+    assert "Wiederholungen" in blocks.error
+
+    blocks = BlockWindow(bytes(10), 1)
+    blocks.next_block()
+    assert not blocks.reply("ERROR: checksum")
+    assert "checksum" in blocks.error
+
+
+def test_command_queue_supersedes():
+    stats = WriterStats()
+    pending = CommandQueue(stats)
+    pending.put("overlay", b"o1")
+    pending.put("overlay", b"o2")
+    assert (len(pending), stats.dropped) == (1, 1)
+
+    # SHOW macht ein wartendes OVERLAY hinfaellig, OVERLAY danach bleibt
+    pending.put("show", b"s1")
+    pending.put("overlay", b"o3")
+    assert pending.take() == [b"s1", b"o3"]
+    assert (stats.dropped, stats.max_depth) == (2, 2)
+    assert pending.pop() is None
+
+
+def test_choose_encoding():
+    flat = bytes(1000)
+    assert choose_encoding(flat, {"RLE"}) == (rgb565_codec.ENCODING_RLE, rgb565_codec.encode_rle(flat))
+    assert choose_encoding(flat, {"RLE"}, compression=False) == (rgb565_codec.ENCODING_RAW, flat)
+    assert choose_encoding(flat, set()) == (rgb565_codec.ENCODING_RAW, flat)
+    noisy = bytes(range(256)) * 4
+    assert choose_encoding(noisy, {"RLE"}) == (rgb565_codec.ENCODING_RAW, noisy)
+
+
+def test_cache_command():
+    assert cache_command(2, rgb565_codec.ENCODING_RAW, 307200, 0, False) == "CACHE:2:307200"
+    assert cache_command(2, rgb565_codec.ENCODING_RLE, 1234, 0, True) == "CACHE:2:1234:RLE:BLK"
+    assert cache_command(2, rgb565_codec.ENCODING_RLE, 1234, 1, True) == \
+        esp32_protocol.encode_cache(2, 1234, True, True)
+
+
+def test_reply_parsing():
+    assert parse_caps("CAPS:RLE,BLOCK,") == {"RLE", "BLOCK"}
+    assert parse_caps("Unknown command: CAPS") == set()
+    assert parse_caps(None) == set()
+    assert parse_window("WINDOW:4") == 4
+    assert parse_window("WINDOW:0") == 1
+    assert parse_window("ERROR: busy") is None
+    assert parse_slot_hashes("HASHES:0000002a,-") == [42] + [None] * (MAX_SLOTS - 1)
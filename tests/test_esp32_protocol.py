@@ -0,0 +1,107 @@
+import struct
+
+import pytest
+
+import esp32_protocol as protocol
+from esp32_protocol import Frame, StreamDecoder
+
+
+def decode_one(data: bytes) -> Frame:
+    items = StreamDecoder().feed(data)
+    assert len(items) == 1
+    return items[0]
+
+
+def response(opcode: int, payload: bytes) -> bytes:
+    return protocol.encode_frame(opcode | protocol.RESPONSE_FLAG, payload)
+
+
+def test_frame_layout():
+    frame = protocol.encode_frame(protocol.OP_STATUS, b"\x01\x02")
+    assert frame == bytes([protocol.FRAME_MAGIC, protocol.OP_STATUS, 2, 1, 2, protocol.OP_STATUS ^ 2 ^ 1 ^ 2])
+
+
+def test_frame_rejects_long_payload():
+    with pytest.raises(ValueError):
+        protocol.encode_frame(protocol.OP_STATUS, bytes(protocol.MAX_PAYLOAD + 1))
+
+
+@pytest.mark.parametrize("frame,opcode,payload", [
+    (protocol.encode_hello(), protocol.OP_HELLO, bytes([protocol.PROTOCOL_VERSION])),
+    (protocol.encode_show(3, -1, 87), protocol.OP_SHOW, struct.pack('<BbH', 3, -1, 87)),
+    (protocol.encode_show(0, 200, 70000), protocol.OP_SHOW, struct.pack('<BbH', 0, 127, 0xFFFF)),
+    (protocol.encode_overlay(4, 55), protocol.OP_OVERLAY, struct.pack('<bH', 4, 55)),
+    (protocol.encode_status(), protocol.OP_STATUS, b""),
+    (protocol.encode_clear(), protocol.OP_CLEAR, b""),
+    (protocol.encode_hashes(), protocol.OP_HASHES, b""),
+    (protocol.encode_cache(2, 1234, rle=True, blocks=True), protocol.OP_CACHE,
+     struct.pack('<BBI', 2, protocol.CACHE_FLAG_RLE | protocol.CACHE_FLAG_BLOCKS, 1234)),
+    (protocol.encode_patch(1, 0, 12, 999, blocks=True), protocol.OP_PATCH,
+     struct.pack('<BBBBI', 1, 0, 12, protocol.CACHE_FLAG_BLOCKS, 999)),
+    (protocol.encode_cache_set([(0, 10, True), (5, 20, False)]), protocol.OP_CACHE_SET,
+     struct.pack('<BB', 0, 2) + struct.pack('<BBI', 0, protocol.CACHE_FLAG_RLE, 10) + struct.pack('<BBI', 5, 0, 20)),
+], ids=["hello", "show", "show-begrenzt", "overlay", "status", "clear", "hashes", "cache", "patch", "cache-set"])
+def test_encoder_round_trip(frame, opcode, payload):
+    decoded = decode_one(frame)
+    assert decoded == Frame(opcode, payload)
+    assert not decoded.is_response
+
+
+def test_response_fields():
+    frame = decode_one(response(protocol.OP_SHOW, bytes([protocol.STATUS_EMPTY_SLOT])))
+    assert frame.is_response
+    assert frame.command == protocol.OP_SHOW
+    assert frame.status == protocol.STATUS_EMPTY_SLOT
+    assert Frame(protocol.OP_SHOW | protocol.RESPONSE_FLAG, b"").status == protocol.STATUS_BAD_FRAME
+
+
+def test_decode_replies():
+    assert protocol.decode_hello(decode_one(response(protocol.OP_HELLO, bytes([0, 3])))) == 3
+    assert protocol.decode_hello(Frame(protocol.OP_HELLO | protocol.RESPONSE_FLAG, b"\x00")) == 0
+
+    status = decode_one(response(protocol.OP_STATUS, struct.pack('<BBbI', 0, 0b10000101, -1, 4096)))
+    assert protocol.decode_status(status) == {"used_slots": [0, 2, 7], "current_slot": -1, "psram_free": 4096}
+
+    hashes = decode_one(response(protocol.OP_HASHES, struct.pack('<BB3I', 0, 0b101, 11, 22, 33)))
+    assert protocol.decode_hashes(hashes) == [11, None, 33]
+
+
+def test_stream_mixes_text_and_frames():
+    show = protocol.encode_show(1)
+    data = b"ACK\r\nWINDOW:3\n" + show + b"CACHED_OK\n" + show
+    assert StreamDecoder().feed(data) == ["ACK", "WINDOW:3", decode_one(show), "CACHED_OK", decode_one(show)]
+
+
+def test_stream_byte_by_byte():
+    data = b"Ready\n" + protocol.encode_overlay(2, 30) + b"BOK:0\n"
+    decoder = StreamDecoder()
+    items = []
+    for byte in data:
+        items.extend(decoder.feed(bytes([byte])))
+    assert items == ["Ready", Frame(protocol.OP_OVERLAY, struct.pack('<bH', 2, 30)), "BOK:0"]
+    assert decoder.buffer == bytearray()
+
+
+def test_stream_closes_text_before_frame():
+    assert StreamDecoder().feed(b"Progress 50%" + protocol.encode_status()) == [
+        "Progress 50%", Frame(protocol.OP_STATUS, b"")]
+
+
+def test_stream_resynchronises_after_bad_checksum():
+    bad = bytearray(protocol.encode_show(1))
+    bad[-1] ^= 0xFF
+    items = StreamDecoder().feed(bytes(bad) + b"\nSHOW_OK\n" + protocol.encode_clear())
+    assert items[-2:] == ["SHOW_OK", Frame(protocol.OP_CLEAR, b"")]
+    assert all(not isinstance(item, Frame) or item.opcode != protocol.OP_SHOW for item in items)
+
+
+def test_stream_drops_magic_with_oversized_length():
+    data = bytes([protocol.FRAME_MAGIC, protocol.OP_STATUS, protocol.MAX_PAYLOAD + 1]) + b"\nACK\n"
+    assert StreamDecoder().feed(data)[-1] == "ACK"
+
+
+def test_stream_waits_for_incomplete_frame():
+    frame = protocol.encode_cache(0, 100)
+    decoder = StreamDecoder()
+    assert decoder.feed(frame[:4]) == []
+    assert decoder.feed(frame[4:]) == [decode_one(frame)]
@@ -0,0 +1,84 @@
+import random
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+import rgb565
+
+TEST_IMAGES = sorted((Path(__file__).resolve().parent.parent / "backend" / "test_images").glob("*.png"))
+
+
+def convert_reference(image_path, width=rgb565.SCREEN_WIDTH, height=rgb565.SCREEN_HEIGHT) -> bytes:
+    """Konvertierung wie im Server vor rgb565.py (volle Dekodierung, Pixel-Schleife)"""
+    img = Image.open(image_path)
+    img = img.convert('RGB')
+    img = img.resize((width, height), Image.Resampling.LANCZOS)
+    data = bytearray()
+    pixels = img.load()
+    for y in range(height):
+        for x in range(width):
+            r, g, b = pixels[x, y]
+            value = rgb565.rgb888_to_rgb565(r, g, b)
+            data.append(value & 0xFF)
+            data.append((value >> 8) & 0xFF)
+    return bytes(data)
+
+
+def random_image(width, height, seed=0) -> Image.Image:
+    rng = random.Random(seed)
+    return Image.frombytes('RGB', (width, height), bytes(rng.getrandbits(8) for _ in range(width * height * 3)))
+
+
+def test_rgb888_to_rgb565_extremes():
+    assert rgb565.rgb888_to_rgb565(0, 0, 0) == 0x0000
+    assert rgb565.rgb888_to_rgb565(255, 255, 255) == 0xFFFF
+    assert rgb565.rgb888_to_rgb565(255, 0, 0) == 0xF800
+    assert rgb565.rgb888_to_rgb565(0, 255, 0) == 0x07E0
+    assert rgb565.rgb888_to_rgb565(0, 0, 255) == 0x001F
+
+
+@pytest.mark.skipif(not rgb565.NUMPY_AVAILABLE, reason="NumPy nicht installiert")
+@pytest.mark.parametrize("size", [(1, 1), (7, 3), (64, 48), (rgb565.SCREEN_WIDTH, rgb565.SCREEN_HEIGHT)])
+def test_pack_numpy_matches_python(size):
+    img = random_image(*size, seed=size[0])
+    assert rgb565.pack_rgb565_numpy(img) == rgb565.pack_rgb565_python(img)
+
+
+def test_pack_rgb565_converts_mode():
+    img = random_image(16, 16).convert('RGBA')
+    assert rgb565.pack_rgb565(img) == rgb565.pack_rgb565_python(img.convert('RGB'))
+
+
+def test_prepare_image_matches_full_decode_near_target_size():
+    # Unterhalb der REDUCING_GAP-fachen Zielgroesse wird nicht vorverkleinert
+    img = random_image(600, 400, seed=1)
+    assert rgb565.prepare_image(img).tobytes() == rgb565.prepare_image_full(img).tobytes()
+
+
+def test_prepare_image_size_and_mode():
+    img = random_image(2000, 1500, seed=2).convert('RGBA')
+    frame = rgb565.prepare_image(img)
+    assert frame.size == (rgb565.SCREEN_WIDTH, rgb565.SCREEN_HEIGHT)
+    assert frame.mode == 'RGB'
+
+
+@pytest.mark.skipif(not TEST_IMAGES, reason="keine Testbilder")
+@pytest.mark.parametrize("path", TEST_IMAGES, ids=lambda p: p.name)
+def test_convert_file_byte_identical_to_reference(path):
+    assert rgb565.convert_file(str(path)) == convert_reference(str(path))
+
+
+def test_convert_file_to_path(tmp_path):
+    source = tmp_path / "bild.png"
+    random_image(100, 80, seed=3).save(source)
+    target = tmp_path / "bild.rgb565"
+    assert rgb565.convert_file_to_path(str(source), str(target)) == (rgb565.SCREEN_WIDTH, rgb565.SCREEN_HEIGHT)
+    assert target.read_bytes() == convert_reference(str(source))
+
+
+def test_open_image_rejects_too_many_pixels(tmp_path):
+    source = tmp_path / "gross.png"
+    random_image(100, 100).save(source)
+    with pytest.raises(Image.DecompressionBombError):
+        rgb565.open_image(str(source), max_pixels=100 * 100 - 1)
@@ -0,0 +1,142 @@
+import random
+import struct
+
+import pytest
+
+import rgb565_codec as codec
+
+FRAME_BYTES = codec.FRAME_WIDTH * codec.FRAME_HEIGHT * 2
+
+
+def pixels(*values) -> bytes:
+    return struct.pack(f'<{len(values)}H', *values)
+
+
+def random_frame(seed=0, colors=None) -> bytes:
+    rng = random.Random(seed)
+    if colors is None:
+        return bytes(rng.getrandbits(8) for _ in range(FRAME_BYTES))
+    palette = [rng.getrandbits(16) for _ in range(colors)]
+    out = bytearray()
+    while len(out) < FRAME_BYTES:
+        out += struct.pack('<H', rng.choice(palette)) * rng.randint(1, 300)
+    return bytes(out[:FRAME_BYTES])
+
+
+@pytest.mark.parametrize("data", [
+    b"",
+    pixels(0x1234),
+    pixels(1, 2, 3, 4),
+    pixels(7, 7),
+    pixels(*([0xFFFF] * 129)),
+    pixels(*range(300)),
+    pixels(1, 1, 2, 3, 3, 3, 4),
+], ids=["leer", "ein-pixel", "literal", "paar", "lauf-ueber-paketgrenze", "literal-ueber-paketgrenze", "gemischt"])
+def test_rle_round_trip(data):
+    encoded = codec.encode_rle(data)
+    assert codec.decode_rle(encoded, len(data)) == data
+    assert len(encoded) <= codec.max_encoded_size(len(data))
+
+
+def test_rle_packet_layout():
+    assert codec.encode_rle(pixels(5, 5, 5)) == bytes([0x80 | 2]) + pixels(5)
+    assert codec.encode_rle(pixels(1, 2)) == bytes([1]) + pixels(1, 2)
+    # 130 gleiche Pixel: ein volles Wiederholungspaket (128) und ein Rest (2)
+    assert codec.encode_rle(pixels(*([9] * 130))) == bytes([0xFF]) + pixels(9) + bytes([0x81]) + pixels(9)
+
+
+@pytest.mark.parametrize("seed,colors", [(0, None), (1, 4), (2, 64)])
+def test_rle_frame_round_trip(seed, colors):
+    frame = random_frame(seed, colors)
+    encoded = codec.encode_rle(frame)
+    assert codec.decode_rle(encoded, FRAME_BYTES) == frame
+    assert len(encoded) <= codec.max_encoded_size(FRAME_BYTES)
+
+
+@pytest.mark.skipif(not codec.NUMPY_AVAILABLE, reason="NumPy nicht installiert")
+@pytest.mark.parametrize("seed,colors", [(3, None), (4, 8)])
+def test_rle_numpy_matches_python(seed, colors):
+    frame = random_frame(seed, colors)
+    assert codec.encode_rle(frame) == codec.encode_rle_python(frame)
+
+
+def test_rle_compresses_flat_frame():
+    frame = pixels(0x07E0) * (codec.FRAME_WIDTH * codec.FRAME_HEIGHT)
+    # 3 Bytes je 128 Pixel
+    assert len(codec.encode_rle(frame)) == 3 * codec.FRAME_WIDTH * codec.FRAME_HEIGHT // codec.MAX_PACKET_PIXELS
+
+
+def test_encode_rejects_odd_length():
+    with pytest.raises(ValueError):
+        codec.encode_rle(b"\x00\x00\x00")
+
+
+@pytest.mark.parametrize("payload", [bytes([0x80, 0x01]), bytes([0x01]) + pixels(1)],
+                         ids=["wiederholung", "literal"])
+def test_decode_rejects_truncated(payload):
+    with pytest.raises(ValueError):
+        codec.decode_rle(payload)
+
+
+def test_decode_checks_expected_size():
+    encoded = codec.encode_rle(pixels(1, 1, 1, 1))
+    with pytest.raises(ValueError):
+        codec.decode_rle(encoded, 6)
+    with pytest.raises(ValueError):
+        codec.decode_rle(encoded, 10)
+
+
+def paint_tile(frame: bytes, tx: int, ty: int, value: int) -> bytes:
+    out = bytearray(frame)
+    row_bytes = codec.FRAME_WIDTH * 2
+    for row in range(ty * codec.TILE_SIZE, (ty + 1) * codec.TILE_SIZE):
+        start = row * row_bytes + tx * codec.TILE_SIZE * 2
+        out[start:start + codec.TILE_SIZE * 2] = pixels(value) * codec.TILE_SIZE
+    return bytes(out)
+
+
+def test_dirty_tiles_finds_changed_tiles():
+    reference = random_frame(5)
+    image = paint_tile(paint_tile(reference, 0, 0, 0x1111), codec.TILES_X - 1, codec.TILES_Y - 1, 0x2222)
+    # Ein einzelnes Pixel mitten in einer Kachel reicht
+    single = bytearray(image)
+    offset = (5 * codec.TILE_SIZE + 7) * codec.FRAME_WIDTH * 2 + (3 * codec.TILE_SIZE + 9) * 2
+    single[offset] ^= 0xFF
+    image = bytes(single)
+
+    expected = [(0, 0), (3, 5), (codec.TILES_X - 1, codec.TILES_Y - 1)]
+    assert codec.dirty_tiles(reference, image) == expected
+    assert codec.dirty_tiles_python(reference, image) == expected
+    assert codec.dirty_tiles(reference, reference) == []
+
+
+def test_dirty_tiles_rejects_different_sizes():
+    with pytest.raises(ValueError):
+        codec.dirty_tiles(bytes(FRAME_BYTES), bytes(FRAME_BYTES - 2))
+
+
+def test_patch_round_trip():
+    reference = random_frame(6, colors=16)
+    image = reference
+    for tx, ty in [(1, 2), (4, 4), (14, 9)]:
+        image = paint_tile(image, tx, ty, tx * 100 + ty)
+
+    tiles = codec.dirty_tiles(reference, image)
+    patch = codec.build_patch(image, tiles)
+
+    assert len(patch) == len(tiles) * codec.TILE_RECORD_SIZE
+    assert codec.apply_patch(reference, patch) == image
+
+
+def test_patch_of_all_tiles_rebuilds_frame():
+    image = random_frame(7)
+    tiles = [(tx, ty) for ty in range(codec.TILES_Y) for tx in range(codec.TILES_X)]
+    assert codec.apply_patch(bytes(FRAME_BYTES), codec.build_patch(image, tiles)) == image
+
+
+def test_apply_patch_rejects_bad_records():
+    with pytest.raises(ValueError):
+        codec.apply_patch(bytes(FRAME_BYTES), b"\x00" * (codec.TILE_RECORD_SIZE - 1))
+    bad_tile = bytes([codec.TILES_X, 0]) + bytes(codec.TILE_RECORD_SIZE - 2)
+    with pytest.raises(ValueError):
+        codec.apply_patch(bytes(FRAME_BYTES), bad_tile)
@@ -0,0 +1,259 @@
+import asyncio
+import io
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+import server
+
+
+class FakeCollection:
+    """Just enough of a motor collection for the upload paths"""
+
+    def __init__(self, unique=None):
+        self.docs = []
+        self.unique = unique
+        self.reject_names = set()   # insert_many reports these as write errors
+        self.crash_after = None     # insert_many fails hard after this many documents
+
+    def _matches(self, doc, query):
+        return all(doc.get(key) in value["$in"] if isinstance(value, dict) else doc.get(key) == value
+                   for key, value in query.items())
+
+    async def insert_many(self, docs, ordered=True):
+        errors = []
+        for index, doc in enumerate(docs):
+            if index == self.crash_after:
+                raise ConnectionError("connection lost")
+            if doc.get("name") in self.reject_names:
+                errors.append({"index": index, "code": 11000, "errmsg": "duplicate key"})
+                if ordered:
+                    break
+                continue
+            self.docs.append(dict(doc))
+        if errors:
+            raise BulkWriteError({"writeErrors": errors})
+
+    async def count_documents(self, query):
+        return sum(1 for doc in self.docs if self._matches(doc, query))
+
+    async def insert_one(self, doc):
+        if self.unique and any(d.get(self.unique) == doc.get(self.unique) for d in self.docs):
+            raise DuplicateKeyError(f"duplicate {self.unique}")
+        self.docs.append(dict(doc))
+
+    async def find_one(self, query, projection=None):
+        for doc in self.docs:
+            if self._matches(doc, query):
+                return dict(doc)
+        return None
+
+    async def create_index(self, key, unique=False):
+        pass
+
+    async def delete_many(self, query):
+        self.docs = [doc for doc in self.docs if not self._matches(doc, query)]
+
+    async def delete_one(self, query):
+        for doc in self.docs:
+            if self._matches(doc, query):
+                self.docs.remove(doc)
+                return
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.display_images = FakeCollection()
+        self.image_conversions = FakeCollection(unique="content_hash")
+
+
+@pytest.fixture
+def fake_server(tmp_path, monkeypatch):
+    conversions = []
+
+    async def convert_in_pool(original_path, rgb565_path, on_start=None):
+        conversions.append(original_path)
+        if on_start:
+            await on_start()
+        await asyncio.sleep(0.05)
+        rgb565_path.write_bytes(b"\x00\x00")
+        return server.rgb565.SCREEN_WIDTH, server.rgb565.SCREEN_HEIGHT
+
+    (tmp_path / "uploads").mkdir()
+    (tmp_path / "rgb565").mkdir()
+    monkeypatch.setattr(server, "db", FakeDatabase())
+    monkeypatch.setattr(server, "UPLOAD_DIR", tmp_path / "uploads")
+    monkeypatch.setattr(server, "RGB565_DIR", tmp_path / "rgb565")
+    monkeypatch.setattr(server, "convert_in_pool", convert_in_pool)
+    monkeypatch.setattr(server, "CONVERSION_WAIT_POLL", 0.01)
+    return conversions
+
+
+def png_bytes(color=(255, 0, 0)) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def queued_job(image_id, name, tmp_name, content, content_hash):
+    original_path = server.UPLOAD_DIR / tmp_name
+    original_path.write_bytes(content)
+    image_doc, _ = server.build_image_doc(image_id, name, original_path,
+                                          server.RGB565_DIR / f"{image_id}.rgb565",
+                                          server.rgb565.SCREEN_WIDTH, server.rgb565.SCREEN_HEIGHT,
+                                          content_hash)
+    return server.jobs.create(image_id, name), image_doc
+
+
+def test_concurrent_identical_uploads_convert_once(fake_server):
+    content = png_bytes()
+
+    async def run():
+        first = queued_job("a", "a.png", "a_a.png", content, "hash")
+        second = queued_job("b", "b.png", "b_b.png", content, "hash")
+        await asyncio.gather(server.run_conversion_job(*first), server.run_conversion_job(*second))
+        return first[0], second[0]
+
+    first_job, second_job = asyncio.run(run())
+
+    assert len(fake_server) == 1
+    assert first_job.status == second_job.status == "done"
+    docs = {doc["id"]: doc for doc in server.db.display_images.docs}
+    assert docs["a"]["rgb565_path"] == docs["b"]["rgb565_path"]
+    assert server.db.image_conversions.docs == []
+    assert not (server.UPLOAD_DIR / "b_b.png").exists()
+
+
+def test_waiting_upload_converts_when_first_conversion_fails(fake_server, monkeypatch):
+    convert_ok = server.convert_in_pool
+    calls = []
+
+    async def fail_first(original_path, rgb565_path, on_start=None):
+        calls.append(original_path)
+        if len(calls) == 1:
+            await asyncio.sleep(0.05)
+            raise ValueError("broken image")
+        return await convert_ok(original_path, rgb565_path, on_start)
+
+    monkeypatch.setattr(server, "convert_in_pool", fail_first)
+    content = png_bytes()
+
+    async def run():
+        first = queued_job("a", "a.png", "a_a.png", content, "hash")
+        second = queued_job("b", "b.png", "b_b.png", content, "hash")
+        await asyncio.gather(server.run_conversion_job(*first), server.run_conversion_job(*second))
+        return first[0], second[0]
+
+    first_job, second_job = asyncio.run(run())
+
+    assert (first_job.status, second_job.status) == ("failed", "done")
+    assert [doc["id"] for doc in server.db.display_images.docs] == ["b"]
+
+
+def test_upload_returns_image_and_job(fake_server):
+    with TestClient(server.app) as client:
+        response = client.post("/api/images/upload", files={"file": ("bild.png", png_bytes(), "image/png")})
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["image"]["name"] == "bild.png"
+        assert body["image"]["width"] == server.rgb565.SCREEN_WIDTH
+        assert body["job"]["image_id"] == body["image"]["id"]
+
+        for _ in range(100):
+            if client.get(f"/api/jobs/{body['job']['id']}").json()["status"] == "done":
+                break
+            time.sleep(0.01)
+        duplicate = client.post("/api/images/upload", files={"file": ("kopie.png", png_bytes(), "image/png")})
+        body_duplicate = duplicate.json()
+        assert body_duplicate["duplicate_of"] == body["image"]["id"]
+        assert body_duplicate["image"]["rgb565_path"] == body["image"]["rgb565_path"]
+
+
+def test_upload_rejects_non_image(fake_server):
+    client = TestClient(server.app)
+
+    response = client.post("/api/images/upload", files={"file": ("bild.png", b"not an image", "image/png")})
+
+    assert response.status_code == 400
+    assert list(server.UPLOAD_DIR.iterdir()) == []
+
+
+def limited_client(limit):
+    async def handler(scope, receive, send):
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        response = server.JSONResponse({"received": len(body)})
+        await response(scope, receive, send)
+
+    return TestClient(server.UploadLimitMiddleware(handler, {"/upload": limit}))
+
+
+def test_upload_limit_checks_content_length():
+    client = limited_client(10)
+
+    assert client.post("/upload", content=b"x" * 10).json() == {"received": 10}
+    assert client.post("/upload", content=b"x" * 11).status_code == 413
+    assert client.post("/other", content=b"x" * 11).json() == {"received": 11}
+
+
+def test_upload_limit_counts_chunked_body():
+    client = limited_client(10)
+
+    def chunks():
+        yield b"x" * 6
+        yield b"x" * 6
+
+    with pytest.raises(server.HTTPException) as error:
+        client.post("/upload", content=chunks())
+    assert error.value.status_code == 413
+
+
+def test_upload_endpoint_rejects_oversized_file(fake_server, monkeypatch):
+    monkeypatch.setattr(server, "MAX_UPLOAD_BYTES", 16)
+    client = TestClient(server.app)
+
+    response = client.post("/api/images/upload",
+                           files={"file": ("bild.png", b"\x89PNG\r\n\x1a\n" + b"\x00" * 200_000, "image/png")})
+
+    assert response.status_code == 413
+    assert list(server.UPLOAD_DIR.iterdir()) == []
+
+
+def batch_files(*names):
+    return [("files", (name, png_bytes((40 * n, 0, 0)), "image/png")) for n, name in enumerate(names)]
+
+
+def test_batch_reports_partial_insert_failure(fake_server):
+    server.db.display_images.reject_names = {"b.png"}
+    with TestClient(server.app) as client:
+        response = client.post("/api/images/upload-batch", files=batch_files("a.png", "b.png", "c.png"))
+
+    assert response.status_code == 200
+    body = response.json()
+    assert not body["success"]
+    assert [r["success"] for r in body["results"]] == [True, False, True]
+    assert body["results"][1]["error"] == "duplicate key"
+    assert sorted(doc["name"] for doc in server.db.display_images.docs) == ["a.png", "c.png"]
+    assert not any(path.name.endswith("_b.png") for path in server.UPLOAD_DIR.iterdir())
+    assert len(list(server.RGB565_DIR.iterdir())) == 2
+    assert server.db.image_conversions.docs == []
+
+
+def test_batch_insert_crash_leaves_no_orphans(fake_server):
+    server.db.display_images.crash_after = 1
+    with TestClient(server.app) as client:
+        response = client.post("/api/images/upload-batch", files=batch_files("a.png", "b.png"))
+
+    assert response.status_code == 500
+    assert server.db.display_images.docs == []
+    assert server.db.image_conversions.docs == []
+    assert list(server.UPLOAD_DIR.iterdir()) == []
+    assert list(server.RGB565_DIR.iterdir()) == []
@@ -0,0 +1,288 @@
+import threading
+import time
+import zlib
+from types import SimpleNamespace
+
+import pytest
+
+from slot_manager import BASE_PRIORITY, Prefetcher, SlotManager, scan_variant_folder
+
+SLOTS = 8
+
+
+class FakeESP32:
+    """Merkt sich Uploads und Anzeigen statt seriell zu senden"""
+
+    def __init__(self, features=("HASH",)):
+        self.features = set(features)
+        self.cached_slots = [False] * SLOTS
+        self.slot_hashes = [None] * SLOTS
+        self.uploads = []
+        self.shown = []
+        self.fail_uploads = False
+        self.preemptible = True
+        self.upload_delay = 0.0
+        self.gate = None
+
+    def cache_image(self, slot, image_data, progress_callback=None, base_slot=None):
+        if self.gate is not None:
+            self.gate.wait(5)
+        time.sleep(self.upload_delay)
+        if self.fail_uploads:
+            return False
+        self.uploads.append((slot, image_data))
+        self.cached_slots[slot] = True
+        return True
+
+    def show_image(self, slot, gear=0, speed=0):
+        self.shown.append(slot)
+        return True
+
+
+def image(n: int) -> bytes:
+    return bytes([n]) * 16
+
+
+@pytest.fixture
+def esp32():
+    return FakeESP32()
+
+
+@pytest.fixture
+def slots(esp32):
+    manager = SlotManager(esp32, log_callback=lambda message: None)
+    for n in range(1, SLOTS + 1):
+        esp32.cached_slots[n - 1] = True
+        manager.register(n, image(n), priority=BASE_PRIORITY, slot=n - 1)
+    return manager
+
+
+def test_base_images_are_hits(slots, esp32):
+    assert slots.show(3)
+    assert esp32.shown == [2]
+    assert esp32.uploads == []
+    assert (slots.stats.hits, slots.stats.misses) == (1, 0)
+
+
+def test_vehicle_variant_is_uploaded_on_demand(slots, esp32):
+    slots.register(("Lions_City", 4), image(40))
+
+    assert slots.show(4, variant="BP_MAN_Lions_City_12_C_2147482")
+
+    slot, data = esp32.uploads[0]
+    assert data == image(40)
+    assert esp32.shown == [slot]
+    assert slots.slot_of(("Lions_City", 4)) == slot
+    assert (slots.stats.misses, slots.stats.evictions) == (1, 1)
+
+    # Zweite Anzeige: liegt schon im Slot
+    assert slots.show(4, variant="BP_MAN_Lions_City_12_C_2147482")
+    assert len(esp32.uploads) == 1
+    assert slots.stats.hits == 1
+
+
+def test_other_vehicle_uses_base_image(slots, esp32):
+    slots.register(("Lions_City", 4), image(40))
+
+    assert slots.show(4, variant="BP_Citaro_2147")
+
+    assert esp32.uploads == []
+    assert esp32.shown == [3]
+
+
+def test_longest_variant_name_wins(slots):
+    slots.register(("Lions_City", 1), image(10))
+    slots.register(("Lions_City_18", 1), image(11))
+
+    assert slots.resolve(1, "BP_MAN_Lions_City_18_C_1") == ("Lions_City_18", 1)
+    assert slots.resolve(1, "BP_MAN_Lions_City_12_C_1") == ("Lions_City", 1)
+    assert slots.resolve(2, "BP_MAN_Lions_City_12_C_1") == 2
+
+
+def test_low_priority_images_evict_each_other(slots, esp32):
+    for n in (1, 2, 3):
+        slots.register(("Bus", n), image(50 + n))
+
+    for n in (1, 2, 3):
+        assert slots.show(n, variant="Bus")
+
+    # Das erste Fahrzeugbild verdraengt ein Grundbild, danach verdraengen sich
+    # die Fahrzeugbilder (Prioritaet 0) gegenseitig
+    assert [slot for slot, _ in esp32.uploads] == [0, 0, 0]
+    assert slots.slot_of(("Bus", 3)) == 0
+    assert [slots.slot_of(n) for n in range(2, SLOTS + 1)] == list(range(1, SLOTS))
+    assert slots.stats.evictions == 3
+
+
+def test_lru_among_equal_priority(slots, esp32):
+    assert slots.show(2)
+    assert slots.show(1)
+    slots.register(("Bus", 5), image(55), priority=BASE_PRIORITY)
+
+    assert slots.show(5, variant="Bus")
+
+    # Bild 3 wurde am laengsten nicht benutzt
+    assert esp32.uploads[0][0] == 2
+    assert slots.slot_of(3) is None
+
+    # Bild 3 wird bei Bedarf wieder hochgeladen
+    assert slots.show(3)
+    assert esp32.uploads[1] == (3, image(3))
+
+
+def test_unknown_slot_content_is_not_free(esp32):
+    # Grundbilder aus einer frueheren Sitzung, dem Manager unbekannt
+    esp32.features = set()
+    slots = SlotManager(esp32, log_callback=lambda message: None)
+    slots.register(("Bus", 1), image(51))
+
+    assert slots.show(3)
+    assert esp32.shown == [2]
+    assert slots.show(1, variant="Bus")
+    replaced = esp32.uploads[0][0]
+    # Das zuletzt angezeigte Grundbild 3 bleibt liegen
+    assert replaced != 2
+
+    # Der verdraengte Slot kann nicht mehr als Grundbild angezeigt werden
+    assert not slots.show(replaced + 1)
+    assert slots.show(3)
+
+
+def test_empty_slots_are_used_first(esp32):
+    esp32.cached_slots[0] = True
+    slots = SlotManager(esp32, log_callback=lambda message: None)
+    slots.register(("Bus", 1), image(51))
+
+    assert slots.show(1, variant="Bus")
+
+    assert esp32.uploads[0][0] == 1
+    assert slots.stats.evictions == 0
+
+
+def test_changed_image_is_uploaded_again(slots, esp32):
+    slots.register(2, image(22), priority=BASE_PRIORITY)
+
+    assert slots.show(2)
+
+    # Der alte Slot des Bildes wird wiederverwendet, kein anderes Bild verdraengt
+    assert esp32.uploads == [(1, image(22))]
+    assert slots.stats.evictions == 0
+    assert slots.stats.misses == 1
+
+
+def test_unregistered_image_slot_is_reused_but_not_shown(slots, esp32):
+    slots.unregister(6)
+    slots.register(("Bus", 1), image(51))
+
+    assert not slots.show(6)
+    assert slots.show(1, variant="Bus")
+    assert esp32.uploads == [(5, image(51))]
+
+
+def test_failed_upload(slots, esp32):
+    slots.register(("Bus", 1), image(51))
+    esp32.fail_uploads = True
+
+    assert not slots.show(1, variant="Bus")
+    assert esp32.shown == []
+    assert slots.stats.upload_failures == 1
+
+
+def test_sync_with_device(esp32):
+    esp32.slot_hashes[5] = zlib.crc32(image(3))
+    slots = SlotManager(esp32, log_callback=lambda message: None)
+    slots.register(3, image(3), priority=BASE_PRIORITY)
+
+    slots.sync_with_device()
+
+    assert slots.slot_of(3) == 5
+    assert slots.show(3)
+    assert esp32.shown == [5]
+
+
+def test_scan_variant_folder(tmp_path):
+    (tmp_path / "Lions_City").mkdir()
+    for name in ("1.png", "bild4.JPG", "9.png", "notes.txt", "logo.png"):
+        (tmp_path / "Lions_City" / name).write_bytes(b"")
+    (tmp_path / "Leer").mkdir()
+    (tmp_path / "readme.png").write_bytes(b"")
+
+    variants = scan_variant_folder(str(tmp_path))
+
+    assert list(variants) == ["Lions_City"]
+    assert sorted(variants["Lions_City"]) == [1, 4]
+    assert variants["Lions_City"][4].endswith("bild4.JPG")
+
+
+VEHICLE = "BP_MAN_Lions_City_12_C_2147482"
+
+# Vordertuer offen: als Naechstes wird Bild 5 erwartet
+AT_STOP = SimpleNamespace(ignition_on=True, front_door_open=True, rear_door_open=False,
+                          kneeling=False, speed=0, engine_running=True)
+
+
+@pytest.fixture
+def prefetcher(slots):
+    slots.register(("Lions_City", 5), image(50), priority=BASE_PRIORITY)
+    prefetcher = Prefetcher(slots, depth=1, idle_delay=0.0)
+    yield prefetcher
+    prefetcher.stop(timeout=5)
+
+
+def test_prefetch_hit_avoids_stall(slots, esp32, prefetcher):
+    esp32.upload_delay = 0.02
+    assert not prefetcher.step(4, AT_STOP, VEHICLE)   # Bildwechsel: erst stabil werden
+    assert prefetcher.step(4, AT_STOP, VEHICLE)
+    prefetcher.wait()
+
+    slot = slots.slot_of(("Lions_City", 5))
+    assert esp32.uploads == [(slot, image(50))]
+    assert slots.stats.prefetches == 1
+
+    assert slots.show(5, variant=VEHICLE)
+    assert len(esp32.uploads) == 1
+    assert esp32.shown == [slot]
+    assert slots.stats.prefetch_accuracy == 1.0
+    assert slots.stats.stall_avoided_seconds >= 0.02
+
+
+def test_prefetch_does_not_block_show(slots, esp32, prefetcher):
+    esp32.gate = threading.Event()
+    prefetcher.step(4, AT_STOP, VEHICLE)
+
+    start = time.monotonic()
+    assert prefetcher.step(4, AT_STOP, VEHICLE)
+    # Upload haengt; Telemetrie-Thread zeigt weiter geladene Bilder an
+    assert slots.show(3)
+    assert not prefetcher.step(4, AT_STOP, VEHICLE)
+    assert time.monotonic() - start < 1.0
+    assert esp32.shown == [2]
+
+    esp32.gate.set()
+    prefetcher.wait()
+    assert slots.slot_of(("Lions_City", 5)) is not None
+
+
+def test_show_waits_for_running_prefetch(slots, esp32, prefetcher):
+    esp32.gate = threading.Event()
+    prefetcher.step(4, AT_STOP, VEHICLE)
+    prefetcher.step(4, AT_STOP, VEHICLE)
+    deadline = time.monotonic() + 5
+    while not slots.uploading and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+    shown = threading.Thread(target=slots.show, args=(5,), kwargs={"variant": VEHICLE})
+    shown.start()
+    esp32.gate.set()
+    shown.join(timeout=5)
+
+    assert len(esp32.uploads) == 1
+    assert esp32.shown == [slots.slot_of(("Lions_City", 5))]
+    assert (slots.stats.misses, slots.stats.prefetch_hits) == (0, 1)
+
+
+def test_no_prefetch_without_preempt(slots, esp32, prefetcher):
+    esp32.preemptible = False
+    prefetcher.step(4, AT_STOP, VEHICLE)
+    assert not prefetcher.step(4, AT_STOP, VEHICLE)
+    assert prefetcher.worker is None
@@ -0,0 +1,165 @@
+import asyncio
+import socket
+
+import pytest
+import requests
+
+from telemetry_client import (ACTIVE_HOLD, BACKOFF_BASE, BACKOFF_MAX, DOWN_AFTER, HEALTH_DEGRADED,
+                              HEALTH_DOWN, HEALTH_UP, IDLE_AFTER, POLL_FAST, POLL_IDLE, POLL_NORMAL,
+                              AsyncTelemetryClient, PollScheduler, TelemetryClient, TelemetryError,
+                              TelemetryHealth, TelemetryUnavailable)
+
+
+@pytest.fixture
+def scheduler():
+    return PollScheduler()
+
+
+def test_change_keeps_fast_for_active_hold(scheduler):
+    assert scheduler.update(True, changed=True, now=100.0) == POLL_FAST
+    assert scheduler.update(True, now=100.0 + ACTIVE_HOLD / 2) == POLL_FAST
+    assert scheduler.update(True, now=100.0 + ACTIVE_HOLD) == POLL_NORMAL
+    assert scheduler.mode == "normal"
+
+
+def test_running_sequence_is_fast(scheduler):
+    assert scheduler.update(True, active=True, now=100.0) == POLL_FAST
+    assert scheduler.mode == "schnell"
+
+
+def test_idle_only_after_idle_after(scheduler):
+    scheduler.update(True, changed=True, now=100.0)
+    assert scheduler.update(True, idle=True, now=100.0 + IDLE_AFTER / 2) == POLL_NORMAL
+    assert scheduler.update(True, idle=True, now=100.0 + IDLE_AFTER) == POLL_IDLE
+    assert scheduler.mode == "ruhe"
+    # Aenderung weckt sofort auf
+    assert scheduler.update(True, idle=True, changed=True, now=200.0) == POLL_FAST
+
+
+def test_no_vehicle_without_health_polls_idle(scheduler):
+    assert scheduler.update(False, now=100.0) == POLL_IDLE
+    assert scheduler.mode == "offline"
+
+
+def test_due_and_delay(scheduler):
+    scheduler.update(True, now=100.0)
+    scheduler.started(now=100.0)
+    assert not scheduler.due(now=100.0 + POLL_NORMAL / 2)
+    assert scheduler.delay(now=100.0 + POLL_NORMAL / 2) == pytest.approx(POLL_NORMAL / 2)
+    assert scheduler.due(now=100.0 + POLL_NORMAL * 1.01)
+    assert scheduler.delay(now=105.0) == 0.0
+
+
+def test_decision_latency_and_rate(scheduler):
+    scheduler.started(now=100.0)
+    scheduler.decided(now=100.05)   # ohne vorherige Abfrage keine Latenz
+    assert scheduler.stats.decisions == 0
+
+    scheduler.started(now=100.1)
+    scheduler.decided(now=100.15)
+    assert scheduler.stats.decisions == 1
+    assert scheduler.stats.decision_latency[0] == pytest.approx(0.15)
+
+    assert scheduler.stats.polls == 2
+    assert scheduler.stats.modes["normal"] == 2
+    assert scheduler.stats.rate(now=105.0) == pytest.approx(0.2)
+    assert scheduler.stats.rate(now=200.0) == 0.0
+
+
+def test_health_goes_down_after_repeated_failures():
+    health = TelemetryHealth()
+    for _ in range(DOWN_AFTER - 1):
+        health.failure()
+        assert health.state == HEALTH_DEGRADED
+    health.failure()
+    health.failure()
+    assert health.down
+    assert health.outages == 1
+
+    health.success()
+    assert (health.state, health.failures) == (HEALTH_UP, 0)
+    for _ in range(DOWN_AFTER):
+        health.failure()
+    assert health.outages == 2
+
+
+def test_retry_delay_backs_off_with_jitter():
+    health = TelemetryHealth()
+    for _ in range(DOWN_AFTER):
+        health.failure()
+    for _ in range(50):
+        assert BACKOFF_BASE / 2 <= health.retry_delay() <= BACKOFF_BASE
+
+    for _ in range(20):
+        health.failure()
+    for _ in range(50):
+        assert BACKOFF_MAX / 2 <= health.retry_delay() <= BACKOFF_MAX
+
+
+def test_scheduler_follows_health(scheduler):
+    health = TelemetryHealth()
+    assert scheduler.update(False, health=health, now=100.0) == POLL_IDLE
+    assert scheduler.mode == "ruhe"
+
+    health.failure()
+    assert scheduler.update(False, health=health, now=100.0) == POLL_NORMAL
+    assert scheduler.mode == "gestoert"
+
+    for _ in range(DOWN_AFTER):
+        health.failure()
+    assert scheduler.update(False, health=health, now=100.0) <= BACKOFF_MAX
+    assert scheduler.mode == "offline"
+
+
+def unused_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_unreachable_game_is_probed():
+    async def run():
+        client = AsyncTelemetryClient(f"http://127.0.0.1:{unused_port()}")
+        for _ in range(DOWN_AFTER + 2):
+            with pytest.raises(TelemetryUnavailable):
+                await client.get_json("/vehicles")
+        return client
+
+    client = asyncio.run(run())
+    assert client.health.state == HEALTH_DOWN
+    assert (client.health.outages, client.health.probes) == (1, 2)
+    assert client.stats.failures == DOWN_AFTER + 2
+
+
+def test_bad_answer_keeps_game_reachable():
+    async def handle(reader, writer):
+        await reader.readuntil(b"\r\n\r\n")
+        writer.write(b"HTTP/1.1 500 Error\r\nContent-Length: 0\r\n\r\n")
+        await writer.drain()
+
+    async def run():
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        client = AsyncTelemetryClient(f"http://127.0.0.1:{port}")
+        client.health.failure()
+        try:
+            with pytest.raises(TelemetryError) as error:
+                await client.get_json("/vehicles")
+        finally:
+            await client.close()
+            server.close()
+            await server.wait_closed()
+        return client, error.value
+
+    client, error = asyncio.run(run())
+    assert not isinstance(error, TelemetryUnavailable)
+    assert client.health.state == HEALTH_UP
+
+
+def test_client_session_closed_when_request_fails(monkeypatch):
+    closed = []
+    with pytest.raises(requests.RequestException):
+        with TelemetryClient(f"http://127.0.0.1:{unused_port()}", timeout=(0.5, 0.5)) as client:
+            monkeypatch.setattr(client.session, "close", lambda: closed.append(True))
+            client.get_vehicles()
+    assert closed == [True]
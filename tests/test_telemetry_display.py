@@ -0,0 +1,42 @@
+import asyncio
+
+import telemetry_client
+import telemetry_display
+from telemetry_display import TelemetryDisplayController
+
+
+def test_unexpected_poll_error_does_not_end_loop(monkeypatch):
+    monkeypatch.setattr(telemetry_client, "POLL_IDLE", 0.01)
+    controller = TelemetryDisplayController("127.0.0.1", 1, serial_port="fake")
+    polls = []
+
+    async def connect_serial():
+        return True
+
+    async def panel_run():
+        await asyncio.Event().wait()
+
+    async def get_telemetry_data():
+        polls.append(len(polls))
+        if len(polls) <= 2:
+            # z.B. /player liefert eine Liste statt eines Objekts
+            raise AttributeError("'list' object has no attribute 'get'")
+        return None
+
+    monkeypatch.setattr(controller, "connect_serial", connect_serial)
+    monkeypatch.setattr(controller, "get_telemetry_data", get_telemetry_data)
+    for panel in controller.panels:
+        monkeypatch.setattr(panel, "run", panel_run)
+
+    async def run():
+        task = asyncio.create_task(controller.run())
+        while len(polls) < 4 and not task.done():
+            await asyncio.sleep(0.01)
+        assert not task.done()
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(run())
+    assert controller.client.stats.failures == 2
+    assert controller.scheduler.mode == "ruhe"
+    assert controller.current_vehicle is None
@@ -0,0 +1,99 @@
+import pytest
+
+import telemetry_index
+from telemetry_index import TelemetryIndex, check_lamp_scan, lamp_on
+
+LAMPS = {
+    "ignition": ["Ignition", "Zuendung"],
+    "fog": ["FogLight", "Nebel"],
+}
+
+
+def door_group(name: str):
+    if name.startswith("Front"):
+        return "front"
+    if name.startswith("Rear"):
+        return "rear"
+    return None
+
+
+def frame(lamps=None, buttons=(), doors=()):
+    return {
+        "AllLamps": dict(lamps or {}),
+        "Buttons": [{"Name": name, "State": state} for name, state in buttons],
+        "Doors": [{"Name": name, "Open": open_} for name, open_ in doors],
+    }
+
+
+@pytest.fixture
+def index():
+    return TelemetryIndex(LAMPS, door_group)
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("1", True), ("0.5", True), ("0", False), ("-1", False), (2, True),
+    ("", False), ("an", False), (None, False), ([1], False),
+])
+def test_lamp_on(value, expected):
+    assert lamp_on(value) is expected
+    assert lamp_on(value) is expected
+
+
+def test_lamp_value_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(telemetry_index, "_lamp_values", {})
+    for n in range(telemetry_index.LAMP_VALUE_CACHE + 50):
+        lamp_on(str(n))
+    assert len(telemetry_index._lamp_values) == telemetry_index.LAMP_VALUE_CACHE
+
+
+@pytest.mark.parametrize("lamps", [
+    {}, {"Ignition": "0"}, {"Zuendung": "1"}, {"Ignition": "x", "Zuendung": "0.2"},
+    {"FogLight": "1", "Other": "1"}, {"Nebel": None},
+])
+def test_lamp_matches_linear_scan(index, lamps):
+    index.prepare(frame(lamps), vehicle="bus")
+    for signal, names in LAMPS.items():
+        assert index.lamp(signal) == check_lamp_scan(lamps, names)
+
+
+def test_same_shape_is_compiled_once(index):
+    index.prepare(frame({"Ignition": "0"}), vehicle="bus")
+    index.prepare(frame({"Ignition": "1"}), vehicle="bus")
+    assert index.compiles == 1
+    assert index.lamp("ignition")
+
+
+def test_recompiles_on_shape_or_vehicle_change(index):
+    index.prepare(frame({"Ignition": "1"}), vehicle="bus")
+    index.prepare(frame({"Ignition": "1", "Nebel": "1"}), vehicle="bus")
+    assert index.compiles == 2
+    assert index.lamp("fog")
+
+    index.prepare(frame({"Ignition": "1", "FogLight": "0"}), vehicle="other")
+    assert index.compiles == 3
+    assert not index.lamp("fog")
+
+
+def test_button_lookup_recompiles_on_reorder(index):
+    index.prepare(frame(buttons=[("Gear", "D"), ("Kneel", "1")]), vehicle="bus")
+    assert index.button("Gear") == "D"
+    assert index.button("Missing", "-") == "-"
+
+    # Gleiche Anzahl, andere Reihenfolge
+    index.prepare(frame(buttons=[("Kneel", "0"), ("Gear", "R")]), vehicle="bus")
+    assert index.compiles == 1
+    assert index.button("Gear") == "R"
+    assert index.compiles == 2
+    assert index.button("Kneel") == "0"
+
+
+def test_door_groups(index):
+    index.prepare(frame(doors=[("Front1", "false"), ("Rear1", "True"), ("Cargo", "true")]),
+                  vehicle="bus")
+    assert not index.door_open("front")
+    assert index.door_open("rear")
+    assert not index.door_open("cargo")
+
+    without_groups = TelemetryIndex(LAMPS)
+    without_groups.prepare(frame(doors=[("Front1", "true")]), vehicle="bus")
+    assert not without_groups.door_open("front")